@@ -1,4 +1,5 @@
 from .groq.groq_agent import GroqAgent
 from .memory import Memory, MemoryRecord
+from .session import SessionManager
 
-__all__ = ["GroqAgent", "Memory", "MemoryRecord"]
+__all__ = ["GroqAgent", "Memory", "MemoryRecord", "SessionManager"]
@@ -1,9 +1,92 @@
+import asyncio
+import copy
+import time
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastmcp import Client
 from loguru import logger
 
 from kubrick_api.agent.memory import Memory
+from kubrick_api.config import get_settings
+
+settings = get_settings()
+
+
+class MCPSessionPool:
+    """
+    Pool of long-lived MCP client sessions.
+
+    Sessions are opened lazily (up to `size`), reused across calls and health-checked
+    with a ping when they have been idle for longer than `health_check_interval` seconds.
+    Broken sessions are closed and transparently replaced by a fresh connection.
+    """
+
+    def __init__(self, mcp_server: str, size: int, health_check_interval: float):
+        self.mcp_server = mcp_server
+        self.size = size
+        self.health_check_interval = health_check_interval
+
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: list[Client] = []
+        self._last_used: dict[int, float] = {}
+
+    async def _connect(self) -> Client:
+        logger.info(f"Opening MCP session to {self.mcp_server}")
+        client = Client(self.mcp_server)
+        await client.__aenter__()
+        return client
+
+    async def _disconnect(self, client: Client) -> None:
+        self._last_used.pop(id(client), None)
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Error while closing MCP session: {e}")
+
+    async def _is_healthy(self, client: Client) -> bool:
+        if not client.is_connected():
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(client), 0.0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            return await client.ping()
+        except Exception as e:
+            logger.warning(f"MCP session health check failed: {e}")
+            return False
+
+    async def _acquire(self) -> Client:
+        while self._idle:
+            client = self._idle.pop()
+            if await self._is_healthy(client):
+                return client
+            logger.info("Reconnecting stale MCP session")
+            await self._disconnect(client)
+        return await self._connect()
+
+    def _release(self, client: Client) -> None:
+        self._last_used[id(client)] = time.monotonic()
+        self._idle.append(client)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[Client]:
+        """Borrow a connected MCP client from the pool."""
+        async with self._semaphore:
+            client = await self._acquire()
+            try:
+                yield client
+            finally:
+                if client.is_connected():
+                    self._release(client)
+                else:
+                    await self._disconnect(client)
+
+    async def close(self) -> None:
+        """Close every idle session in the pool."""
+        while self._idle:
+            await self._disconnect(self._idle.pop())
 
 
 class BaseAgent(ABC):
@@ -19,44 +102,92 @@ class BaseAgent(ABC):
         disable_tools: list = None,
     ):
         self.name = name
-        self.mcp_client = Client(mcp_server)
+        self.mcp_pool = MCPSessionPool(
+            mcp_server,
+            size=settings.MCP_POOL_SIZE,
+            health_check_interval=settings.MCP_HEALTH_CHECK_INTERVAL_SECONDS,
+        )
         self.memory = memory if memory else Memory(name)
         self.disable_tools = disable_tools if disable_tools else []
-        
+
         self.tools = None
         self.routing_system_prompt = None
         self.tool_use_system_prompt = None
         self.general_system_prompt = None
-        
+
+        self._metadata_refresh_task: asyncio.Task | None = None
+
     async def setup(self):
-        """Initialize async components of the agent."""
-        async with self.mcp_client as _:
-            self.tools = await self._get_tools()
-            self.routing_system_prompt = await self._get_routing_system_prompt()
-            self.tool_use_system_prompt = await self._get_tool_use_system_prompt()
-            self.general_system_prompt = await self._get_general_system_prompt()
-
-    async def _get_routing_system_prompt(self) -> str:
+        """Initialize async components of the agent.
+
+        Tool definitions and system prompts are fetched once and then kept fresh by a
+        background task, so calling this on every request is cheap.
+        """
+        if self.tools is None:
+            await self._refresh_metadata()
+        if self._metadata_refresh_task is None or self._metadata_refresh_task.done():
+            self._metadata_refresh_task = asyncio.create_task(self._refresh_metadata_periodically())
+
+    async def _refresh_metadata(self):
+        """Fetch tool definitions and system prompts from the MCP server."""
+        tools = await self._get_tools()
+        async with self.mcp_pool.session() as client:
+            routing_system_prompt = await self._get_routing_system_prompt(client)
+            tool_use_system_prompt = await self._get_tool_use_system_prompt(client)
+            general_system_prompt = await self._get_general_system_prompt(client)
+
+        self.tools = tools
+        self.routing_system_prompt = routing_system_prompt
+        self.tool_use_system_prompt = tool_use_system_prompt
+        self.general_system_prompt = general_system_prompt
+
+    async def _refresh_metadata_periodically(self):
+        while True:
+            await asyncio.sleep(settings.MCP_METADATA_REFRESH_SECONDS)
+            try:
+                await self._refresh_metadata()
+                logger.info("Refreshed MCP tools and prompts")
+            except Exception as e:
+                logger.warning(f"Failed to refresh MCP tools and prompts, keeping cached ones: {e}")
+
+    async def _get_routing_system_prompt(self, client: Client) -> str:
         """Get the routing system prompt."""
         logger.info("Getting routing system prompt")
-        mcp_prompt = await self.mcp_client.get_prompt("routing_system_prompt")
+        mcp_prompt = await client.get_prompt("routing_system_prompt")
         return mcp_prompt.messages[0].content.text
-    
-    async def _get_tool_use_system_prompt(self) -> str:
+
+    async def _get_tool_use_system_prompt(self, client: Client) -> str:
         """Get the tool use system prompt."""
         logger.info("Getting tool use system prompt")
-        mcp_prompt = await self.mcp_client.get_prompt("tool_use_system_prompt")
+        mcp_prompt = await client.get_prompt("tool_use_system_prompt")
         return mcp_prompt.messages[0].content.text
-    
-    async def _get_general_system_prompt(self) -> str:
+
+    async def _get_general_system_prompt(self, client: Client) -> str:
         """Get the general system prompt."""
         logger.info("Getting general system prompt")
-        mcp_prompt = await self.mcp_client.get_prompt("general_system_prompt")
+        mcp_prompt = await client.get_prompt("general_system_prompt")
         return mcp_prompt.messages[0].content.text
 
     def reset_memory(self):
         self.memory.reset_memory()
-        
+
+    def for_session(self, session_id: str, memory: Memory) -> "BaseAgent":
+        """
+        Return a lightweight copy of the agent bound to a session's memory.
+
+        MCP sessions, LLM clients, tools and prompts are shared with this agent.
+        """
+        session_agent = copy.copy(self)
+        session_agent.memory = memory
+        return session_agent
+
+    async def close(self):
+        """Stop the background metadata refresh and close pooled MCP sessions."""
+        if self._metadata_refresh_task is not None:
+            self._metadata_refresh_task.cancel()
+            self._metadata_refresh_task = None
+        await self.mcp_pool.close()
+
     def filter_active_tools(self, tools: list) -> list:
         """
         Filter the list of tools to only include the active tools.
@@ -78,7 +209,7 @@ class BaseAgent(ABC):
             Exception: If tool discovery fails for any other reason
         """
         try:
-            async with self.mcp_client as client:
+            async with self.mcp_pool.session() as client:
                 tools = await client.list_tools()
                 if not tools:
                     logger.info("No tools were discovered from the MCP server")
@@ -95,16 +226,17 @@ class BaseAgent(ABC):
         except Exception as e:
             logger.error(f"Tool discovery failed: {e}")
             raise
-        
+
     @abstractmethod
     async def _get_tools(self) -> list:
         raise NotImplementedError("Tools are not implemented in the base class.")
-    
-    async def call_tool(self, function_name: str, function_args: dict) -> str:
-        async with self.mcp_client as _:
-            mcp_response = await self.mcp_client.call_tool(function_name, function_args)
+
+    async def call_tool(self, function_name: str, function_args: dict, timeout: float | None = None) -> str:
+        """Call an MCP tool. The `timeout` only covers the call, not the wait for a pooled session."""
+        async with self.mcp_pool.session() as client:
+            mcp_response = await asyncio.wait_for(client.call_tool(function_name, function_args), timeout=timeout)
             return mcp_response[0].text
-    
+
     @abstractmethod
     async def chat(self, message: str) -> str:
         raise NotImplementedError("Chat is not implemented in the base class.")
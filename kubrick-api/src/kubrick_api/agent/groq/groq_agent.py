@@ -1,18 +1,21 @@
+import asyncio
 import json
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
+import httpx
 import instructor
 import opik
-from groq import Groq
+from groq import AsyncGroq, Groq
 from loguru import logger
 from opik import Attachment, opik_context
+from pydantic import ValidationError
 
 from kubrick_api import tools
 from kubrick_api.agent.base_agent import BaseAgent
 from kubrick_api.agent.groq.groq_tool import transform_tool_definition
-from kubrick_api.agent.memory import Memory, MemoryRecord
+from kubrick_api.agent.memory import Memory, MemoryRecord, estimate_tokens
 from kubrick_api.config import get_settings
 from kubrick_api.models import (
     AssistantMessageResponse,
@@ -25,6 +28,20 @@ logger.bind(name="GroqAgent")
 
 settings = get_settings()
 
+MEMORY_SUMMARY_SYSTEM_PROMPT = """
+You maintain a running summary of a conversation between a user and Kubrick, a video assistant.
+Update the previous summary with the new messages. Keep the facts, the user's requests,
+the videos and clips that were discussed and any open questions. Be concise.
+"""
+
+
+def _update_span_metadata(metadata: Dict[str, Any]) -> None:
+    """Attach metadata to the current Opik span, if there is one."""
+    try:
+        opik_context.update_current_span(metadata=metadata)
+    except Exception as e:
+        logger.debug(f"Could not update the current span: {e}")
+
 
 class GroqAgent(BaseAgent):
     def __init__(
@@ -40,9 +57,45 @@ class GroqAgent(BaseAgent):
             memory,
             disable_tools,
         )
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.use_async_client = settings.GROQ_ASYNC_CLIENT
+        if self.use_async_client:
+            self.client = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.GROQ_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                ),
+            )
+        else:
+            self.client = Groq(api_key=settings.GROQ_API_KEY, timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS)
         self.instructor_client = instructor.from_groq(self.client, mode=instructor.Mode.JSON)
         self.thread_id = str(uuid.uuid4())
+        self._background_tasks: set[asyncio.Task] = set()
+
+    async def _create_completion(self, **kwargs) -> Any:
+        """Run a raw chat completion without blocking the event loop."""
+        if self.use_async_client:
+            return await self.client.chat.completions.create(**kwargs)
+        return await asyncio.to_thread(self.client.chat.completions.create, **kwargs)
+
+    async def _create_structured_completion(self, **kwargs) -> Any:
+        """Run a structured (instructor) chat completion without blocking the event loop."""
+        if self.use_async_client:
+            return await self.instructor_client.chat.completions.create(**kwargs)
+        return await asyncio.to_thread(self.instructor_client.chat.completions.create, **kwargs)
+
+    async def close(self):
+        await super().close()
+        if self.use_async_client:
+            await self.client.close()
+
+    def for_session(self, session_id: str, memory: Memory) -> "GroqAgent":
+        session_agent = super().for_session(session_id, memory)
+        session_agent.thread_id = session_id
+        return session_agent
 
     async def _get_tools(self) -> List[Dict[str, Any]]:
         tools = await self.discover_tools()
@@ -57,7 +110,22 @@ class GroqAgent(BaseAgent):
         n: int = settings.AGENT_MEMORY_SIZE,
     ) -> List[Dict[str, Any]]:
         history = [{"role": "system", "content": system_prompt}]
-        history += [{"role": record.role, "content": record.content} for record in self.memory.get_latest(n)]
+
+        summary = self.memory.get_summary()
+        if summary:
+            history.append({"role": "system", "content": f"Summary of the earlier conversation: {summary.content}"})
+        latest_records = self.memory.get_latest(n, include_compacted=True)
+        records = [record for record in latest_records if summary is None or record.timestamp > summary.timestamp]
+        history += [{"role": record.role, "content": record.content} for record in records]
+
+        memory_tokens = sum(estimate_tokens(message["content"]) for message in history[1:])
+        uncompacted_tokens = sum(estimate_tokens(record.content) for record in latest_records)
+        _update_span_metadata(
+            {
+                "memory_tokens": memory_tokens,
+                "memory_tokens_saved": max(uncompacted_tokens - memory_tokens, 0),
+            }
+        )
 
         user_content = (
             [
@@ -74,16 +142,17 @@ class GroqAgent(BaseAgent):
         return history
 
     @opik.track(name="router", type="llm")
-    def _should_use_tool(self, message: str) -> bool:
+    async def _should_use_tool(self, message: str) -> bool:
         messages = [
             {"role": "system", "content": self.routing_system_prompt},
             {"role": "user", "content": message},
         ]
-        response = self.instructor_client.chat.completions.create(
+        response = await self._create_structured_completion(
             model=settings.GROQ_ROUTING_MODEL,
             response_model=RoutingResponseModel,
             messages=messages,
             max_completion_tokens=20,
+            timeout=settings.GROQ_ROUTING_TIMEOUT_SECONDS,
         )
         return response.tool_use
     
@@ -92,7 +161,13 @@ class GroqAgent(BaseAgent):
         video_clip_response.clip_path = video_clip_path
         return video_clip_response
 
-    async def _execute_tool_call(self, tool_call: Any, video_path: str, image_base64: str | None = None) -> str:
+    async def _execute_tool_call(
+        self,
+        tool_call: Any,
+        semaphore: asyncio.Semaphore,
+        video_path: str,
+        image_base64: str | None = None,
+    ) -> str:
         """Execute a single tool call and return its response."""
         function_name = tool_call.function.name
         function_args = json.loads(tool_call.function.arguments)
@@ -105,46 +180,62 @@ class GroqAgent(BaseAgent):
         logger.info(f"Executing tool: {function_name}")
 
         try:
-            return await self.call_tool(function_name, function_args)
+            async with semaphore:
+                return await self.call_tool(
+                    function_name, function_args, timeout=settings.AGENT_TOOL_CALL_TIMEOUT_SECONDS
+                )
+        except asyncio.TimeoutError:
+            logger.error(f"Tool {function_name} timed out after {settings.AGENT_TOOL_CALL_TIMEOUT_SECONDS}s")
+            return f"Error executing tool {function_name}: timed out"
         except Exception as e:
             logger.error(f"Error executing tool {function_name}: {str(e)}")
             return f"Error executing tool {function_name}: {str(e)}"
 
-    @opik.track(name="tool-use", type="tool")
-    async def _run_with_tool(self, message: str, video_path: str, image_base64: str | None = None) -> str:
-        """Execute chat completion with tool usage."""
+    async def _select_tool_calls(self, message: str, image_base64: str | None = None) -> tuple[List[Dict[str, Any]], Any]:
+        """Ask the tool-use model which tools to call. Returns the chat history and the model's message."""
         tool_use_system_prompt = self.tool_use_system_prompt.format(
             is_image_provided=bool(image_base64),
         )
         chat_history = self._build_chat_history(tool_use_system_prompt, message)
 
         response = (
-            self.client.chat.completions.create(
+            await self._create_completion(
                 model=settings.GROQ_TOOL_USE_MODEL,
                 messages=chat_history,
                 tools=self.tools,
                 tool_choice="auto",
                 max_completion_tokens=4096,
+                timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
             )
-            .choices[0]
-            .message
-        )
-        tool_calls = response.tool_calls
-        logger.info(f"Tool calls: {tool_calls}")
+        ).choices[0].message
+        logger.info(f"Tool calls: {response.tool_calls}")
+        return chat_history, response
 
-        if not tool_calls:
-            logger.info("No tool calls available, returning general response ...")
-            return GeneralResponseModel(message=response.content)
+    async def _execute_tool_calls(
+        self,
+        tool_calls: List[Any],
+        chat_history: List[Dict[str, Any]],
+        video_path: str,
+        image_base64: str | None = None,
+    ) -> tuple[type[GeneralResponseModel] | type[VideoClipResponseModel], str]:
+        """Execute the tool calls concurrently and append their responses to the chat history.
+
+        At most `AGENT_TOOL_CALL_CONCURRENCY` calls of this turn run at once.
+        Returns the response model for the follow-up completion and the last tool response.
+        """
+        semaphore = asyncio.Semaphore(settings.AGENT_TOOL_CALL_CONCURRENCY)
+        function_responses = await asyncio.gather(
+            *(self._execute_tool_call(tool_call, semaphore, video_path, image_base64) for tool_call in tool_calls)
+        )
 
-        for tool_call in tool_calls:
-            function_response = await self._execute_tool_call(tool_call, video_path, image_base64)
+        for tool_call, function_response in zip(tool_calls, function_responses):
             logger.info(f"Function response: {function_response}")
-            
+
             if tool_call.function.name == "get_video_clip_from_image":
                 tool_response = f"This is the video context. Use it to answer the user's question: {function_response}"
             else:
                 tool_response = function_response
-            
+
             chat_history.append(
                 {
                     "tool_call_id": tool_call.id,
@@ -155,22 +246,20 @@ class GroqAgent(BaseAgent):
             )
 
         response_model = (
-            GeneralResponseModel if tool_call.function.name == "ask_question_about_video" else VideoClipResponseModel
+            GeneralResponseModel
+            if tool_call.function.name in ("ask_question_about_video", "search_video_library")
+            else VideoClipResponseModel
         )
-        
         logger.info(f"Chat history: {chat_history}")
-        
-        followup_response = self.instructor_client.chat.completions.create(
-            model=settings.GROQ_TOOL_USE_MODEL,
-            messages=chat_history,
-            response_model=response_model,
-        )
+        return response_model, tool_response
 
+    def _finalize_tool_response(self, followup_response: Any, tool_response: str) -> Any:
+        """Attach the clip path to video clip responses and trace the clip's first frame."""
         if isinstance(followup_response, VideoClipResponseModel):
             try:
                 logger.info("Validating VideoClip response")
                 self.validate_video_clip_response(followup_response, tool_response)
-                
+
                 logger.info(f"Tracing image from trimmed clip: {followup_response.clip_path}")
                 first_image_path = tools.sample_first_frame(followup_response.clip_path)
                 opik_context.update_current_trace(
@@ -186,15 +275,49 @@ class GroqAgent(BaseAgent):
 
         return followup_response
 
+    @opik.track(name="tool-use", type="tool")
+    async def _run_with_tool(self, message: str, video_path: str, image_base64: str | None = None) -> str:
+        """Execute chat completion with tool usage."""
+        chat_history, response = await self._select_tool_calls(message, image_base64)
+
+        if not response.tool_calls:
+            logger.info("No tool calls available, returning general response ...")
+            return GeneralResponseModel(message=response.content)
+
+        response_model, tool_response = await self._execute_tool_calls(
+            response.tool_calls, chat_history, video_path, image_base64
+        )
+
+        followup_response = await self._create_structured_completion(
+            model=settings.GROQ_TOOL_USE_MODEL,
+            messages=chat_history,
+            response_model=response_model,
+            timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
+        )
+        return self._finalize_tool_response(followup_response, tool_response)
+
     @opik.track(name="generate-response", type="llm")
-    def _respond_general(self, message: str) -> str:
+    async def _respond_general(self, message: str) -> str:
         chat_history = self._build_chat_history(self.general_system_prompt, message)
-        return self.instructor_client.chat.completions.create(
+        return await self._create_structured_completion(
             model=settings.GROQ_GENERAL_MODEL,
             messages=chat_history,
             response_model=GeneralResponseModel,
+            timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
         )
 
+    async def _stream_structured_completion(self, **kwargs) -> AsyncIterator[Any]:
+        """Yield partial structured responses as the completion streams in.
+
+        The sync client cannot stream without blocking, so it yields the full response once.
+        """
+        if not self.use_async_client:
+            yield await self._create_structured_completion(**kwargs)
+            return
+
+        async for partial in self.instructor_client.chat.completions.create_partial(**kwargs):
+            yield partial
+
     def _add_to_memory(self, role: str, content: str) -> None:
         """Add a message to the agent's memory."""
         self.memory.insert(
@@ -206,6 +329,46 @@ class GroqAgent(BaseAgent):
             )
         )
 
+    async def _summarize_memory(self, previous_summary: str | None, records: List[MemoryRecord]) -> str:
+        conversation = "\n".join(f"{record.role}: {record.content}" for record in records)
+        response = await self._create_completion(
+            model=settings.GROQ_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": MEMORY_SUMMARY_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Previous summary:\n{previous_summary or 'None'}\n\nNew messages:\n{conversation}",
+                },
+            ],
+            max_completion_tokens=settings.AGENT_MEMORY_SUMMARY_MAX_TOKENS,
+            timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
+        )
+        return response.choices[0].message.content
+
+    @opik.track(name="memory-compaction", type="general")
+    async def _compact_memory(self) -> None:
+        """Fold older turns into the rolling summary once the history exceeds its token budget."""
+        if not settings.AGENT_MEMORY_COMPACTION:
+            return
+        try:
+            await self.memory.compact(
+                self._summarize_memory,
+                token_budget=settings.AGENT_MEMORY_TOKEN_BUDGET,
+                n=settings.AGENT_MEMORY_SIZE,
+            )
+        except Exception as e:
+            logger.error(f"Failed to compact memory, keeping raw history: {e}")
+
+    def _schedule_compaction(self) -> None:
+        """Compact the memory in the background, so that the response is not held back by it.
+
+        Compactions of the same session are serialized by the memory's compaction lock, which is
+        shared since the session manager keeps a single memory per session while it is in use.
+        """
+        task = asyncio.create_task(self._compact_memory())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
     @opik.track(name="memory-insertion", type="general")
     def _add_memory_pair(self, user_message: str, assistant_message: str) -> None:
         self._add_to_memory("user", user_message)
@@ -221,7 +384,7 @@ class GroqAgent(BaseAgent):
         """Main entry point for processing a user message."""
         opik_context.update_current_trace(thread_id=self.thread_id)
 
-        tool_required = video_path and self._should_use_tool(message)
+        tool_required = video_path and await self._should_use_tool(message)
         logger.info(f"Tool required: {tool_required}")
 
         if tool_required:
@@ -229,8 +392,77 @@ class GroqAgent(BaseAgent):
             response = await self._run_with_tool(message, video_path, image_base64)
         else:
             logger.info("Running general response")
-            response = self._respond_general(message)
+            response = await self._respond_general(message)
 
         self._add_memory_pair(message, response.message)
+        self._schedule_compaction()
 
         return AssistantMessageResponse(**response.dict())
+
+    @opik.track(name="chat-stream", type="general")
+    async def chat_stream(
+        self,
+        message: str,
+        video_path: Optional[str] = None,
+        image_base64: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of `chat`.
+
+        Yields `stage` events while routing and running tools, `token` events with the
+        final answer as it is generated, and a closing `done` event with the full response,
+        or an `error` event if the streamed answer does not validate against its response model.
+        """
+        opik_context.update_current_trace(thread_id=self.thread_id)
+
+        yield {"event": "stage", "data": {"stage": "routing"}}
+        tool_required = video_path and await self._should_use_tool(message)
+        logger.info(f"Tool required: {tool_required}")
+
+        response = None
+        tool_response = None
+        if tool_required:
+            chat_history, tool_message = await self._select_tool_calls(message, image_base64)
+            if tool_message.tool_calls:
+                extracts_clip = any(
+                    tool_call.function.name.startswith("get_video_clip") for tool_call in tool_message.tool_calls
+                )
+                yield {"event": "stage", "data": {"stage": "extracting clip" if extracts_clip else "searching"}}
+                response_model, tool_response = await self._execute_tool_calls(
+                    tool_message.tool_calls, chat_history, video_path, image_base64
+                )
+                completion_kwargs = dict(model=settings.GROQ_TOOL_USE_MODEL, response_model=response_model)
+            else:
+                response = GeneralResponseModel(message=tool_message.content)
+        else:
+            chat_history = self._build_chat_history(self.general_system_prompt, message)
+            completion_kwargs = dict(model=settings.GROQ_GENERAL_MODEL, response_model=GeneralResponseModel)
+
+        yield {"event": "stage", "data": {"stage": "responding"}}
+        if response is None:
+            streamed_message = ""
+            async for partial in self._stream_structured_completion(
+                messages=chat_history,
+                timeout=settings.GROQ_REQUEST_TIMEOUT_SECONDS,
+                **completion_kwargs,
+            ):
+                partial_message = partial.message or ""
+                if len(partial_message) > len(streamed_message):
+                    yield {"event": "token", "data": {"token": partial_message[len(streamed_message) :]}}
+                    streamed_message = partial_message
+                response = partial
+            try:
+                response = completion_kwargs["response_model"].model_validate(
+                    response.model_dump() if response is not None else {}
+                )
+            except ValidationError as e:
+                logger.error(f"Streamed response failed validation: {e}")
+                yield {"event": "error", "data": {"detail": f"Invalid response from the model: {e}"}}
+                return
+            response = self._finalize_tool_response(response, tool_response)
+        else:
+            yield {"event": "token", "data": {"token": response.message}}
+
+        self._add_memory_pair(message, response.message)
+        self._schedule_compaction()
+
+        yield {"event": "done", "data": AssistantMessageResponse(**response.model_dump()).model_dump()}
@@ -1,9 +1,25 @@
+import asyncio
+import uuid
+from collections import deque
 from datetime import datetime
+from typing import Awaitable, Callable
 
 import pixeltable as pxt
 from loguru import logger
 from pydantic import BaseModel
 
+from kubrick_api.config import get_settings
+
+settings = get_settings()
+
+DEFAULT_SESSION_ID = "default"
+SUMMARY_ROLE = "summary"
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text (~4 characters per token)."""
+    return len(text) // 4 + 1
+
 
 class MemoryRecord(BaseModel):
     message_id: str
@@ -12,11 +28,40 @@ class MemoryRecord(BaseModel):
     timestamp: datetime
 
 
+Summarizer = Callable[[str | None, list[MemoryRecord]], Awaitable[str]]
+
+
 class Memory:
-    def __init__(self, name: str):
+    """
+    Conversation memory of a single session.
+
+    All sessions of an agent share one Pixeltable table under the `name` directory and are
+    told apart by the `session_id` column, so the number of tables does not grow with users.
+
+    The latest `buffer_size` records are kept in a write-through ring buffer, so building the
+    chat history does not touch the table once the buffer is warm.
+
+    Older messages can be folded into a rolling summary with `compact()`. The summary is stored
+    as a record with the `summary` role, timestamped with the last message it covers; messages up
+    to that timestamp are no longer returned by `get_latest()`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        session_id: str = DEFAULT_SESSION_ID,
+        reset: bool = True,
+        buffer_size: int = settings.AGENT_MEMORY_SIZE,
+    ):
         self.directory = name
+        self.session_id = session_id
+        self._buffer: deque[MemoryRecord] | None = deque(maxlen=buffer_size) if reset else None
+        self._buffer_size = buffer_size
+        self._summary: MemoryRecord | None = None
+        self._summary_loaded = reset
+        self._compaction_lock = asyncio.Lock()
 
-        pxt.create_dir(self.directory, if_exists="replace_force")
+        pxt.create_dir(self.directory, if_exists="replace_force" if reset else "ignore")
 
         self._setup_table()
         self._memory_table = pxt.get_table(f"{self.directory}.memory")
@@ -25,6 +70,7 @@ class Memory:
         self._memory_table = pxt.create_table(
             f"{self.directory}.memory",
             {
+                "session_id": pxt.String,
                 "message_id": pxt.String,
                 "role": pxt.String,
                 "content": pxt.String,
@@ -32,19 +78,124 @@ class Memory:
             },
             if_exists="ignore",
         )
+        if "session_id" not in self._memory_table.columns():
+            logger.info(f"Adding the session_id column to {self.directory}.memory")
+            self._memory_table.add_column(session_id=pxt.String)
+            self._memory_table.update(
+                {"session_id": DEFAULT_SESSION_ID}, where=self._memory_table.session_id == None  # noqa: E711
+            )
+
+    def _session_rows(self, summaries: bool = False):
+        role_filter = (
+            self._memory_table.role == SUMMARY_ROLE if summaries else self._memory_table.role != SUMMARY_ROLE
+        )
+        return self._memory_table.where((self._memory_table.session_id == self.session_id) & role_filter)
 
     def reset_memory(self):
-        logger.info(f"Resetting memory: {self.directory}")
-        pxt.drop_dir(self.directory, if_not_exists="ignore", force=True)
+        logger.info(f"Resetting memory: {self.directory} (session '{self.session_id}')")
+        self._memory_table.delete(where=self._memory_table.session_id == self.session_id)
+        self._buffer = deque(maxlen=self._buffer_size)
+        self._summary = None
+        self._summary_loaded = True
 
     def insert(self, memory_record: MemoryRecord):
-        self._memory_table.insert([memory_record.dict()])
+        self._memory_table.insert([{"session_id": self.session_id, **memory_record.model_dump()}])
+        if self._buffer is not None:
+            self._buffer.append(memory_record)
+
+    def _select_records(self, summaries: bool = False):
+        return self._session_rows(summaries).select(
+            self._memory_table.message_id,
+            self._memory_table.role,
+            self._memory_table.content,
+            self._memory_table.timestamp,
+        )
 
     def get_all(self) -> list[MemoryRecord]:
-        return [MemoryRecord(**record) for record in self._memory_table.collect()]
+        records = self._select_records().order_by(self._memory_table.timestamp)
+        return [MemoryRecord(**record) for record in records.collect()]
+
+    def _read_latest(self, n: int) -> list[MemoryRecord]:
+        """Read only the latest `n` records of the session from the table, oldest first."""
+        records = self._select_records().order_by(self._memory_table.timestamp, asc=False).limit(n)
+        return [MemoryRecord(**record) for record in reversed(records.collect())]
+
+    def get_latest(self, n: int, include_compacted: bool = False) -> list[MemoryRecord]:
+        """Get the latest `n` messages, skipping the ones already folded into the summary."""
+        if n <= 0:
+            return []
+        if n > self._buffer_size:
+            records = self._read_latest(n)
+        else:
+            if self._buffer is None:
+                self._buffer = deque(self._read_latest(self._buffer_size), maxlen=self._buffer_size)
+            records = list(self._buffer)[-n:]
+
+        summary = None if include_compacted else self.get_summary()
+        if summary is None:
+            return records
+        return [record for record in records if record.timestamp > summary.timestamp]
+
+    def get_summary(self) -> MemoryRecord | None:
+        """Get the rolling summary of the compacted messages, if any."""
+        if not self._summary_loaded:
+            summaries = (
+                self._select_records(summaries=True).order_by(self._memory_table.timestamp, asc=False).limit(1)
+            )
+            self._summary = next((MemoryRecord(**record) for record in summaries.collect()), None)
+            self._summary_loaded = True
+        return self._summary
+
+    async def compact(self, summarize: Summarizer, token_budget: int, n: int, keep_last: int = 2) -> int:
+        """
+        Fold the oldest of the latest `n` messages into the rolling summary until the summary and
+        the remaining messages fit in `token_budget`. The last `keep_last` messages are always kept.
+        Concurrent compactions of the session run one after the other.
+
+        Args:
+            summarize: Coroutine receiving the previous summary and the messages to fold, returning the new summary.
+            token_budget: Maximum estimated tokens for the summary plus the remaining messages.
+            n: Number of latest messages considered, usually the chat history window.
+            keep_last: Number of most recent messages that are never folded.
+
+        Returns:
+            int: Number of messages folded into the summary.
+        """
+        async with self._compaction_lock:
+            return await self._compact(summarize, token_budget, n, keep_last)
+
+    async def _compact(self, summarize: Summarizer, token_budget: int, n: int, keep_last: int) -> int:
+        records = self.get_latest(n)
+        summary = self.get_summary()
+        total_tokens = sum(estimate_tokens(record.content) for record in records)
+        if summary:
+            total_tokens += estimate_tokens(summary.content)
+        if total_tokens <= token_budget:
+            return 0
+
+        folded = []
+        while len(records) > keep_last and total_tokens > token_budget:
+            record = records.pop(0)
+            folded.append(record)
+            total_tokens -= estimate_tokens(record.content)
+        if not folded:
+            return 0
+
+        summary_text = await summarize(summary.content if summary else None, folded)
+        new_summary = MemoryRecord(
+            message_id=str(uuid.uuid4()),
+            role=SUMMARY_ROLE,
+            content=summary_text,
+            timestamp=folded[-1].timestamp,
+        )
+        self._memory_table.insert([{"session_id": self.session_id, **new_summary.model_dump()}])
+        self._summary = new_summary
+        self._summary_loaded = True
 
-    def get_latest(self, n: int) -> list[MemoryRecord]:
-        return self.get_all()[-n:]
+        logger.info(f"Compacted {len(folded)} messages of session '{self.session_id}' into the rolling summary")
+        return len(folded)
 
     def get_by_message_id(self, message_id: str) -> MemoryRecord:
-        return self._memory_table.where(self._memory_table.message_id == message_id).collect()[0]
+        return self._memory_table.where(
+            (self._memory_table.session_id == self.session_id) & (self._memory_table.message_id == message_id)
+        ).collect()[0]
@@ -0,0 +1,76 @@
+import time
+import weakref
+from collections import OrderedDict
+
+from loguru import logger
+
+from kubrick_api.agent.base_agent import BaseAgent
+from kubrick_api.agent.memory import DEFAULT_SESSION_ID, Memory
+
+logger = logger.bind(name="SessionManager")
+
+
+class SessionManager:
+    """
+    Keeps per-session views of a shared agent.
+
+    Each session gets its own `Memory`, while MCP sessions, LLM clients, tools and prompts
+    stay shared with the base agent. The base agent's memory serves the default session and
+    is never evicted, so there is a single `Memory` over the rows of each session. At most
+    `max_sessions` other memories are kept live; the least recently used ones, and those idle
+    for longer than `idle_ttl_seconds`, are evicted. Their messages stay persisted in the shared
+    memory table and are rehydrated on the next request. An evicted memory still in use, such as
+    by a background compaction, is handed out again instead, so that a session never has two.
+    """
+
+    def __init__(self, agent: BaseAgent, max_sessions: int, idle_ttl_seconds: float):
+        self.agent = agent
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        self._memories: OrderedDict[str, Memory] = OrderedDict({DEFAULT_SESSION_ID: agent.memory})
+        self._last_used: dict[str, float] = {}
+        # Every memory handed out and still referenced somewhere, evicted or not.
+        self._live_memories: weakref.WeakValueDictionary[str, Memory] = weakref.WeakValueDictionary(self._memories)
+
+    def __len__(self) -> int:
+        return len(self._memories)
+
+    def _evict(self, session_id: str) -> None:
+        if session_id == DEFAULT_SESSION_ID:
+            return
+        self._memories.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        logger.info(f"Evicted session '{session_id}'")
+
+    def evict_idle(self) -> None:
+        """Evict idle sessions, then the least recently used ones above capacity."""
+        now = time.monotonic()
+        for session_id in [sid for sid, last_used in self._last_used.items() if now - last_used > self.idle_ttl_seconds]:
+            self._evict(session_id)
+        evictable = [sid for sid in self._memories if sid != DEFAULT_SESSION_ID]
+        for session_id in evictable[: max(len(evictable) - self.max_sessions, 0)]:
+            self._evict(session_id)
+
+    def get_memory(self, session_id: str | None = None) -> Memory:
+        session_id = session_id or DEFAULT_SESSION_ID
+        memory = self._memories.get(session_id)
+        if memory is None:
+            memory = self._live_memories.get(session_id)
+            if memory is None:
+                logger.info(f"Loading session '{session_id}'")
+                memory = Memory(self.agent.name, session_id=session_id, reset=False)
+                self._live_memories[session_id] = memory
+            self._memories[session_id] = memory
+        self._memories.move_to_end(session_id)
+        self._last_used[session_id] = time.monotonic()
+        self.evict_idle()
+        return memory
+
+    def get_agent(self, session_id: str | None = None) -> BaseAgent:
+        """Return the agent bound to the memory of the given session."""
+        session_id = session_id or DEFAULT_SESSION_ID
+        return self.agent.for_session(session_id, self.get_memory(session_id))
+
+    def reset(self, session_id: str | None = None) -> None:
+        self.get_memory(session_id).reset_memory()
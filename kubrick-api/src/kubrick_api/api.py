@@ -1,23 +1,25 @@
+import json
 import shutil
 from contextlib import asynccontextmanager
-from enum import Enum
 from pathlib import Path
-from uuid import uuid4
 
 import click
-from fastapi import BackgroundTasks, FastAPI, File, HTTPException, Request, UploadFile
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastmcp.client import Client
 from loguru import logger
 
-from kubrick_api.agent import GroqAgent
+from kubrick_api.agent import GroqAgent, Memory, SessionManager
 from kubrick_api.config import get_settings
+from kubrick_api.job_queue import Job, JobQueue, JobStore, NonRetryableJobError, ProgressReporter, TaskStatus
 from kubrick_api.models import (
     AssistantMessageResponse,
     ProcessVideoRequest,
     ProcessVideoResponse,
+    ProcessVideosRequest,
+    ResetMemoryRequest,
     ResetMemoryResponse,
     UserMessageRequest,
     VideoUploadResponse,
@@ -26,12 +28,55 @@ from kubrick_api.models import (
 settings = get_settings()
 
 
-class TaskStatus(str, Enum):
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    NOT_FOUND = "not_found"
+def report_mcp_progress(report_progress: ProgressReporter, message: str | None):
+    """Store a JSON progress message of an MCP tool on the job, ignoring messages that are not JSON."""
+    if not message:
+        return
+    try:
+        progress = json.loads(message)
+    except json.JSONDecodeError:
+        logger.warning(f"Ignoring non-JSON progress message: {message}")
+        return
+    if isinstance(progress, dict):
+        report_progress(progress)
+
+
+async def process_video_job(job: Job, report_progress: ProgressReporter):
+    """
+    Job handler that processes a video through the MCP server
+
+    The MCP tool sends its per-stage ingestion progress as JSON progress messages,
+    which are stored on the job and exposed by /task-status.
+    """
+    video_path = job.payload["video_path"]
+    if not Path(video_path).exists():
+        raise NonRetryableJobError(f"Video file not found: {video_path}")
+
+    async def progress_handler(progress: float, total: float | None, message: str | None):
+        report_mcp_progress(report_progress, message)
+
+    mcp_client = Client(settings.MCP_SERVER, progress_handler=progress_handler)
+    async with mcp_client:
+        _ = await mcp_client.call_tool("process_video", {"video_path": video_path})
+
+
+async def process_videos_job(job: Job, report_progress: ProgressReporter):
+    """
+    Job handler that processes a batch of videos in parallel through the MCP server
+
+    The aggregate batch progress reported by the MCP tool is stored on the job.
+    """
+    video_paths = job.payload["video_paths"]
+    missing = [video_path for video_path in video_paths if not Path(video_path).exists()]
+    if missing:
+        raise NonRetryableJobError(f"Video files not found: {', '.join(missing)}")
+
+    async def progress_handler(progress: float, total: float | None, message: str | None):
+        report_mcp_progress(report_progress, message)
+
+    mcp_client = Client(settings.MCP_SERVER, progress_handler=progress_handler)
+    async with mcp_client:
+        _ = await mcp_client.call_tool("process_videos", {"video_paths": video_paths})
 
 
 @asynccontextmanager
@@ -39,11 +84,27 @@ async def lifespan(app: FastAPI):
     app.state.agent = GroqAgent(
         name="kubrick",
         mcp_server=settings.MCP_SERVER,
-        disable_tools=["process_video"],
+        memory=Memory("kubrick", reset=False),
+        disable_tools=["process_video", "process_videos"],
     )
-    app.state.bg_task_states = dict()
+    app.state.sessions = SessionManager(
+        app.state.agent,
+        max_sessions=settings.MAX_LIVE_SESSIONS,
+        idle_ttl_seconds=settings.SESSION_IDLE_TTL_SECONDS,
+    )
+    app.state.job_queue = JobQueue(
+        JobStore(settings.JOB_STORE_PATH),
+        num_workers=settings.JOB_WORKERS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_backoff_seconds=settings.JOB_RETRY_BACKOFF_SECONDS,
+        poll_interval_seconds=settings.JOB_POLL_INTERVAL_SECONDS,
+    )
+    app.state.job_queue.register("process_video", process_video_job)
+    app.state.job_queue.register("process_videos", process_videos_job)
+    app.state.job_queue.start()
     yield
-    app.state.agent.reset_memory()
+    await app.state.job_queue.stop()
+    await app.state.agent.close()
 
 
 app = FastAPI(
@@ -76,40 +137,56 @@ async def root():
 
 @app.get("/task-status/{task_id}")
 async def get_task_status(task_id: str, fastapi_request: Request):
-    status = fastapi_request.app.state.bg_task_states.get(task_id, TaskStatus.NOT_FOUND)
+    job = fastapi_request.app.state.job_queue.get(task_id)
+    if job is None:
+        return {"task_id": task_id, "status": TaskStatus.NOT_FOUND}
+    return {
+        "task_id": task_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "progress": job.progress,
+    }
+
+
+@app.post("/cancel-task/{task_id}")
+async def cancel_task(task_id: str, fastapi_request: Request):
+    """
+    Cancel a pending or running task
+
+    A running task is cancelled on a best-effort basis and reported as `cancel_requested`:
+    the MCP server may still finish the work it already started.
+    """
+    status = fastapi_request.app.state.job_queue.cancel(task_id)
+    if status is None:
+        raise HTTPException(status_code=409, detail="Task not found or already finished")
     return {"task_id": task_id, "status": status}
 
 
 @app.post("/process-video")
-async def process_video(request: ProcessVideoRequest, bg_tasks: BackgroundTasks, fastapi_request: Request):
+async def process_video(request: ProcessVideoRequest, fastapi_request: Request):
     """
-    Process a video and return the results
+    Enqueue a video for processing and return the task id
     """
-    task_id = str(uuid4())
-    bg_task_states = fastapi_request.app.state.bg_task_states
-
-    async def background_process_video(video_path: str, task_id: str):
-        """
-        Background task to process the video
-        """
-        bg_task_states[task_id] = TaskStatus.IN_PROGRESS
+    job = fastapi_request.app.state.job_queue.enqueue(
+        "process_video", {"video_path": request.video_path}, priority=request.priority
+    )
+    return ProcessVideoResponse(message="Task enqueued for processing", task_id=job.job_id)
 
-        if not Path(video_path).exists():
-            bg_task_states[task_id] = TaskStatus.FAILED
-            raise HTTPException(status_code=404, detail="Video file not found")
 
-        try:
-            mcp_client = Client(settings.MCP_SERVER)
-            async with mcp_client:
-                _ = await mcp_client.call_tool("process_video", {"video_path": request.video_path})
-        except Exception as e:
-            logger.error(f"Error processing video {video_path}: {e}")
-            bg_task_states[task_id] = TaskStatus.FAILED
-            raise HTTPException(status_code=500, detail=str(e))
-        bg_task_states[task_id] = TaskStatus.COMPLETED
+@app.post("/process-videos")
+async def process_videos(request: ProcessVideosRequest, fastapi_request: Request):
+    """
+    Enqueue a batch of videos for parallel processing and return the task id
 
-    bg_tasks.add_task(background_process_video, request.video_path, task_id)
-    return ProcessVideoResponse(message="Task enqueued for processing", task_id=task_id)
+    The task status reports the aggregate progress of the batch.
+    """
+    if not request.video_paths:
+        raise HTTPException(status_code=400, detail="No video paths provided")
+    job = fastapi_request.app.state.job_queue.enqueue(
+        "process_videos", {"video_paths": request.video_paths}, priority=request.priority
+    )
+    return ProcessVideoResponse(message=f"{len(request.video_paths)} videos enqueued for processing", task_id=job.job_id)
 
 
 @app.post("/chat", response_model=AssistantMessageResponse)
@@ -123,8 +200,8 @@ async def chat(request: UserMessageRequest, fastapi_request: Request):
     Returns:
         ChatResponse containing the assistant's response
     """
-    agent = fastapi_request.app.state.agent
-    await agent.setup()
+    await fastapi_request.app.state.agent.setup()
+    agent = fastapi_request.app.state.sessions.get_agent(request.session_id)
 
     try:
         response = await agent.chat(request.message, request.video_path, request.image_base64)
@@ -133,13 +210,40 @@ async def chat(request: UserMessageRequest, fastapi_request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: UserMessageRequest, fastapi_request: Request):
+    """
+    Chat with the AI assistant, streaming the response as Server-Sent Events
+
+    Emits `stage` events while the agent routes the message and runs tools, `token`
+    events with the answer as it is generated, and a final `done` event carrying the
+    same payload as the /chat endpoint.
+    """
+    await fastapi_request.app.state.agent.setup()
+    agent = fastapi_request.app.state.sessions.get_agent(request.session_id)
+
+    async def event_stream():
+        try:
+            async for event in agent.chat_stream(request.message, request.video_path, request.image_base64):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/reset-memory")
-async def reset_memory(fastapi_request: Request):
+async def reset_memory(fastapi_request: Request, request: ResetMemoryRequest | None = None):
     """
-    Reset the memory of the agent
+    Reset the memory of a chat session (the default session if none is given)
     """
-    agent = fastapi_request.app.state.agent
-    agent.reset_memory()
+    session_id = request.session_id if request else None
+    fastapi_request.app.state.sessions.reset(session_id)
     return ResetMemoryResponse(message="Memory reset successfully")
 
 
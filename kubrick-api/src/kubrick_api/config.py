@@ -12,6 +12,12 @@ class Settings(BaseSettings):
     GROQ_TOOL_USE_MODEL: str = "meta-llama/llama-4-maverick-17b-128e-instruct"
     GROQ_IMAGE_MODEL: str = "meta-llama/llama-4-maverick-17b-128e-instruct"
     GROQ_GENERAL_MODEL: str = "meta-llama/llama-4-maverick-17b-128e-instruct"
+    GROQ_SUMMARY_MODEL: str = "meta-llama/llama-4-scout-17b-16e-instruct"
+    GROQ_ASYNC_CLIENT: bool = True
+    GROQ_MAX_CONNECTIONS: int = 100
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GROQ_ROUTING_TIMEOUT_SECONDS: float = 10.0
+    GROQ_REQUEST_TIMEOUT_SECONDS: float = 60.0
 
     # --- Comet ML & Opik Configuration ---
     OPIK_API_KEY: str | None = Field(default=None, description="API key for Comet ML and Opik services.")
@@ -23,9 +29,30 @@ class Settings(BaseSettings):
 
     # --- Memory Configuration ---
     AGENT_MEMORY_SIZE: int = 20
+    AGENT_MEMORY_COMPACTION: bool = True
+    AGENT_MEMORY_TOKEN_BUDGET: int = 2000
+    AGENT_MEMORY_SUMMARY_MAX_TOKENS: int = 512
+
+    # --- Session Configuration ---
+    MAX_LIVE_SESSIONS: int = 256
+    SESSION_IDLE_TTL_SECONDS: float = 1800.0
+
+    # --- Tool Execution Configuration ---
+    AGENT_TOOL_CALL_CONCURRENCY: int = 4
+    AGENT_TOOL_CALL_TIMEOUT_SECONDS: float = 120.0
 
     # --- MCP Configuration ---
     MCP_SERVER: str = "http://kubrick-mcp:9090/mcp"
+    MCP_POOL_SIZE: int = 4
+    MCP_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    MCP_METADATA_REFRESH_SECONDS: float = 300.0
+
+    # --- Video Processing Job Queue Configuration ---
+    JOB_STORE_PATH: str = ".jobs/jobs.db"
+    JOB_WORKERS: int = 2
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
 
     # --- Disable Nest Asyncio ---
     DISABLE_NEST_ASYNCIO: bool = True
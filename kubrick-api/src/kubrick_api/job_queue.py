@@ -0,0 +1,284 @@
+import asyncio
+import json
+import sqlite3
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from loguru import logger
+from pydantic import BaseModel
+
+logger = logger.bind(name="JobQueue")
+
+
+class TaskStatus(str, Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    CANCEL_REQUESTED = "cancel_requested"
+    NOT_FOUND = "not_found"
+
+
+class NonRetryableJobError(Exception):
+    """Raised by a job handler when retrying the job cannot succeed."""
+
+
+class Job(BaseModel):
+    job_id: str
+    kind: str
+    payload: Dict[str, Any]
+    status: TaskStatus
+    priority: int
+    attempts: int
+    max_attempts: int
+    next_run_at: float
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    created_at: float
+    updated_at: float
+
+
+ProgressReporter = Callable[[Dict[str, Any]], None]
+JobHandler = Callable[[Job, ProgressReporter], Awaitable[Any]]
+
+
+class JobStore:
+    """
+    SQLite-backed persistent store of background jobs.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                attempts INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                next_run_at REAL NOT NULL,
+                error TEXT,
+                progress TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue_idx ON jobs (status, priority, created_at)")
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        progress = json.loads(row["progress"]) if row["progress"] else None
+        return Job(**{**dict(row), "payload": json.loads(row["payload"]), "progress": progress})
+
+    def add(self, kind: str, payload: Dict[str, Any], priority: int, max_attempts: int) -> Job:
+        now = time.time()
+        job = Job(
+            job_id=str(uuid4()),
+            kind=kind,
+            payload=payload,
+            status=TaskStatus.PENDING,
+            priority=priority,
+            attempts=0,
+            max_attempts=max_attempts,
+            next_run_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        self._conn.execute(
+            """
+            INSERT INTO jobs (job_id, kind, payload, status, priority, attempts, max_attempts,
+                              next_run_at, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                job.job_id,
+                job.kind,
+                json.dumps(job.payload),
+                job.status.value,
+                job.priority,
+                job.attempts,
+                job.max_attempts,
+                job.next_run_at,
+                job.error,
+                job.created_at,
+                job.updated_at,
+            ),
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def claim_next(self) -> Optional[Job]:
+        """Atomically move the highest-priority runnable job to in_progress and return it."""
+        now = time.time()
+        row = self._conn.execute(
+            """
+            UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?
+            WHERE job_id = (
+                SELECT job_id FROM jobs
+                WHERE status = ? AND next_run_at <= ?
+                ORDER BY priority DESC, created_at
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            (TaskStatus.IN_PROGRESS.value, now, TaskStatus.PENDING.value, now),
+        ).fetchone()
+        return self._to_job(row) if row else None
+
+    def update(self, job_id: str, status: TaskStatus, error: Optional[str] = None, next_run_at: Optional[float] = None):
+        now = time.time()
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, next_run_at = COALESCE(?, next_run_at), updated_at = ? WHERE job_id = ?",
+            (status.value, error, next_run_at, now, job_id),
+        )
+
+    def set_progress(self, job_id: str, progress: Dict[str, Any]):
+        self._conn.execute(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE job_id = ?",
+            (json.dumps(progress), time.time(), job_id),
+        )
+
+    def cancel_pending(self, job_id: str) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+            (TaskStatus.CANCELLED.value, time.time(), job_id, TaskStatus.PENDING.value),
+        )
+        return cursor.rowcount > 0
+
+    def requeue_interrupted(self) -> int:
+        """Put jobs left in_progress by a previous process back in the queue."""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+            (TaskStatus.PENDING.value, time.time(), TaskStatus.IN_PROGRESS.value),
+        )
+        return cursor.rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+class JobQueue:
+    """
+    Persistent priority job queue processed by a fixed pool of asyncio workers.
+
+    Failed jobs are retried with exponential backoff up to their `max_attempts`, unless the
+    handler raises `NonRetryableJobError`. Jobs interrupted by a restart are re-queued on start.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        num_workers: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        poll_interval_seconds: float,
+    ):
+        self.store = store
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: list[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def start(self):
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Re-queued {requeued} interrupted jobs")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.store.close()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], priority: int = 0) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job = self.store.add(kind, payload, priority=priority, max_attempts=self.max_attempts)
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[TaskStatus]:
+        """
+        Cancel a pending or running job.
+
+        A pending job is cancelled before it starts. Cancelling a running job is best-effort:
+        its handler task is cancelled, which closes its MCP session, but work already handed
+        to the MCP server may still run to completion there.
+
+        Returns:
+            Optional[TaskStatus]: `CANCELLED` for a pending job, `CANCEL_REQUESTED` for a running
+            one, or None if the job does not exist or already finished.
+        """
+        if self.store.cancel_pending(job_id):
+            return TaskStatus.CANCELLED
+        running = self._running.get(job_id)
+        if running is not None:
+            running.cancel()
+            return TaskStatus.CANCEL_REQUESTED
+        return None
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            logger.info(f"Worker {worker_id} running job {job.job_id} ({job.kind}, attempt {job.attempts})")
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        def report_progress(progress: Dict[str, Any]):
+            self.store.set_progress(job.job_id, progress)
+
+        task = asyncio.create_task(self._handlers[job.kind](job, report_progress))
+        self._running[job.job_id] = task
+        try:
+            await task
+            self.store.update(job.job_id, TaskStatus.COMPLETED)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The worker itself is being stopped; the job is re-queued on the next start.
+                task.cancel()
+                raise
+            logger.info(f"Job {job.job_id} cancelled")
+            self.store.update(job.job_id, TaskStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed on attempt {job.attempts}: {e}")
+            if isinstance(e, NonRetryableJobError) or job.attempts >= job.max_attempts:
+                self.store.update(job.job_id, TaskStatus.FAILED, error=str(e))
+            else:
+                delay = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                self.store.update(job.job_id, TaskStatus.PENDING, error=str(e), next_run_at=time.time() + delay)
+        finally:
+            self._running.pop(job.job_id, None)
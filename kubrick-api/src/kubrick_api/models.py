@@ -3,6 +3,12 @@ from pydantic import BaseModel, Field
 
 class ProcessVideoRequest(BaseModel):
     video_path: str
+    priority: int = 0
+
+
+class ProcessVideosRequest(BaseModel):
+    video_paths: list[str]
+    priority: int = 0
 
 
 class ProcessVideoResponse(BaseModel):
@@ -12,6 +18,7 @@ class ProcessVideoResponse(BaseModel):
 
 class UserMessageRequest(BaseModel):
     message: str
+    session_id: str | None = None
     video_path: str | None = None
     image_base64: str | None = None
 
@@ -21,6 +28,10 @@ class AssistantMessageResponse(BaseModel):
     clip_path: str | None = None
 
 
+class ResetMemoryRequest(BaseModel):
+    session_id: str | None = None
+
+
 class ResetMemoryResponse(BaseModel):
     message: str
 
@@ -0,0 +1,4 @@
+import os
+
+# The settings require an API key, which no test calls out with.
+os.environ.setdefault("GROQ_API_KEY", "test")
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+
+from kubrick_api.job_queue import JobQueue, JobStore, NonRetryableJobError, TaskStatus
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+def make_queue(store: JobStore, max_attempts: int = 3, retry_backoff_seconds: float = 10.0) -> JobQueue:
+    return JobQueue(
+        store,
+        num_workers=1,
+        max_attempts=max_attempts,
+        retry_backoff_seconds=retry_backoff_seconds,
+        poll_interval_seconds=0.01,
+    )
+
+
+def test_claim_next_follows_priority_then_age(store):
+    low = store.add("ingest", {"video": "low"}, priority=0, max_attempts=3)
+    high = store.add("ingest", {"video": "high"}, priority=5, max_attempts=3)
+    low_too = store.add("ingest", {"video": "low too"}, priority=0, max_attempts=3)
+
+    claimed = [store.claim_next() for _ in range(3)]
+
+    assert [job.job_id for job in claimed] == [high.job_id, low.job_id, low_too.job_id]
+    assert all(job.status == TaskStatus.IN_PROGRESS and job.attempts == 1 for job in claimed)
+    assert store.claim_next() is None
+
+
+def test_claim_next_waits_for_retry_time(store):
+    job = store.add("ingest", {}, priority=0, max_attempts=3)
+    store.update(job.job_id, TaskStatus.PENDING, next_run_at=time.time() + 60)
+
+    assert store.claim_next() is None
+
+
+def test_failed_job_is_retried_with_exponential_backoff(store):
+    queue = make_queue(store, max_attempts=3, retry_backoff_seconds=10.0)
+    attempts = []
+
+    async def handler(job, report_progress):
+        attempts.append(job.attempts)
+        raise ValueError("transient")
+
+    queue.register("ingest", handler)
+    job = queue.enqueue("ingest", {})
+    delays = []
+    for _ in range(3):
+        started = time.time()
+        asyncio.run(queue._run(store.claim_next()))
+        retried = store.get(job.job_id)
+        if retried.status == TaskStatus.PENDING:
+            delays.append(retried.next_run_at - started)
+            # Make the retry runnable now instead of waiting for its backoff.
+            store.update(job.job_id, TaskStatus.PENDING, error=retried.error, next_run_at=time.time())
+
+    failed = store.get(job.job_id)
+    assert attempts == [1, 2, 3]
+    assert delays == pytest.approx([10.0, 20.0], abs=1.0)
+    assert (failed.status, failed.attempts, failed.error) == (TaskStatus.FAILED, 3, "transient")
+
+
+def test_non_retryable_error_fails_job_at_once(store):
+    queue = make_queue(store, max_attempts=3)
+
+    async def handler(job, report_progress):
+        raise NonRetryableJobError("video not found")
+
+    queue.register("ingest", handler)
+    job = queue.enqueue("ingest", {})
+    asyncio.run(queue._run(store.claim_next()))
+
+    failed = store.get(job.job_id)
+    assert (failed.status, failed.attempts, failed.error) == (TaskStatus.FAILED, 1, "video not found")
+    assert store.claim_next() is None
+
+
+def test_cancel_pending_job(store):
+    queue = make_queue(store)
+    queue.register("ingest", lambda job, report_progress: asyncio.sleep(0))
+    job = queue.enqueue("ingest", {})
+
+    assert queue.cancel(job.job_id) == TaskStatus.CANCELLED
+    assert store.get(job.job_id).status == TaskStatus.CANCELLED
+    assert store.claim_next() is None
+    assert queue.cancel(job.job_id) is None
+    assert queue.cancel("unknown") is None
+
+
+def test_cancel_running_job(store):
+    queue = make_queue(store)
+    started = asyncio.Event()
+
+    async def handler(job, report_progress):
+        started.set()
+        await asyncio.sleep(3600)
+
+    queue.register("ingest", handler)
+    job = queue.enqueue("ingest", {})
+
+    async def run_and_cancel():
+        run = asyncio.create_task(queue._run(store.claim_next()))
+        await started.wait()
+        status = queue.cancel(job.job_id)
+        await run
+        return status
+
+    assert asyncio.run(run_and_cancel()) == TaskStatus.CANCEL_REQUESTED
+    assert store.get(job.job_id).status == TaskStatus.CANCELLED
+    assert queue.cancel(job.job_id) is None
+
+
+def test_start_requeues_interrupted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    interrupted = JobStore(path)
+    job = interrupted.add("ingest", {"video": "a.mp4"}, priority=0, max_attempts=3)
+    interrupted.claim_next()
+    interrupted.close()
+
+    store = JobStore(path)
+    queue = make_queue(store)
+    runs = []
+
+    async def handler(job, report_progress):
+        runs.append(job.attempts)
+        report_progress({"stage": "done"})
+
+    queue.register("ingest", handler)
+
+    async def run_queue():
+        queue.start()
+        while store.get(job.job_id).status != TaskStatus.COMPLETED:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(asyncio.wait_for(run_queue(), timeout=5))
+
+    assert runs == [2]
+    reopened = JobStore(path)
+    assert reopened.get(job.job_id).progress == {"stage": "done"}
+    reopened.close()
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pixeltable as pxt
+import pytest
+
+from kubrick_api.agent.memory import SUMMARY_ROLE, Memory, MemoryRecord
+
+TEST_DIR = "kubrick_api_tests"
+START = datetime(2025, 1, 1)
+
+
+def make_record(index: int, content: str | None = None) -> MemoryRecord:
+    return MemoryRecord(
+        message_id=f"message-{index}",
+        role="user" if index % 2 == 0 else "assistant",
+        content=content or f"message {index}",
+        timestamp=START + timedelta(seconds=index),
+    )
+
+
+def run(coroutine):
+    # Pixeltable applies nest_asyncio, whose asyncio.run reuses the current event loop even once it is closed.
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def memory():
+    memory = Memory(TEST_DIR, session_id="alice", buffer_size=3)
+    yield memory
+    pxt.drop_dir(TEST_DIR, force=True, if_not_exists="ignore")
+
+
+def test_ring_buffer_keeps_latest_records(memory):
+    for index in range(5):
+        memory.insert(make_record(index))
+
+    assert [record.message_id for record in memory._buffer] == ["message-2", "message-3", "message-4"]
+    assert [record.message_id for record in memory.get_latest(2)] == ["message-3", "message-4"]
+    # More records than the buffer holds are read from the table.
+    assert [record.message_id for record in memory.get_latest(5)] == [f"message-{index}" for index in range(5)]
+
+
+def test_reload_reads_latest_records_lazily(memory):
+    for index in range(5):
+        memory.insert(make_record(index))
+    Memory(TEST_DIR, session_id="bob", reset=False).insert(make_record(10))
+
+    reloaded = Memory(TEST_DIR, session_id="alice", reset=False, buffer_size=3)
+
+    assert reloaded._buffer is None
+    assert [record.message_id for record in reloaded.get_latest(3)] == ["message-2", "message-3", "message-4"]
+    assert [record.message_id for record in reloaded._buffer] == ["message-2", "message-3", "message-4"]
+    assert len(reloaded.get_all()) == 5
+
+
+def test_compact_folds_oldest_messages_into_summary(memory):
+    for index in range(3):
+        memory.insert(make_record(index, content="x" * 400))
+    folded_batches = []
+
+    async def summarize(previous: str | None, records: list[MemoryRecord]) -> str:
+        folded_batches.append((previous, [record.message_id for record in records]))
+        return "summary of the first messages"
+
+    folded = run(memory.compact(summarize, token_budget=150, n=3, keep_last=1))
+
+    assert folded == 2
+    assert folded_batches == [(None, ["message-0", "message-1"])]
+    summary = memory.get_summary()
+    assert (summary.role, summary.content) == (SUMMARY_ROLE, "summary of the first messages")
+    assert summary.timestamp == make_record(1).timestamp
+    assert [record.message_id for record in memory.get_latest(3)] == ["message-2"]
+    assert len(memory.get_latest(3, include_compacted=True)) == 3
+
+    reloaded = Memory(TEST_DIR, session_id="alice", reset=False, buffer_size=3)
+    assert reloaded.get_summary().message_id == summary.message_id
+    assert [record.message_id for record in reloaded.get_latest(3)] == ["message-2"]
+
+
+def test_compact_within_budget_keeps_messages(memory):
+    memory.insert(make_record(0))
+
+    async def summarize(previous, records):
+        raise AssertionError("nothing should be summarized")
+
+    assert run(memory.compact(summarize, token_budget=1000, n=3)) == 0
+    assert memory.get_summary() is None
+
+
+def test_concurrent_compactions_run_one_after_the_other(memory):
+    for index in range(4):
+        memory.insert(make_record(index, content="x" * 400))
+    running = []
+    overlaps = []
+
+    async def summarize(previous, records):
+        running.append(True)
+        overlaps.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return f"summary after {records[-1].message_id}"
+
+    async def compact_twice():
+        return await asyncio.gather(
+            memory.compact(summarize, token_budget=250, n=4, keep_last=1),
+            memory.compact(summarize, token_budget=250, n=4, keep_last=1),
+        )
+
+    assert sorted(run(compact_twice())) == [0, 2]
+    assert overlaps == [1]
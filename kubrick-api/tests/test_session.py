@@ -0,0 +1,91 @@
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+import kubrick_api.agent.session as session
+from kubrick_api.agent.memory import DEFAULT_SESSION_ID
+from kubrick_api.agent.session import SessionManager
+
+
+class FakeMemory:
+    """Stands in for a Memory, without its Pixeltable table."""
+
+    def __init__(self, name: str, session_id: str = DEFAULT_SESSION_ID, reset: bool = True):
+        self.name = name
+        self.session_id = session_id
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(session, "Memory", FakeMemory)
+    monkeypatch.setattr(session.time, "monotonic", lambda: clock.now)
+    return clock
+
+
+def make_manager(max_sessions: int = 2, idle_ttl_seconds: float = 60.0) -> SessionManager:
+    agent = SimpleNamespace(name="kubrick", memory=FakeMemory("kubrick"))
+    return SessionManager(agent, max_sessions=max_sessions, idle_ttl_seconds=idle_ttl_seconds)
+
+
+def test_sessions_get_their_own_memory(clock):
+    manager = make_manager()
+
+    alice = manager.get_memory("alice")
+
+    assert alice.session_id == "alice"
+    assert manager.get_memory("alice") is alice
+    assert manager.get_memory() is manager.agent.memory
+    assert manager.get_memory(DEFAULT_SESSION_ID) is manager.agent.memory
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    manager = make_manager(max_sessions=2)
+    manager.get_memory("alice")
+    manager.get_memory("bob")
+    manager.get_memory("alice")
+
+    manager.get_memory("carol")
+
+    assert list(manager._memories) == [DEFAULT_SESSION_ID, "alice", "carol"]
+    assert len(manager) == 3
+
+
+def test_idle_sessions_are_evicted_but_not_the_default_one(clock):
+    manager = make_manager(max_sessions=10, idle_ttl_seconds=60.0)
+    manager.get_memory()
+    manager.get_memory("alice")
+    clock.now = 30.0
+    manager.get_memory("bob")
+
+    clock.now = 61.0
+    manager.evict_idle()
+    assert list(manager._memories) == [DEFAULT_SESSION_ID, "bob"]
+
+    clock.now = 1000.0
+    manager.evict_idle()
+    assert list(manager._memories) == [DEFAULT_SESSION_ID]
+
+
+def test_default_session_does_not_count_against_capacity(clock):
+    manager = make_manager(max_sessions=1)
+    manager.get_memory("alice")
+    manager.get_memory("bob")
+
+    assert list(manager._memories) == [DEFAULT_SESSION_ID, "bob"]
+
+
+def test_evicted_memory_in_use_is_handed_out_again(clock):
+    manager = make_manager(max_sessions=1)
+    alice = manager.get_memory("alice")
+    manager.get_memory("bob")
+    assert "alice" not in manager._memories
+
+    assert manager.get_memory("alice") is alice
+
+    # Once nothing uses it anymore, an evicted memory is released.
+    manager.get_memory("bob")
+    del alice
+    gc.collect()
+    assert "alice" not in manager._live_memories
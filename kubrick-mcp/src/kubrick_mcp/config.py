@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,10 +18,33 @@ class Settings(BaseSettings):
     IMAGE_CAPTION_MODEL: str = "gpt-4o-mini"
 
     # --- Video Ingestion Configuration ---
-    SPLIT_FRAMES_COUNT: int = 45
+    FRAME_SAMPLING_MODE: Literal["adaptive", "fixed"] = "adaptive"
+    SPLIT_FRAMES_COUNT: int = 45  # Used by the "fixed" frame sampling mode
+    SCENE_CHANGE_THRESHOLD: float = 0.15
+    SCENE_ANALYSIS_FPS: float = 2.0
+    MIN_FRAMES_PER_MINUTE: float = 2.0
+    MAX_FRAMES_PER_MINUTE: float = 12.0
+    FRAME_DEDUP_ENABLED: bool = True  # Near-duplicate frames get no row, so frame hits land on the kept frame
+    FRAME_DEDUP_MAX_HAMMING_DISTANCE: int = 6
+    AUDIO_EXTRACTION_FORMAT: Literal["opus", "pcm"] = "opus"  # 16 kHz mono, Ogg/Opus or WAV
+    AUDIO_OPUS_BITRATE: int = 24000
     AUDIO_CHUNK_LENGTH: int = 10
     AUDIO_OVERLAP_SECONDS: int = 1
     AUDIO_MIN_CHUNK_DURATION_SECONDS: int = 1
+    BATCH_INGESTION_WORKERS: int = 4
+    SEGMENTED_INGESTION_MIN_DURATION_SEC: float = 1800.0  # Longer videos are ingested in parallel segments, 0 disables
+    INGESTION_SEGMENT_DURATION_SEC: float = 600.0
+    INGESTION_CHECKPOINT_TTL_HOURS: float = 24.0  # Unfinished ingestions older than this are garbage-collected
+
+    # --- Result Cache Configuration ---
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PATH: str = ".records/result_cache.db"
+    RESULT_CACHE_MAX_MB: int = 2048
+
+    # --- Voice Activity Detection Configuration ---
+    VAD_ENABLED: bool = True  # Chunks without speech get an empty transcription, without an API call
+    VAD_ENERGY_THRESHOLD_DB: float = -45.0
+    VAD_MIN_SPEECH_RATIO: float = 0.1  # Share of speech frames above which a chunk is transcribed
 
     # --- Transcription Similarity Search Configuration ---
     TRANSCRIPT_SIMILARITY_EMBD_MODEL: str = "text-embedding-3-small"
@@ -35,13 +59,17 @@ class Settings(BaseSettings):
 
     # --- Caption Similarity Search Configuration ---
     CAPTION_MODEL_PROMPT: str = "Describe what is happening in the image"
+    CAPTION_BATCH_SIZE: int = 4  # Frames per vision request; 1 still goes through the cached caption_frames UDF
     DELTA_SECONDS_FRAME_INTERVAL: float = 5.0
 
     # --- Video Search Engine Configuration ---
+    SEARCH_BACKEND: Literal["pixeltable", "numpy"] = "pixeltable"  # "numpy" searches memory-mapped float16 snapshots
     VIDEO_CLIP_SPEECH_SEARCH_TOP_K: int = 1
     VIDEO_CLIP_CAPTION_SEARCH_TOP_K: int = 1
     VIDEO_CLIP_IMAGE_SEARCH_TOP_K: int = 1
     QUESTION_ANSWER_TOP_K: int = 3
+    LIBRARY_SEARCH_TOP_K: int = 5
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024  # Query embeddings kept in memory, 0 disables the cache
 
 
 @lru_cache(maxsize=1)
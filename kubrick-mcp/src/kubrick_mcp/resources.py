@@ -1,6 +1,7 @@
 from typing import Dict
-from kubrick_mcp.video.ingestion.models import CachedTable, CachedTableMetadata
-from kubrick_mcp.video.ingestion.registry import get_registry
+from kubrick_mcp.video.ingestion.cache import get_result_cache
+from kubrick_mcp.video.ingestion.registry import get_registry, get_table
+from kubrick_mcp.video.vector_index import get_query_embedding_cache
 
 
 def list_tables() -> Dict[str, str]:
@@ -20,6 +21,18 @@ def list_tables() -> Dict[str, str]:
     return response
 
 
+def cache_stats() -> Dict[str, dict]:
+    """Report the hit/miss metrics and size of the caption, transcription and embedding cache,
+    and of the query embedding cache of the search engines.
+
+    Returns:
+        A dictionary with the metrics of each kind of cached result.
+    """
+    stats = {kind: metrics.model_dump() for kind, metrics in get_result_cache().metrics().items()}
+    stats["query_embedding"] = get_query_embedding_cache().metrics().model_dump()
+    return stats
+
+
 def table_info(table_name: str) -> str:
     """List information about a specific video index.
 
@@ -29,11 +42,8 @@ def table_info(table_name: str) -> str:
     Returns:
         A string with the information about the video index.
     """
-    registry = get_registry()
-    if table_name not in registry:
+    table = get_table(table_name)
+    if table is None:
         return f"Video index '{table_name}' does not exist."
-    table_metadata = registry[table_name]
-    table_info = CachedTableMetadata(**table_metadata)
-    table = CachedTable.from_metadata(table_info)
     response = table.describe()
     return response
@@ -1,14 +1,23 @@
+from pathlib import Path
+
 import click
 from fastmcp import FastMCP
 
+from kubrick_mcp.config import get_settings
 from kubrick_mcp.prompts import general_system_prompt, routing_system_prompt, tool_use_system_prompt
-from kubrick_mcp.resources import list_tables
+from kubrick_mcp.resources import cache_stats, list_tables
 from kubrick_mcp.tools import (
     ask_question_about_video,
     get_video_clip_from_image,
     get_video_clip_from_user_query,
     process_video,
+    process_videos,
+    search_video_library,
 )
+from kubrick_mcp.video.ingestion.checkpoints import collect_orphaned_caches
+from kubrick_mcp.video.video_search_engine import warm_up_search_engines
+
+settings = get_settings()
 
 
 def add_mcp_resources(mcp: FastMCP):
@@ -19,6 +28,13 @@ def add_mcp_resources(mcp: FastMCP):
         description="List all video indexes currently available.",
         tags={"resource", "all"},
     )
+    mcp.add_resource_fn(
+        fn=cache_stats,
+        uri=Path(settings.RESULT_CACHE_PATH).resolve().as_uri(),
+        name="cache_stats",
+        description="Hit/miss metrics of the caption, transcription and embedding cache.",
+        tags={"resource", "all"},
+    )
 
 
 def add_mcp_prompts(mcp: FastMCP):
@@ -48,9 +64,11 @@ mcp = FastMCP("VideoProcessor")
 
 # Register tools using decorator pattern
 mcp.tool(process_video)
+mcp.tool(process_videos)
 mcp.tool(get_video_clip_from_user_query)
 mcp.tool(get_video_clip_from_image)
 mcp.tool(ask_question_about_video)
+mcp.tool(search_video_library)
 
 add_mcp_prompts(mcp)
 add_mcp_resources(mcp)
@@ -64,6 +82,8 @@ def run_mcp(port, host, transport):
     """
     Run the FastMCP server with the specified port, host, and transport protocol.
     """
+    collect_orphaned_caches(max_age_seconds=settings.INGESTION_CHECKPOINT_TTL_HOURS * 3600)
+    warm_up_search_engines()
     mcp.run(host=host, port=port, transport=transport)
 
 
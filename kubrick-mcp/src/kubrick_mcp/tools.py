@@ -1,21 +1,30 @@
-from typing import Dict
+import asyncio
+from typing import Dict, List
 from uuid import uuid4
 
+from fastmcp import Context
 from loguru import logger
 
 from kubrick_mcp.config import get_settings
-from kubrick_mcp.video.ingestion.tools import extract_video_clip
+from kubrick_mcp.video.ingestion.batch import ingest_video_segments, ingest_videos
+from kubrick_mcp.video.ingestion.models import BatchIngestionProgress, IngestionProgress
+from kubrick_mcp.video.ingestion.tools import extract_video_clip, get_video_duration
 from kubrick_mcp.video.ingestion.video_processor import VideoProcessor
-from kubrick_mcp.video.video_search_engine import VideoSearchEngine
+from kubrick_mcp.video.video_search_engine import get_library_search_engine, get_search_engine
 
 logger = logger.bind(name="MCPVideoTools")
-video_processor = VideoProcessor()
 settings = get_settings()
 
 
-def process_video(video_path: str) -> str:
+async def process_video(video_path: str, ctx: Context) -> str:
     """Process a video file and prepare it for searching.
 
+    Ingestion runs in a worker thread; the per-stage progress (rows processed, elapsed time and
+    throughput) is sent back to the client as MCP progress notifications, whose message is the
+    JSON-encoded IngestionProgress. Videos longer than SEGMENTED_INGESTION_MIN_DURATION_SEC are
+    split into segments ingested in parallel worker processes instead, and the progress message
+    is the JSON-encoded BatchIngestionProgress of the segments.
+
     Args:
         video_path (str): Path to the video file to process.
 
@@ -25,15 +34,87 @@ def process_video(video_path: str) -> str:
     Raises:
         ValueError: If the video file cannot be found or processed.
     """
+    video_processor = VideoProcessor()
     exists = video_processor._check_if_exists(video_path)
     if exists:
         logger.info(f"Video index for '{video_path}' already exists and is ready for use.")
         return False
-    video_processor.setup_table(video_name=video_path)
-    is_done = video_processor.add_video(video_path=video_path)
+
+    loop = asyncio.get_running_loop()
+
+    duration = await asyncio.to_thread(get_video_duration, video_path)
+    if 0 < settings.SEGMENTED_INGESTION_MIN_DURATION_SEC <= duration:
+
+        def report_segments_progress(progress: BatchIngestionProgress):
+            asyncio.run_coroutine_threadsafe(
+                ctx.report_progress(
+                    progress=progress.done,
+                    total=progress.total,
+                    message=progress.model_dump_json(),
+                ),
+                loop,
+            )
+
+        progress = await ingest_video_segments(
+            video_path,
+            num_workers=settings.BATCH_INGESTION_WORKERS,
+            progress_callback=report_segments_progress,
+        )
+        if progress.failed:
+            raise ValueError(f"Failed to process {progress.failed} segments of {video_path}: {progress.errors}")
+        return True
+
+    def report_progress(progress: IngestionProgress):
+        asyncio.run_coroutine_threadsafe(
+            ctx.report_progress(
+                progress=progress.completed_stages,
+                total=len(progress.stages),
+                message=progress.model_dump_json(),
+            ),
+            loop,
+        )
+
+    def run_ingestion() -> bool:
+        video_processor.setup_table(video_name=video_path)
+        return video_processor.add_video(video_path=video_path, progress_callback=report_progress)
+
+    is_done = await asyncio.to_thread(run_ingestion)
     return is_done
 
 
+async def process_videos(video_paths: list[str], ctx: Context) -> Dict:
+    """Process many video files in parallel and prepare them for searching.
+
+    Each video is ingested in its own worker process (up to BATCH_INGESTION_WORKERS at a time).
+    The aggregate progress is sent back to the client as MCP progress notifications, whose
+    message is the JSON-encoded BatchIngestionProgress.
+
+    Args:
+        video_paths (list[str]): Paths to the video files to process.
+
+    Returns:
+        Dict: The final status of every video in the batch.
+    """
+    loop = asyncio.get_running_loop()
+
+    def report_progress(progress: BatchIngestionProgress):
+        asyncio.run_coroutine_threadsafe(
+            ctx.report_progress(
+                progress=progress.done,
+                total=progress.total,
+                message=progress.model_dump_json(),
+            ),
+            loop,
+        )
+
+    progress = await ingest_videos(
+        video_paths,
+        num_workers=settings.BATCH_INGESTION_WORKERS,
+        progress_callback=report_progress,
+    )
+    return progress.model_dump()
+
+
 def get_video_clip_from_user_query(video_path: str, user_query: str) -> str:
     """Get a video clip based on the user query using speech and caption similarity.
 
@@ -44,7 +125,7 @@ def get_video_clip_from_user_query(video_path: str, user_query: str) -> str:
     Returns:
         str: Path to the extracted video clip.
     """
-    search_engine = VideoSearchEngine(video_path)
+    search_engine = get_search_engine(video_path)
 
     speech_clips = search_engine.search_by_speech(user_query, settings.VIDEO_CLIP_SPEECH_SEARCH_TOP_K)
     caption_clips = search_engine.search_by_caption(user_query, settings.VIDEO_CLIP_CAPTION_SEARCH_TOP_K)
@@ -74,7 +155,7 @@ def get_video_clip_from_image(video_path: str, user_image: str) -> str:
     Returns:
         str: Path to the extracted video clip.
     """
-    search_engine = VideoSearchEngine(video_path)
+    search_engine = get_search_engine(video_path)
     image_clips = search_engine.search_by_image(user_image, settings.VIDEO_CLIP_IMAGE_SEARCH_TOP_K)
 
     video_clip = extract_video_clip(
@@ -97,8 +178,29 @@ def ask_question_about_video(video_path: str, user_query: str) -> str:
     Returns:
         str: Concatenated relevant captions from the video.
     """
-    search_engine = VideoSearchEngine(video_path)
+    search_engine = get_search_engine(video_path)
     caption_info = search_engine.get_caption_info(user_query, settings.QUESTION_ANSWER_TOP_K)
 
     answer = "\n".join(entry["caption"] for entry in caption_info)
     return answer
+
+
+def search_video_library(user_query: str) -> List[Dict]:
+    """Find the moments matching the user query across every processed video, by speech and caption similarity.
+
+    Args:
+        user_query (str): The user query to search for.
+
+    Returns:
+        List[Dict]: The best matching clips, with keys:
+            - video_name (str): The video the clip belongs to
+            - start_time (float): Start time in seconds
+            - end_time (float): End time in seconds
+            - similarity (float): Similarity score
+    """
+    library_search_engine = get_library_search_engine()
+    top_k = settings.LIBRARY_SEARCH_TOP_K
+
+    clips = library_search_engine.search_by_speech(user_query, top_k)
+    clips += library_search_engine.search_by_caption(user_query, top_k)
+    return sorted(clips, key=lambda clip: clip["similarity"], reverse=True)[:top_k]
@@ -0,0 +1,164 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import Literal, Optional
+
+import av
+import numpy as np
+from loguru import logger
+
+logger = logger.bind(name="AudioTools")
+
+# Speech models work on 16 kHz mono audio; anything above is resampled away server-side anyway.
+SPEECH_SAMPLE_RATE = 16000
+# Audio chunks are decoded in windows of this many seconds (about 10 MB of samples), shared by the chunks they cover.
+PCM_WINDOW_SEC = 300.0
+
+AudioFormat = Literal["opus", "pcm"]
+# Audio format -> (container format, codec, file extension)
+AUDIO_FORMATS = {
+    "opus": ("ogg", "libopus", ".ogg"),
+    "pcm": ("wav", "pcm_s16le", ".wav"),
+}
+
+
+def _add_speech_stream(container: av.container.OutputContainer, audio_format: AudioFormat, bitrate: int):
+    _, codec, _ = AUDIO_FORMATS[audio_format]
+    stream = container.add_stream(codec, rate=SPEECH_SAMPLE_RATE, layout="mono")
+    if audio_format == "opus":
+        stream.bit_rate = bitrate
+    return stream
+
+
+def _speech_resampler() -> av.AudioResampler:
+    return av.AudioResampler(format="s16", layout="mono", rate=SPEECH_SAMPLE_RATE)
+
+
+def extract_speech_track(video_path: str, output_path: str, audio_format: AudioFormat, bitrate: int) -> bool:
+    """Extract the soundtrack of a video as 16 kHz mono audio, in a speech-friendly format.
+
+    Args:
+        video_path (str): Path to the video file.
+        output_path (str): Path of the audio file to write.
+        audio_format (AudioFormat): "opus" for a low-bitrate Ogg/Opus file, "pcm" for a WAV file.
+        bitrate (int): Target bitrate of the Opus encoder, in bits per second.
+
+    Returns:
+        bool: False if the video has no audio stream.
+    """
+    container_format, _, _ = AUDIO_FORMATS[audio_format]
+    with av.open(video_path) as container:
+        if not container.streams.audio:
+            return False
+        audio_stream = container.streams.audio[0]
+        resampler = _speech_resampler()
+        with av.open(output_path, "w", format=container_format) as output:
+            output_stream = _add_speech_stream(output, audio_format, bitrate)
+            for frame in container.decode(audio_stream):
+                for resampled in resampler.resample(frame):
+                    output.mux(output_stream.encode(resampled))
+            for resampled in resampler.resample(None):
+                output.mux(output_stream.encode(resampled))
+            output.mux(output_stream.encode(None))
+    return True
+
+
+def _decode_pcm(audio_path: str, start_sec: float, end_sec: Optional[float]) -> tuple[np.ndarray, float]:
+    """Decode the samples from the audio frame before `start_sec` up to `end_sec`, and the time of the first one."""
+    with av.open(audio_path) as container:
+        if not container.streams.audio:
+            return np.zeros(0, dtype=np.int16), 0.0
+        stream = container.streams.audio[0]
+        if start_sec > 0:
+            container.seek(int(start_sec / stream.time_base), stream=stream)
+
+        resampler = _speech_resampler()
+        first_time: Optional[float] = None
+        chunks = []
+        for frame in container.decode(stream):
+            if first_time is None:
+                first_time = frame.time if frame.time is not None else 0.0
+            if end_sec is not None and frame.time is not None and frame.time > end_sec:
+                break
+            chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame))
+        chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(None))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.int16), 0.0
+    return np.concatenate(chunks), first_time
+
+
+def _slice_pcm(samples: np.ndarray, first_time: float, start_sec: float, end_sec: Optional[float]) -> np.ndarray:
+    start = max(0, round((start_sec - first_time) * SPEECH_SAMPLE_RATE))
+    end = None if end_sec is None else max(start, round((end_sec - first_time) * SPEECH_SAMPLE_RATE))
+    return samples[start:end]
+
+
+def decode_pcm(audio_path: str, start_sec: float = 0.0, end_sec: Optional[float] = None) -> np.ndarray:
+    """Decode a time range of an audio file to 16 kHz mono 16-bit samples.
+
+    Args:
+        audio_path (str): Path to the audio file.
+        start_sec (float): Start of the range, in seconds.
+        end_sec (Optional[float]): End of the range, in seconds. Defaults to the end of the file.
+
+    Returns:
+        np.ndarray: The int16 samples of the range.
+    """
+    samples, first_time = _decode_pcm(audio_path, start_sec, end_sec)
+    return _slice_pcm(samples, first_time, start_sec, end_sec)
+
+
+@lru_cache(maxsize=1)
+def _decode_window_pcm(audio_path: str, mtime_ns: int, size: int, window_start_sec: float) -> tuple[np.ndarray, float]:
+    samples, first_time = _decode_pcm(audio_path, window_start_sec, window_start_sec + PCM_WINDOW_SEC)
+    samples.flags.writeable = False
+    return samples, first_time
+
+
+def decode_chunk_pcm(audio_path: str, start_sec: float, end_sec: float) -> np.ndarray:
+    """Get the 16 kHz mono 16-bit samples of a chunk of an audio file, decoding each part of the file only once.
+
+    The file is decoded in windows of `PCM_WINDOW_SEC` seconds, and the window of the last chunk
+    is kept until a chunk outside of it is read, so the speech detection and the transcription of
+    consecutive chunks share one decode, whatever the length of the file. A chunk across two
+    windows is decoded on its own.
+
+    Args:
+        audio_path (str): Path to the audio file.
+        start_sec (float): Start of the chunk, in seconds.
+        end_sec (float): End of the chunk, in seconds.
+
+    Returns:
+        np.ndarray: The read-only int16 samples of the chunk.
+    """
+    window_start_sec = start_sec // PCM_WINDOW_SEC * PCM_WINDOW_SEC
+    if end_sec > window_start_sec + PCM_WINDOW_SEC:
+        samples = decode_pcm(audio_path, start_sec, end_sec)
+        samples.flags.writeable = False
+        return samples
+    stat = os.stat(audio_path)
+    samples, first_time = _decode_window_pcm(audio_path, stat.st_mtime_ns, stat.st_size, window_start_sec)
+    return _slice_pcm(samples, first_time, start_sec, end_sec)
+
+
+def encode_pcm(samples: np.ndarray, audio_format: AudioFormat, bitrate: int) -> bytes:
+    """Encode 16 kHz mono 16-bit samples into an in-memory audio file.
+
+    Args:
+        samples (np.ndarray): The int16 samples.
+        audio_format (AudioFormat): "opus" for Ogg/Opus, "pcm" for WAV.
+        bitrate (int): Target bitrate of the Opus encoder, in bits per second.
+
+    Returns:
+        bytes: The content of the audio file.
+    """
+    container_format, _, _ = AUDIO_FORMATS[audio_format]
+    buffer = BytesIO()
+    with av.open(buffer, "w", format=container_format) as output:
+        output_stream = _add_speech_stream(output, audio_format, bitrate)
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SPEECH_SAMPLE_RATE
+        output.mux(output_stream.encode(frame))
+        output.mux(output_stream.encode(None))
+    return buffer.getvalue()
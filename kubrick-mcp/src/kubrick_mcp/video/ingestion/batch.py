@@ -0,0 +1,242 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+import kubrick_mcp.video.ingestion.checkpoints as checkpoints
+import kubrick_mcp.video.ingestion.constants as cc
+import kubrick_mcp.video.ingestion.registry as registry
+from kubrick_mcp.config import get_settings
+from kubrick_mcp.video.ingestion.models import BatchIngestionProgress, CachedTableMetadata, IndexSegment
+from kubrick_mcp.video.ingestion.tools import compute_content_hash, split_video_at_keyframes
+from kubrick_mcp.video.ingestion.video_processor import VideoProcessor
+
+logger = logger.bind(name="BatchIngestion")
+settings = get_settings()
+
+BatchProgressCallback = Callable[[BatchIngestionProgress], None]
+
+
+def ingest_video(video_path: str) -> dict:
+    """
+    Ingest a single video with its own VideoProcessor. Runs inside a worker process.
+
+    The index is not registered here: the registry lives in the parent process, which
+    registers the returned entry once the video is done.
+
+    Args:
+        video_path (str): Path to the video file to process.
+
+    Returns:
+        dict: Arguments for `registry.add_index_to_registry`.
+    """
+    video_processor = VideoProcessor()
+    video_processor.setup_table(video_name=video_path, register=False)
+    video_processor.add_video(video_path=video_path)
+    return video_processor.registry_entry()
+
+
+def _register_alias(video_name: str, index: CachedTableMetadata):
+    """Register a video under its own name as an alias of an existing index with the same content."""
+    registry.add_index_to_registry(
+        video_name=video_name,
+        video_cache=index.video_cache,
+        frames_view_name=index.frames_view,
+        audio_view_name=index.audio_chunks_view,
+        content_hash=index.content_hash,
+        segments=index.segments,
+    )
+
+
+async def ingest_videos(
+    video_paths: List[str],
+    num_workers: int,
+    progress_callback: Optional[BatchProgressCallback] = None,
+) -> BatchIngestionProgress:
+    """
+    Ingest many videos in parallel, one worker process per video at a time.
+
+    Files are fingerprinted first, so that each distinct content is ingested once: videos that
+    already have an index, or whose content matches an existing index, are skipped (the latter
+    registered as aliases), and copies of the same file within the batch are registered as
+    aliases of the first one once it is done. A failure only affects its own content.
+
+    Args:
+        video_paths (List[str]): Paths to the video files to process.
+        num_workers (int): Maximum number of videos processed at the same time.
+        progress_callback (Optional[BatchProgressCallback]): Called with the aggregate
+            progress whenever a video starts or finishes.
+
+    Returns:
+        BatchIngestionProgress: The final status of every video in the batch.
+    """
+    video_paths = list(dict.fromkeys(video_paths))
+    existing = registry.get_registry()
+    progress = BatchIngestionProgress(
+        total=len(video_paths),
+        videos={path: "skipped" if path in existing else "pending" for path in video_paths},
+    )
+
+    def report():
+        if progress_callback is not None:
+            progress_callback(progress)
+
+    to_hash = [path for path, status in progress.videos.items() if status == "pending"]
+    content_hashes = await asyncio.gather(
+        *(asyncio.to_thread(compute_content_hash, path) for path in to_hash), return_exceptions=True
+    )
+    copies: Dict[str, List[str]] = {}
+    for video_path, content_hash in zip(to_hash, content_hashes):
+        if isinstance(content_hash, Exception):
+            logger.error(f"Failed to read video {video_path}: {content_hash}")
+            progress.videos[video_path] = "failed"
+            progress.errors[video_path] = str(content_hash)
+            continue
+        duplicate = registry.get_index_by_content_hash(content_hash)
+        if duplicate is not None:
+            logger.info(f"Video '{video_path}' has the same content as '{duplicate.video_name}', reusing its index.")
+            _register_alias(video_path, duplicate)
+            progress.videos[video_path] = "skipped"
+        else:
+            copies.setdefault(content_hash, []).append(video_path)
+
+    report()
+    if not copies:
+        return progress
+
+    loop = asyncio.get_running_loop()
+    num_workers = min(num_workers, len(copies))
+    semaphore = asyncio.Semaphore(num_workers)
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+
+        async def run(video_path: str, aliases: List[str]):
+            async with semaphore:
+                progress.videos[video_path] = "running"
+                report()
+                try:
+                    entry = await loop.run_in_executor(executor, ingest_video, video_path)
+                    registry.add_index_to_registry(**entry)
+                    checkpoints.delete_checkpoint(entry["video_cache"])
+                    progress.videos[video_path] = "completed"
+                    for alias in aliases:
+                        registry.add_index_to_registry(**{**entry, "video_name": alias})
+                        progress.videos[alias] = "skipped"
+                except Exception as e:
+                    logger.error(f"Failed to ingest video {video_path}: {e}")
+                    for path in [video_path, *aliases]:
+                        progress.videos[path] = "failed"
+                        progress.errors[path] = str(e)
+                report()
+
+        await asyncio.gather(*(run(paths[0], paths[1:]) for paths in copies.values()))
+
+    logger.info(
+        f"Batch ingestion done: {progress.completed} completed, {progress.skipped} skipped, {progress.failed} failed"
+    )
+    return progress
+
+
+async def ingest_video_segments(
+    video_path: str,
+    num_workers: int,
+    progress_callback: Optional[BatchProgressCallback] = None,
+) -> BatchIngestionProgress:
+    """
+    Ingest a long video as time segments processed in parallel worker processes.
+
+    The video is cut at keyframes without re-encoding, and each segment is ingested as its own
+    index by a worker process. Once every segment is done, they are registered together as one
+    index of `video_path`, and each segment's start offset maps its timestamps back onto the
+    full video. If a segment fails, nothing is registered; calling this again resumes each
+    segment from its checkpoint. A video whose content matches an existing index is not split,
+    but registered as an alias of that index.
+
+    Args:
+        video_path (str): Path to the video file to process.
+        num_workers (int): Maximum number of segments processed at the same time.
+        progress_callback (Optional[BatchProgressCallback]): Called with the aggregate
+            progress whenever a segment starts or finishes.
+
+    Returns:
+        BatchIngestionProgress: The final status of every segment.
+    """
+    content_hash = await asyncio.to_thread(compute_content_hash, video_path)
+    duplicate = registry.get_index_by_content_hash(content_hash)
+    if duplicate is not None:
+        logger.info(f"Video '{video_path}' has the same content as '{duplicate.video_name}', reusing its index.")
+        _register_alias(video_path, duplicate)
+        progress = BatchIngestionProgress(total=1, videos={video_path: "skipped"})
+        if progress_callback is not None:
+            progress_callback(progress)
+        return progress
+
+    segments = await asyncio.to_thread(
+        split_video_at_keyframes,
+        video_path,
+        segment_duration_sec=settings.INGESTION_SEGMENT_DURATION_SEC,
+        output_dir=str(Path(cc.DEFAULT_SEGMENTS_DIR) / content_hash[:16]),
+    )
+    start_offsets = dict(segments)
+    logger.info(f"Split {video_path} into {len(segments)} segments")
+
+    progress = BatchIngestionProgress(
+        total=len(segments),
+        videos={segment_path: "pending" for segment_path, _ in segments},
+    )
+
+    def report():
+        if progress_callback is not None:
+            progress_callback(progress)
+
+    report()
+    loop = asyncio.get_running_loop()
+    num_workers = min(num_workers, len(segments))
+    semaphore = asyncio.Semaphore(num_workers)
+    entries = {}
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+
+        async def run(segment_path: str):
+            async with semaphore:
+                progress.videos[segment_path] = "running"
+                report()
+                try:
+                    entries[segment_path] = await loop.run_in_executor(executor, ingest_video, segment_path)
+                    progress.videos[segment_path] = "completed"
+                except Exception as e:
+                    logger.error(f"Failed to ingest segment {segment_path} of {video_path}: {e}")
+                    progress.videos[segment_path] = "failed"
+                    progress.errors[segment_path] = str(e)
+                report()
+
+        await asyncio.gather(*(run(segment_path) for segment_path, _ in segments))
+
+    if progress.failed:
+        logger.error(f"{progress.failed} segments of {video_path} failed, the video is not registered")
+        return progress
+
+    index_segments = [
+        IndexSegment(
+            video_cache=entries[segment_path]["video_cache"],
+            video_table=f"{entries[segment_path]['video_cache']}.table",
+            frames_view=entries[segment_path]["frames_view_name"],
+            audio_chunks_view=entries[segment_path]["audio_view_name"],
+            start_offset_sec=start_offsets[segment_path],
+        )
+        for segment_path, _ in segments
+    ]
+    first = entries[segments[0][0]]
+    registry.add_index_to_registry(
+        video_name=video_path,
+        video_cache=first["video_cache"],
+        frames_view_name=first["frames_view_name"],
+        audio_view_name=first["audio_view_name"],
+        content_hash=content_hash,
+        segments=index_segments,
+    )
+    for entry in entries.values():
+        checkpoints.delete_checkpoint(entry["video_cache"])
+    logger.info(f"Registered {video_path} as {len(index_segments)} segments")
+    return progress
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+from PIL import Image
+
+from kubrick_mcp.config import get_settings
+from kubrick_mcp.video.ingestion.models import CacheMetrics
+
+logger = logger.bind(name="ResultCache")
+settings = get_settings()
+
+# Eviction scans the LRU index, so it only runs once every this many inserts.
+EVICTION_CHECK_INTERVAL = 100
+
+
+def image_content_hash(image: Image.Image) -> str:
+    """Fingerprint of the decoded pixels of an image, independent of the file it was read from."""
+    digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def text_content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache of model outputs (captions, transcriptions, embeddings).
+
+    Entries are keyed by (model, prompt, content hash), so identical frames, audio chunks and
+    texts are only sent to a model once, whatever index or video they come from. The cache is
+    bounded to `max_bytes` and evicts the least recently used entries first. Hit and miss counters
+    are kept per kind of result in the same SQLite file, so batch ingestion workers share them.
+    Within a process, the connection is shared by all threads and used under a lock.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._puts_since_eviction = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_accessed REAL NOT NULL,
+                value BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru_idx ON results (last_accessed, size)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metrics (
+                kind TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    @staticmethod
+    def make_key(model: str, prompt: Optional[str], content_hash: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt, content_hash]).encode("utf-8")).hexdigest()
+
+    def _record(self, kind: str, hit: bool):
+        column = "hits" if hit else "misses"
+        self._conn.execute(
+            f"INSERT INTO metrics (kind, {column}) VALUES (?, 1) ON CONFLICT(kind) DO UPDATE SET {column} = {column} + 1",
+            (kind,),
+        )
+
+    def get(self, kind: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE results SET last_accessed = ? WHERE key = ? RETURNING value", (time.time(), key)
+            ).fetchone()
+            self._record(kind, hit=row is not None)
+        return row[0] if row else None
+
+    def put(self, kind: str, key: str, value: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, kind, size, last_accessed, value) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, len(value), time.time(), value),
+            )
+            self._puts_since_eviction += 1
+            if self._puts_since_eviction >= EVICTION_CHECK_INTERVAL:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entries that don't fit in `max_bytes`."""
+        self._puts_since_eviction = 0
+        cursor = self._conn.execute(
+            """
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_accessed DESC) AS cumulative_size FROM results
+                ) WHERE cumulative_size > ?
+            )
+            """,
+            (self.max_bytes,),
+        )
+        if cursor.rowcount > 0:
+            logger.info(f"Evicted {cursor.rowcount} entries from the result cache")
+
+    def metrics(self) -> Dict[str, CacheMetrics]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT m.kind, m.hits, m.misses, COUNT(r.key), COALESCE(SUM(r.size), 0)
+                FROM metrics m LEFT JOIN results r ON r.kind = m.kind
+                GROUP BY m.kind
+                """
+            ).fetchall()
+        return {
+            kind: CacheMetrics(hits=hits, misses=misses, entries=entries, size_bytes=size_bytes)
+            for kind, hits, misses, entries, size_bytes in rows
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> ResultCache:
+    """
+    Get the process-wide result cache.
+
+    Returns:
+        ResultCache: The result cache.
+    """
+    return ResultCache(settings.RESULT_CACHE_PATH, max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024)
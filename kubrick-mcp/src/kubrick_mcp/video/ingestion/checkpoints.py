@@ -0,0 +1,99 @@
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pixeltable as pxt
+from loguru import logger
+
+import kubrick_mcp.video.ingestion.constants as cc
+import kubrick_mcp.video.ingestion.registry as registry
+from kubrick_mcp.video.ingestion.models import IngestionCheckpoint
+
+logger = logger.bind(name="IngestionCheckpoints")
+
+
+def _checkpoint_path(video_cache: str) -> Path:
+    return Path(cc.DEFAULT_CHECKPOINTS_DIR) / f"{video_cache}.json"
+
+
+def save_checkpoint(checkpoint: IngestionCheckpoint):
+    """
+    Persist the state of an unfinished ingestion.
+
+    Args:
+        checkpoint (IngestionCheckpoint): The ingestion state; its `updated_at` is refreshed.
+    """
+    checkpoint.updated_at = time.time()
+    path = _checkpoint_path(checkpoint.video_cache)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(checkpoint.model_dump_json(indent=4))
+    tmp_path.replace(path)
+
+
+def list_checkpoints() -> List[IngestionCheckpoint]:
+    checkpoints_dir = Path(cc.DEFAULT_CHECKPOINTS_DIR)
+    if not checkpoints_dir.is_dir():
+        return []
+    return [IngestionCheckpoint.model_validate_json(path.read_text()) for path in checkpoints_dir.glob("*.json")]
+
+
+def load_checkpoint(video_name: str) -> Optional[IngestionCheckpoint]:
+    """
+    Get the latest unfinished ingestion of a video.
+
+    Args:
+        video_name (str): The name of the video index.
+
+    Returns:
+        Optional[IngestionCheckpoint]: The ingestion state to resume from, or None.
+    """
+    checkpoints = [checkpoint for checkpoint in list_checkpoints() if checkpoint.video_name == video_name]
+    return max(checkpoints, key=lambda checkpoint: checkpoint.updated_at, default=None)
+
+
+def delete_checkpoint(video_cache: str):
+    _checkpoint_path(video_cache).unlink(missing_ok=True)
+
+
+def drop_cache(video_cache: str):
+    """Drop the Pixeltable directory and local cache directory of a video index, and its checkpoint."""
+    pxt.drop_dir(video_cache, force=True, if_not_exists="ignore")
+    shutil.rmtree(video_cache, ignore_errors=True)
+    delete_checkpoint(video_cache)
+
+
+def collect_orphaned_caches(max_age_seconds: float) -> List[str]:
+    """
+    Drop the cache directories left behind by ingestions that will not complete.
+
+    Only cache directories with an unfinished ingestion checkpoint are collected: one is dropped
+    once its checkpoint was last updated more than `max_age_seconds` ago, unless a registered
+    index lives in it. Unregistered cache directories without a checkpoint, such as caches built
+    before checkpoints existed, are left in place and logged.
+
+    Args:
+        max_age_seconds (float): Age after which an unfinished ingestion is considered abandoned.
+
+    Returns:
+        List[str]: The dropped cache directories.
+    """
+    live_caches = registry.get_video_caches()
+    checkpoints = list_checkpoints()
+    now = time.time()
+
+    orphaned_caches = {
+        checkpoint.video_cache
+        for checkpoint in checkpoints
+        if now - checkpoint.updated_at >= max_age_seconds and checkpoint.video_cache not in live_caches
+    }
+    for video_cache in sorted(orphaned_caches):
+        logger.info(f"Dropping orphaned cache directory '{video_cache}'")
+        drop_cache(video_cache)
+
+    cache_dirs = {path for path in pxt.list_dirs(recursive=False) if path.startswith("cache_")}
+    checkpointed_caches = {checkpoint.video_cache for checkpoint in checkpoints}
+    for video_cache in sorted(cache_dirs - live_caches - checkpointed_caches):
+        logger.warning(f"Keeping unregistered cache directory '{video_cache}', which has no ingestion checkpoint")
+    return sorted(orphaned_caches)
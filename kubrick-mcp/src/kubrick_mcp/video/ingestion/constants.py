@@ -1 +1,4 @@
 DEFAULT_CACHED_TABLES_REGISTRY_DIR = ".records"
+DEFAULT_CHECKPOINTS_DIR = ".records/checkpoints"
+DEFAULT_SEGMENTS_DIR = ".records/segments"
+DEFAULT_VECTOR_SNAPSHOTS_DIR = ".records/vectors"
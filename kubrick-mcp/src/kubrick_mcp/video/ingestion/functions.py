@@ -1,5 +1,40 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+import numpy as np
 import pixeltable as pxt
+import pixeltable.type_system as ts
+from loguru import logger
+from openai import APIError, OpenAI
+from pixeltable.func import Batch
+from pixeltable.utils.local_store import TempStore
 from PIL import Image
+from pydantic import ValidationError
+
+from kubrick_mcp.config import get_settings
+from kubrick_mcp.video.ingestion.audio import AUDIO_FORMATS, decode_chunk_pcm, encode_pcm, extract_speech_track
+from kubrick_mcp.video.ingestion.cache import get_result_cache, image_content_hash, text_content_hash
+from kubrick_mcp.video.ingestion.models import BatchCaptionResponse
+from kubrick_mcp.video.ingestion.tools import encode_image
+from kubrick_mcp.video.ingestion.vad import speech_ratio
+
+logger = logger.bind(name="IngestionFunctions")
+settings = get_settings()
+
+BATCH_CAPTION_INSTRUCTIONS = """
+You will receive {n} images, each preceded by its number (1 to {n}).
+For every image: {prompt}
+Answer with a JSON object of the form {{"captions": [{{"index": 1, "caption": "..."}}, ...]}},
+with exactly one caption per image, in order.
+"""
+
+TEXT_EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
 
 
 @pxt.udf
@@ -15,10 +50,231 @@ def extract_text_from_chunk(transcript: pxt.type_system.Json) -> str:
 def resize_image(image: pxt.type_system.Image, width: int, height: int) -> pxt.type_system.Image:
     """
     Resize an image to fit within the specified width and height while maintaining aspect ratio.
-    Note: The PIL.Image.thumbnail() method modifies the image in place.
+    Note: Frames are now scaled by the frame iterators; this UDF is only kept so that frames views
+    created with it can still be loaded.
     """
     if not isinstance(image, Image.Image):
         raise TypeError("Input must be a PIL Image")
 
     image.thumbnail((width, height))
     return image
+
+
+@lru_cache(maxsize=1)
+def _get_openai_client() -> OpenAI:
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def _with_cache(
+    kind: str,
+    model: str,
+    prompt: str | None,
+    content_hashes: List[str],
+    compute: Callable[[List[int]], List[Any]],
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+) -> List[Any]:
+    """
+    Look up a batch of model outputs in the result cache and compute only the missing ones.
+
+    Args:
+        kind (str): Kind of result, used for the cache metrics.
+        model (str): Model producing the results.
+        prompt (str | None): Prompt sent along with each input, if any.
+        content_hashes (List[str]): Fingerprint of each input of the batch.
+        compute (Callable[[List[int]], List[Any]]): Computes the results of the inputs at the given positions.
+        encode (Callable[[Any], bytes]): Serializes a result for the cache.
+        decode (Callable[[bytes], Any]): Deserializes a cached result.
+
+    Returns:
+        List[Any]: The result of each input, in order.
+    """
+    if not settings.RESULT_CACHE_ENABLED:
+        return compute(list(range(len(content_hashes))))
+
+    cache = get_result_cache()
+    keys = [cache.make_key(model, prompt, content_hash) for content_hash in content_hashes]
+    results: List[Any] = [None] * len(keys)
+    misses = []
+    for pos, key in enumerate(keys):
+        value = cache.get(kind, key)
+        if value is None:
+            misses.append(pos)
+        else:
+            results[pos] = decode(value)
+
+    if misses:
+        for pos, result in zip(misses, compute(misses)):
+            cache.put(kind, keys[pos], encode(result))
+            results[pos] = result
+    return results
+
+
+def _image_url(image: Image.Image) -> dict:
+    return {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encode_image(image)}"}}
+
+
+def _caption_single(image: Image.Image, prompt: str, model: str) -> str:
+    response = _get_openai_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": [{"type": "text", "text": prompt}, _image_url(image)]}],
+    )
+    return response.choices[0].message.content
+
+
+def _caption_batch(images: list[Image.Image], prompt: str, model: str) -> list[str]:
+    content = [{"type": "text", "text": BATCH_CAPTION_INSTRUCTIONS.format(n=len(images), prompt=prompt)}]
+    for index, image in enumerate(images, start=1):
+        content += [{"type": "text", "text": f"Image {index}:"}, _image_url(image)]
+
+    response = _get_openai_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": content}],
+        response_format={"type": "json_object"},
+    )
+    parsed = BatchCaptionResponse(**json.loads(response.choices[0].message.content))
+    captions = {entry.index: entry.caption for entry in parsed.captions}
+    if sorted(captions) != list(range(1, len(images) + 1)):
+        raise ValueError(f"Expected captions for images 1-{len(images)}, got {sorted(captions)}")
+    return [captions[index] for index in range(1, len(images) + 1)]
+
+
+def _caption_images(images: List[Image.Image], prompt: str, model: str) -> List[str]:
+    if len(images) == 1:
+        return [_caption_single(images[0], prompt, model)]
+    try:
+        return _caption_batch(images, prompt, model)
+    except (APIError, json.JSONDecodeError, ValidationError, ValueError) as e:
+        logger.warning(f"Batched captioning of {len(images)} frames failed, captioning them one by one: {e}")
+        return [_caption_single(image, prompt, model) for image in images]
+
+
+@pxt.udf(batch_size=max(1, settings.CAPTION_BATCH_SIZE))
+def caption_frames(images: Batch[Image.Image], *, prompt: str, model: str) -> Batch[str]:
+    """
+    Caption several frames with a single vision request, sending them as a numbered set of images.
+    Note: Captions are cached by frame content, so only frames never seen with this model and prompt
+    are sent. If the batched request fails, or its response can't be split back into exactly one
+    caption per frame, each frame is captioned with its own request instead.
+    """
+    return _with_cache(
+        "caption",
+        model,
+        prompt,
+        [image_content_hash(image) for image in images],
+        lambda positions: _caption_images([images[pos] for pos in positions], prompt, model),
+        encode=str.encode,
+        decode=bytes.decode,
+    )
+
+
+@pxt.udf
+def extract_speech_audio(video: pxt.Video, *, audio_format: str, bitrate: int) -> Optional[pxt.Audio]:
+    """
+    Extract the soundtrack of a video as 16 kHz mono audio, Ogg/Opus or WAV depending on `audio_format`.
+    Note: Returns None for a video without audio, like `pixeltable.functions.video.extract_audio`.
+    """
+    output_path = str(TempStore.create_path(extension=AUDIO_FORMATS[audio_format][2]))
+    return output_path if extract_speech_track(video, output_path, audio_format, bitrate) else None
+
+
+@pxt.udf
+def detect_speech(
+    audio: pxt.Audio, start_time_sec: float, end_time_sec: float, *, energy_threshold_db: float, min_speech_ratio: float
+) -> bool:
+    """
+    Tell whether an audio chunk contains speech, with a local voice activity detector.
+    Note: The chunk is speech if at least `min_speech_ratio` of its 30 ms frames are classified as speech.
+    """
+    samples = decode_chunk_pcm(audio, start_time_sec, end_time_sec)
+    return speech_ratio(samples, energy_threshold_db) >= min_speech_ratio
+
+
+@pxt.udf
+def cached_transcriptions(
+    audio: pxt.Audio,
+    start_time_sec: float,
+    end_time_sec: float,
+    has_speech: Optional[bool] = None,
+    *,
+    model: str,
+    audio_format: str,
+    bitrate: int,
+) -> dict:
+    """
+    Transcribe a time range of an audio file, like `pixeltable.functions.openai.transcriptions`.
+    Note: The range is decoded and re-encoded in memory, as 16 kHz mono audio in `audio_format`, and uploaded
+    without writing a chunk file. Transcriptions are cached by audio content. Chunks flagged without speech by
+    `detect_speech` get an empty transcription, without an API call.
+    """
+    if has_speech is False:
+        return {"text": ""}
+
+    samples = decode_chunk_pcm(audio, start_time_sec, end_time_sec)
+
+    def transcribe(positions: List[int]) -> List[dict]:
+        filename = f"chunk{AUDIO_FORMATS[audio_format][2]}"
+        transcription = _get_openai_client().audio.transcriptions.create(
+            file=(filename, encode_pcm(samples, audio_format, bitrate)), model=model
+        )
+        return [transcription.model_dump()]
+
+    return _with_cache(
+        "transcription",
+        model,
+        None,
+        [hashlib.sha256(samples.tobytes()).hexdigest()],
+        transcribe,
+        encode=lambda transcription: json.dumps(transcription).encode("utf-8"),
+        decode=json.loads,
+    )[0]
+
+
+def embed_texts(texts: List[str], model: str) -> List[Optional[np.ndarray]]:
+    """
+    Embed texts with an OpenAI embedding model, in a single request for all the texts missing from the result cache.
+
+    Args:
+        texts (List[str]): The texts to embed; empty texts are not embedded and get None.
+        model (str): The embedding model.
+
+    Returns:
+        List[Optional[np.ndarray]]: The float32 embedding of each text, or None for an empty text, in order.
+    """
+    non_empty = [pos for pos, text in enumerate(texts) if text]
+
+    def embed(positions: List[int]) -> List[np.ndarray]:
+        response = _get_openai_client().embeddings.create(
+            input=[texts[non_empty[pos]] for pos in positions], model=model, encoding_format="float"
+        )
+        return [np.array(data.embedding, dtype=np.float32) for data in response.data]
+
+    embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+    if non_empty:
+        computed = _with_cache(
+            "embedding",
+            model,
+            None,
+            [text_content_hash(texts[pos]) for pos in non_empty],
+            embed,
+            encode=lambda embedding: embedding.astype(np.float32).tobytes(),
+            decode=lambda value: np.frombuffer(value, dtype=np.float32).copy(),
+        )
+        for pos, embedding in zip(non_empty, computed):
+            embeddings[pos] = embedding
+    return embeddings
+
+
+@pxt.udf(batch_size=32)
+def cached_embeddings(input: Batch[str], *, model: str) -> Batch[Optional[pxt.Array[(None,), pxt.Float]]]:
+    """
+    Embed texts, like `pixeltable.functions.openai.embeddings`.
+    Note: Embeddings are cached by text, so only unseen texts are sent to the model. Empty texts, such as
+    the transcription of a chunk without speech, get no embedding and are left out of searches.
+    """
+    return embed_texts(input, model)
+
+
+@cached_embeddings.conditional_return_type
+def _(model: str) -> ts.ArrayType:
+    return ts.ArrayType((TEXT_EMBEDDING_DIMENSIONS.get(model),), dtype=ts.FloatType(), nullable=True)
@@ -0,0 +1,507 @@
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Sequence
+
+import av
+import numpy as np
+import pixeltable.type_system as ts
+from loguru import logger
+from pixeltable.iterators.base import ComponentIterator
+
+logger = logger.bind(name="FrameIterators")
+
+# Size of the grayscale thumbnails compared to detect visual changes.
+ANALYSIS_WIDTH = 64
+ANALYSIS_HEIGHT = 36
+# dHash compares 9x8 grayscale thumbnails column-wise into a 64-bit hash.
+DHASH_SIZE = 8
+# A sample this close ahead of the last decoded frame is reached by decoding forward instead of seeking.
+FORWARD_DECODE_WINDOW_SEC = 2.0
+
+
+def fit_within(width: int, height: int, max_width: Optional[int], max_height: Optional[int]) -> tuple[int, int]:
+    """Size of a `width` x `height` frame shrunk to fit within `max_width` x `max_height`, keeping its aspect ratio."""
+    scale = min(1.0, (max_width or width) / width, (max_height or height) / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def decode_frames_at(
+    container: av.container.InputContainer, stream: av.video.stream.VideoStream, timestamps: Sequence[float]
+) -> Iterator[tuple[float, av.VideoFrame]]:
+    """Decode the first frame at or after each timestamp, touching only the GOPs that hold them.
+
+    For each timestamp, the demuxer seeks to the keyframe before it and decodes forward, unless it is
+    within FORWARD_DECODE_WINDOW_SEC ahead of the last decoded frame, in which case decoding just goes on.
+
+    Args:
+        container (av.container.InputContainer): The opened video.
+        stream (av.video.stream.VideoStream): The video stream to decode.
+        timestamps (Sequence[float]): Increasing timestamps in seconds, relative to the stream start.
+
+    Yields:
+        tuple[float, av.VideoFrame]: The timestamp of the decoded frame and the frame itself.
+    """
+    start_pts = stream.start_time or 0
+    frames: Optional[Iterator[av.VideoFrame]] = None
+    last_time: Optional[float] = None
+    for target in timestamps:
+        if frames is None or last_time is None or not last_time <= target <= last_time + FORWARD_DECODE_WINDOW_SEC:
+            container.seek(start_pts + int(target / stream.time_base), backward=True, any_frame=False, stream=stream)
+            frames = container.decode(stream)
+        frame = None
+        for candidate in frames:
+            if candidate.pts is None:
+                continue
+            frame = candidate
+            last_time = float((candidate.pts - start_pts) * stream.time_base)
+            if last_time >= target:
+                break
+        if frame is None:
+            return
+        yield last_time, frame
+
+
+def dhash(pixels: np.ndarray) -> int:
+    """Difference hash of a (DHASH_SIZE, DHASH_SIZE + 1) grayscale thumbnail."""
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def analyze_scene_changes(
+    video_path: str, analysis_fps: float
+) -> tuple[tuple[float, ...], tuple[float, ...], tuple[int, ...]]:
+    """Scan the keyframes of a video, scoring the visual change of each against the previous one and hashing it.
+
+    Only keyframes are decoded, so the scan costs a fraction of a full decode; encoders place
+    keyframes at shot boundaries and at least once per GOP. Keyframes closer than 1 / `analysis_fps`
+    seconds to the previous sample are skipped.
+
+    This is a weaker detector than comparing every frame: a cut the encoder did not start a GOP
+    at, as with fixed-GOP streams, is only seen at the next keyframe, and a change that reverts
+    within a GOP is missed. The `min_frames_per_minute` floor of `select_scene_timestamps` bounds
+    how long such a stretch goes unsampled.
+
+    Results are cached by path, modification time and size, as Pixeltable re-creates the iterator
+    whenever unstored frames are read back.
+
+    Args:
+        video_path (str): Path to the video file.
+        analysis_fps (float): Maximum rate at which the video is sampled.
+
+    Returns:
+        tuple: The sample timestamps in seconds, their change scores in [0, 1] and their dHashes.
+    """
+    stat = os.stat(video_path)
+    return _analyze_scene_changes(video_path, stat.st_mtime_ns, stat.st_size, analysis_fps)
+
+
+@lru_cache(maxsize=16)
+def _analyze_scene_changes(
+    video_path: str, mtime_ns: int, size: int, analysis_fps: float
+) -> tuple[tuple[float, ...], tuple[float, ...], tuple[int, ...]]:
+    timestamps, change_scores, hashes = [], [], []
+    previous: Optional[np.ndarray] = None
+    next_sample_time = 0.0
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        stream.codec_context.skip_frame = "NONKEY"
+        start_pts = stream.start_time or 0
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            timestamp = float((frame.pts - start_pts) * stream.time_base)
+            if timestamp < next_sample_time:
+                continue
+            next_sample_time = timestamp + 1.0 / analysis_fps
+
+            thumbnail = frame.to_ndarray(width=ANALYSIS_WIDTH, height=ANALYSIS_HEIGHT, format="gray").astype(np.float32)
+            score = 1.0 if previous is None else float(np.abs(thumbnail - previous).mean() / 255.0)
+            hash_pixels = frame.to_ndarray(width=DHASH_SIZE + 1, height=DHASH_SIZE, format="gray").astype(np.int16)
+            timestamps.append(timestamp)
+            change_scores.append(score)
+            hashes.append(dhash(hash_pixels))
+            previous = thumbnail
+    return tuple(timestamps), tuple(change_scores), tuple(hashes)
+
+
+def select_scene_timestamps(
+    timestamps: tuple[float, ...],
+    change_scores: tuple[float, ...],
+    change_threshold: float,
+    min_frames_per_minute: float,
+    max_frames_per_minute: float,
+    hashes: Optional[tuple[int, ...]] = None,
+    max_hamming_distance: Optional[int] = None,
+) -> List[float]:
+    """Pick the timestamps to sample from per-frame visual change scores.
+
+    A frame is picked on a shot boundary or visual change (score >= `change_threshold`). A change
+    closer than 60 / `max_frames_per_minute` seconds to the previous pick is deferred to the first
+    frame past that gap, so that it is not lost. Static stretches still get a frame every
+    60 / `min_frames_per_minute` seconds, unless `hashes` are given and the frame is a
+    near-duplicate of the previous pick.
+
+    Args:
+        timestamps (tuple[float, ...]): Timestamps in seconds of the analyzed frames, in order.
+        change_scores (tuple[float, ...]): Change score in [0, 1] of each frame against the previous one.
+        change_threshold (float): Minimum score considered a visual change.
+        min_frames_per_minute (float): Minimum sampling density.
+        max_frames_per_minute (float): Maximum sampling density.
+        hashes (Optional[tuple[int, ...]]): dHash of each analyzed frame.
+        max_hamming_distance (Optional[int]): Maximum dHash distance of a near-duplicate.
+
+    Returns:
+        List[float]: The selected timestamps, in order.
+    """
+    if not timestamps:
+        return []
+
+    min_gap = 60.0 / max_frames_per_minute
+    max_gap = 60.0 / min_frames_per_minute
+
+    dedup = hashes is not None and max_hamming_distance is not None
+    selected = [0]
+    change_pending = False
+    for pos in range(1, len(timestamps)):
+        change_pending = change_pending or change_scores[pos] >= change_threshold
+        elapsed = timestamps[pos] - timestamps[selected[-1]]
+        if not ((change_pending and elapsed >= min_gap) or elapsed >= max_gap):
+            continue
+        if dedup and hamming_distance(hashes[pos], hashes[selected[-1]]) <= max_hamming_distance:
+            continue
+        selected.append(pos)
+        change_pending = False
+    return [timestamps[pos] for pos in selected]
+
+
+class SceneChangeFrameIterator(ComponentIterator):
+    """
+    Iterator over the frames of a video where the content changes.
+
+    The keyframes of the video are first scanned, at most `analysis_fps` per second, on small
+    grayscale thumbnails to score the visual change between consecutive samples; frames are then picked with
+    `select_scene_timestamps` and decoded by seeking to each selected timestamp. Cuts between
+    keyframes are only seen at the next one, see `analyze_scene_changes`.
+
+    Args:
+        video: Path to the video file.
+        change_threshold: Mean absolute thumbnail difference in [0, 1] treated as a visual change.
+        min_frames_per_minute: Minimum sampling density, applied to static scenes.
+        max_frames_per_minute: Maximum sampling density, applied to fast-changing scenes.
+        analysis_fps: Maximum rate at which keyframes are scanned for changes.
+        max_hamming_distance: If set, frames whose dHash is within this distance of the
+            previous pick are suppressed as near-duplicates.
+        max_width: If set, frames are scaled down to this width at conversion time.
+        max_height: If set, frames are scaled down to this height at conversion time.
+    """
+
+    def __init__(
+        self,
+        video: str,
+        *,
+        change_threshold: float = 0.15,
+        min_frames_per_minute: float = 2.0,
+        max_frames_per_minute: float = 12.0,
+        analysis_fps: float = 2.0,
+        max_hamming_distance: Optional[int] = None,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+    ):
+        self.video_path = video
+        self.container = av.open(video)
+        self.video_stream = self.container.streams.video[0]
+        self.video_stream.thread_type = "AUTO"
+        self.video_fps = float(self.video_stream.average_rate or 0) or None
+        self.frame_size = fit_within(
+            self.video_stream.codec_context.width, self.video_stream.codec_context.height, max_width, max_height
+        )
+
+        timestamps, change_scores, hashes = analyze_scene_changes(video, analysis_fps)
+        self.timestamps = select_scene_timestamps(
+            timestamps,
+            change_scores,
+            change_threshold,
+            min_frames_per_minute,
+            max_frames_per_minute,
+            hashes=hashes,
+            max_hamming_distance=max_hamming_distance,
+        )
+        logger.info(
+            f"Selected {len(self.timestamps)} frames out of {len(timestamps)} analyzed samples of {self.video_path}"
+        )
+        self.set_pos(0)
+
+    @classmethod
+    def input_schema(cls) -> dict[str, ts.ColumnType]:
+        return {
+            "video": ts.VideoType(nullable=False),
+            "change_threshold": ts.FloatType(nullable=True),
+            "min_frames_per_minute": ts.FloatType(nullable=True),
+            "max_frames_per_minute": ts.FloatType(nullable=True),
+            "analysis_fps": ts.FloatType(nullable=True),
+            "max_hamming_distance": ts.IntType(nullable=True),
+            "max_width": ts.IntType(nullable=True),
+            "max_height": ts.IntType(nullable=True),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> tuple[dict[str, ts.ColumnType], list[str]]:
+        return (
+            {
+                "frame_idx": ts.IntType(),
+                "pos_msec": ts.FloatType(),
+                "pos_frame": ts.IntType(),
+                "frame": ts.ImageType(),
+            },
+            ["frame"],
+        )
+
+    def __next__(self) -> dict[str, Any]:
+        if self.next_pos >= len(self.timestamps):
+            raise StopIteration
+        try:
+            frame_time, frame = next(self._frames)
+        except StopIteration:
+            raise StopIteration from None
+        width, height = self.frame_size
+        result = {
+            "frame_idx": self.next_pos,
+            "pos_msec": frame_time * 1000.0,
+            "pos_frame": round(frame_time * self.video_fps) if self.video_fps else self.next_pos,
+            "frame": frame.to_image(width=width, height=height, interpolation="AREA"),
+        }
+        self.next_pos += 1
+        return result
+
+    def close(self) -> None:
+        self.container.close()
+
+    def set_pos(self, pos: int) -> None:
+        self.next_pos = pos
+        self._frames = decode_frames_at(self.container, self.video_stream, self.timestamps[pos:])
+
+
+def evenly_spaced_timestamps(video_stream: av.video.stream.VideoStream, num_frames: int) -> List[float]:
+    """Timestamps in seconds of `num_frames` frames spread evenly over a video stream, as FrameIterator picks them."""
+    if video_stream.duration is not None:
+        duration = float(video_stream.duration * video_stream.time_base)
+    elif video_stream.container.duration is not None:
+        duration = video_stream.container.duration / av.time_base
+    else:
+        duration = 0.0
+    if num_frames <= 0 or duration <= 0:
+        return []
+    spacing = duration / num_frames
+    return [pos * spacing for pos in range(num_frames)]
+
+
+# Timestamps of the frames kept by SparseFrameIterator once near-duplicates are dropped, by video file and settings.
+# Only the most recently used entries are kept; an evicted one is found again by decoding the samples.
+_KEPT_TIMESTAMPS: OrderedDict[tuple, tuple[float, ...]] = OrderedDict()
+MAX_KEPT_TIMESTAMPS_ENTRIES = 256
+
+
+def _get_kept_timestamps(key: tuple) -> Optional[tuple[float, ...]]:
+    timestamps = _KEPT_TIMESTAMPS.get(key)
+    if timestamps is not None:
+        _KEPT_TIMESTAMPS.move_to_end(key)
+    return timestamps
+
+
+def _put_kept_timestamps(key: tuple, timestamps: tuple[float, ...]):
+    _KEPT_TIMESTAMPS[key] = timestamps
+    _KEPT_TIMESTAMPS.move_to_end(key)
+    while len(_KEPT_TIMESTAMPS) > MAX_KEPT_TIMESTAMPS_ENTRIES:
+        _KEPT_TIMESTAMPS.popitem(last=False)
+
+
+class SparseFrameIterator(ComponentIterator):
+    """
+    Iterator over `num_frames` evenly spaced frames of a video, decoding only the GOPs that hold them.
+
+    Unlike FrameIterator, which decodes every frame up to each sample, each sample is reached by
+    seeking to the keyframe before it (see `decode_frames_at`), so the decoding cost grows with the
+    number of samples rather than with the length of the video. Frames are scaled down to fit within
+    `max_width` x `max_height` while being converted to RGB, rather than converted at full size and
+    resized afterwards.
+
+    Args:
+        video: Path to the video file.
+        num_frames: Number of evenly spaced frames to sample.
+        max_width: If set, frames are scaled down to this width at conversion time.
+        max_height: If set, frames are scaled down to this height at conversion time.
+        max_hamming_distance: If set, frames whose dHash is within this distance of the
+            previous kept frame are dropped as near-duplicates. The hashes are computed from
+            the frames as they are decoded, so each sample is decoded once. Dropped frames get
+            no row, so frame searches only return the timestamps of kept frames.
+    """
+
+    def __init__(
+        self,
+        video: str,
+        *,
+        num_frames: int,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        max_hamming_distance: Optional[int] = None,
+    ):
+        self.video_path = video
+        self.container = av.open(video)
+        self.video_stream = self.container.streams.video[0]
+        self.video_stream.thread_type = "AUTO"
+        self.video_fps = float(self.video_stream.average_rate or 0) or None
+        self.frame_size = fit_within(
+            self.video_stream.codec_context.width, self.video_stream.codec_context.height, max_width, max_height
+        )
+
+        self.sample_timestamps = evenly_spaced_timestamps(self.video_stream, num_frames)
+        self.max_hamming_distance = max_hamming_distance
+        if max_hamming_distance is None:
+            self.timestamps: Optional[Sequence[float]] = self.sample_timestamps
+        else:
+            stat = os.stat(video)
+            self._dedup_key = (video, stat.st_mtime_ns, stat.st_size, num_frames, max_hamming_distance)
+            # Unknown until the samples have been decoded once.
+            self.timestamps = _get_kept_timestamps(self._dedup_key)
+        self.set_pos(0)
+
+    def _distinct_frames(self) -> Iterator[tuple[float, av.VideoFrame]]:
+        """Decode the samples in order, dropping those within `max_hamming_distance` of the last kept one."""
+        kept_timestamps: List[float] = []
+        last_hash: Optional[int] = None
+        for frame_time, frame in decode_frames_at(self.container, self.video_stream, self.sample_timestamps):
+            hash_pixels = frame.to_ndarray(width=DHASH_SIZE + 1, height=DHASH_SIZE, format="gray").astype(np.int16)
+            frame_hash = dhash(hash_pixels)
+            if last_hash is not None and hamming_distance(frame_hash, last_hash) <= self.max_hamming_distance:
+                continue
+            last_hash = frame_hash
+            kept_timestamps.append(frame_time)
+            yield frame_time, frame
+
+        self.timestamps = tuple(kept_timestamps)
+        _put_kept_timestamps(self._dedup_key, self.timestamps)
+        logger.info(
+            f"Kept {len(kept_timestamps)} distinct frames out of {len(self.sample_timestamps)} sampled frames "
+            f"of {self.video_path}"
+        )
+
+    @classmethod
+    def input_schema(cls) -> dict[str, ts.ColumnType]:
+        return {
+            "video": ts.VideoType(nullable=False),
+            "num_frames": ts.IntType(nullable=False),
+            "max_width": ts.IntType(nullable=True),
+            "max_height": ts.IntType(nullable=True),
+            "max_hamming_distance": ts.IntType(nullable=True),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> tuple[dict[str, ts.ColumnType], list[str]]:
+        return (
+            {
+                "frame_idx": ts.IntType(),
+                "pos_msec": ts.FloatType(),
+                "pos_frame": ts.IntType(),
+                "frame": ts.ImageType(),
+            },
+            ["frame"],
+        )
+
+    def __next__(self) -> dict[str, Any]:
+        if self.timestamps is not None and self.next_pos >= len(self.timestamps):
+            raise StopIteration
+        try:
+            frame_time, frame = next(self._frames)
+        except StopIteration:
+            raise StopIteration from None
+        width, height = self.frame_size
+        result = {
+            "frame_idx": self.next_pos,
+            "pos_msec": frame_time * 1000.0,
+            "pos_frame": round(frame_time * self.video_fps) if self.video_fps else self.next_pos,
+            "frame": frame.to_image(width=width, height=height, interpolation="AREA"),
+        }
+        self.next_pos += 1
+        return result
+
+    def close(self) -> None:
+        self.container.close()
+
+    def set_pos(self, pos: int) -> None:
+        self.next_pos = pos
+        if self.timestamps is None:
+            if pos == 0:
+                self._frames = self._distinct_frames()
+                return
+            for _ in self._distinct_frames():
+                pass
+        self._frames = decode_frames_at(self.container, self.video_stream, self.timestamps[pos:])
+
+
+class AudioChunkIterator(ComponentIterator):
+    """
+    Iterator over the time ranges of fixed-duration, overlapping chunks of an audio file.
+
+    Unlike `AudioSplitter`, no chunk file is written: the transcription and voice activity
+    detection UDFs decode each range from the audio file into memory when they need it.
+
+    Args:
+        audio: Path to the audio file.
+        chunk_duration_sec: Duration of each chunk.
+        overlap_sec: Overlap between consecutive chunks.
+        min_chunk_duration_sec: The last chunk is dropped if it is shorter than this.
+    """
+
+    def __init__(
+        self,
+        audio: str,
+        *,
+        chunk_duration_sec: float,
+        overlap_sec: float = 0.0,
+        min_chunk_duration_sec: float = 0.0,
+    ):
+        with av.open(audio) as container:
+            duration = container.duration / av.time_base if container.duration is not None else 0.0
+
+        self.chunks: List[tuple[float, float]] = []
+        start = 0.0
+        while start < duration:
+            end = min(start + chunk_duration_sec, duration)
+            if end - start >= min_chunk_duration_sec:
+                self.chunks.append((start, end))
+            if end >= duration:
+                break
+            start = end - overlap_sec
+        self.next_pos = 0
+
+    @classmethod
+    def input_schema(cls) -> dict[str, ts.ColumnType]:
+        return {
+            "audio": ts.AudioType(nullable=False),
+            "chunk_duration_sec": ts.FloatType(nullable=False),
+            "overlap_sec": ts.FloatType(nullable=True),
+            "min_chunk_duration_sec": ts.FloatType(nullable=True),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> tuple[dict[str, ts.ColumnType], list[str]]:
+        return {"start_time_sec": ts.FloatType(), "end_time_sec": ts.FloatType()}, []
+
+    def __next__(self) -> dict[str, Any]:
+        if self.next_pos >= len(self.chunks):
+            raise StopIteration
+        start, end = self.chunks[self.next_pos]
+        self.next_pos += 1
+        return {"start_time_sec": round(start, 4), "end_time_sec": round(end, 4)}
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        self.next_pos = pos
@@ -1,16 +1,24 @@
 import base64
 import io
-from typing import List, Literal, Union
+from typing import Dict, List, Literal, Optional, Union
 
 import pixeltable as pxt
 from PIL import Image
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, computed_field, field_validator
 
 #####################################
 # Table Registry Models
 #####################################
 
 
+class IndexSegment(BaseModel):
+    video_cache: str = Field(..., description="Path to the segment cache")
+    video_table: str = Field(..., description="Root table of the segment")
+    frames_view: str = Field(..., description="Frames view of the segment")
+    audio_chunks_view: str = Field(..., description="Audio chunks view of the segment")
+    start_offset_sec: float = Field(..., description="Start time of the segment in the full video")
+
+
 class CachedTableMetadata(BaseModel):
     video_name: str = Field(..., description="Name of the video")
     video_cache: str = Field(..., description="Path to the video cache")
@@ -20,6 +28,15 @@ class CachedTableMetadata(BaseModel):
         ...,
         description="After chunking audio, getting transcript and splitting it into sentences",
     )
+    content_hash: Optional[str] = Field(default=None, description="SHA-256 fingerprint of the video file")
+    segments: List[IndexSegment] = Field(
+        default_factory=list, description="Segments of a video ingested in parallel, empty for a single index"
+    )
+
+
+class IngestionCheckpoint(CachedTableMetadata):
+    completed_stages: List[str] = Field(default_factory=list, description="Ingestion stages already computed")
+    updated_at: float = Field(..., description="Time of the latest completed stage, as a UNIX timestamp")
 
 
 class CachedTable:
@@ -38,24 +55,44 @@ class CachedTable:
         video_table: pxt.Table,
         frames_view: pxt.Table,
         audio_chunks_view: pxt.Table,
+        start_offset_sec: float = 0.0,
+        segments: Optional[List["CachedTable"]] = None,
     ):
         self.video_name = video_name
         self.video_cache = video_cache
         self.video_table = video_table
         self.frames_view = frames_view
         self.audio_chunks_view = audio_chunks_view
+        self.start_offset_sec = start_offset_sec
+        self.segments = segments or []
 
     @classmethod
     def from_metadata(cls, metadata: dict | CachedTableMetadata) -> "CachedTable":
         metadata = CachedTableMetadata(**metadata) if isinstance(metadata, dict) else metadata
+        segments = [
+            cls(
+                video_name=metadata.video_name,
+                video_cache=segment.video_cache,
+                video_table=pxt.get_table(segment.video_table),
+                frames_view=pxt.get_table(segment.frames_view),
+                audio_chunks_view=pxt.get_table(segment.audio_chunks_view),
+                start_offset_sec=segment.start_offset_sec,
+            )
+            for segment in metadata.segments
+        ]
         return cls(
             video_name=metadata.video_name,
             video_cache=metadata.video_cache,
             video_table=pxt.get_table(metadata.video_table),
             frames_view=pxt.get_table(metadata.frames_view),
             audio_chunks_view=pxt.get_table(metadata.audio_chunks_view),
+            segments=segments,
         )
 
+    def parts(self) -> List["CachedTable"]:
+        """The tables to search: the segments of a segmented index, or the index itself."""
+        return self.segments or [self]
+
     def __str__(self):
         return {
             "video_cache": self.video_cache,
@@ -68,6 +105,96 @@ class CachedTable:
         """Returns a string describing the video table."""
         return f"Video index '{self.video_name}' info: {', '.join(self.video_table.columns)}"
 
+######################################
+# Ingestion Progress Models
+######################################
+
+
+class StageMetrics(BaseModel):
+    name: str = Field(..., description="Name of the ingestion stage")
+    status: Literal["pending", "running", "completed", "failed"] = "pending"
+    rows: int = Field(default=0, description="Rows in the stage's table once the stage completed")
+    elapsed_sec: float = Field(default=0.0, description="Wall-clock time spent in the stage")
+
+    @computed_field
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+
+class CacheMetrics(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    entries: int = Field(default=0, description="Entries currently stored")
+    size_bytes: int = Field(default=0, description="Size of the stored entries")
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class IngestionProgress(BaseModel):
+    video_name: str = Field(..., description="Name of the video being ingested")
+    stages: List[StageMetrics] = Field(default_factory=list)
+
+    @computed_field
+    @property
+    def current_stage(self) -> Optional[str]:
+        return next((stage.name for stage in self.stages if stage.status == "running"), None)
+
+    @computed_field
+    @property
+    def completed_stages(self) -> int:
+        return sum(stage.status == "completed" for stage in self.stages)
+
+    def stage(self, name: str) -> StageMetrics:
+        return next(stage for stage in self.stages if stage.name == name)
+
+
+class BatchIngestionProgress(BaseModel):
+    total: int = Field(..., description="Number of videos in the batch")
+    videos: Dict[str, Literal["pending", "running", "completed", "skipped", "failed"]] = Field(
+        default_factory=dict, description="Status of each video in the batch"
+    )
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error message of each failed video")
+
+    @computed_field
+    @property
+    def completed(self) -> int:
+        return sum(status == "completed" for status in self.videos.values())
+
+    @computed_field
+    @property
+    def skipped(self) -> int:
+        return sum(status == "skipped" for status in self.videos.values())
+
+    @computed_field
+    @property
+    def failed(self) -> int:
+        return sum(status == "failed" for status in self.videos.values())
+
+    @computed_field
+    @property
+    def done(self) -> int:
+        return self.completed + self.skipped + self.failed
+
+
+######################################
+# Frame Captioning Models
+######################################
+
+
+class FrameCaption(BaseModel):
+    index: int = Field(..., description="1-based number of the image in the request")
+    caption: str = Field(..., description="Caption of the image")
+
+
+class BatchCaptionResponse(BaseModel):
+    captions: List[FrameCaption]
+
+
 ######################################
 # Image Processing Models
 ######################################
@@ -3,17 +3,28 @@ import os
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Set
 
 from loguru import logger
 
 import kubrick_mcp.video.ingestion.constants as cc
-from kubrick_mcp.video.ingestion.models import CachedTable, CachedTableMetadata
+from kubrick_mcp.video.ingestion.models import CachedTable, CachedTableMetadata, IndexSegment
 
 logger = logger.bind(name="TableRegistry")
 
 
 VIDEO_INDEXES_REGISTRY: Dict[str, CachedTableMetadata] = {}
+CONTENT_HASH_INDEX: Dict[str, str] = {}
+# Opened Pixeltable handles of registered indexes, dropped whenever their registry entry changes.
+TABLE_HANDLES: Dict[str, CachedTable] = {}
+# Bumped whenever an index is registered, for caches built over the whole registry.
+REGISTRY_VERSION = 0
+
+
+def _as_metadata(value: str | dict | CachedTableMetadata) -> CachedTableMetadata:
+    if isinstance(value, str):
+        value = json.loads(value)
+    return CachedTableMetadata(**value) if isinstance(value, dict) else value
 
 
 # Hit cache on multiple calls to get_registry
@@ -39,9 +50,9 @@ def get_registry() -> Dict[str, CachedTableMetadata]:
                 with open(str(latest_registry), "r") as f:
                     VIDEO_INDEXES_REGISTRY = json.load(f)
                     for key, value in VIDEO_INDEXES_REGISTRY.items():
-                        if isinstance(value, str):
-                            value = json.loads(value)
-                        VIDEO_INDEXES_REGISTRY[key] = CachedTableMetadata(**value)
+                        VIDEO_INDEXES_REGISTRY[key] = _as_metadata(value)
+                        if VIDEO_INDEXES_REGISTRY[key].content_hash:
+                            CONTENT_HASH_INDEX.setdefault(VIDEO_INDEXES_REGISTRY[key].content_hash, key)
                 logger.info(f"Loading registry from {latest_registry}")
         except FileNotFoundError:
             logger.warning("Registry file not found. Returning empty registry.")
@@ -55,6 +66,8 @@ def add_index_to_registry(
     video_cache: str,
     frames_view_name: str,
     audio_view_name: str,
+    content_hash: Optional[str] = None,
+    segments: Optional[List[IndexSegment]] = None,
 ):
     """
     Register a video index in the global registry.
@@ -67,17 +80,25 @@ def add_index_to_registry(
         frames_view_name (str): The name of the frames view.
         sentences_view_name (str): The name of the sentences view.
         semantics_index_name (str): The name of the semantics index.
+        content_hash (Optional[str]): Fingerprint of the video file, used to deduplicate uploads.
+        segments (Optional[List[IndexSegment]]): Segments of a video ingested in parallel.
 
     """
-    global VIDEO_INDEXES_REGISTRY
+    global VIDEO_INDEXES_REGISTRY, REGISTRY_VERSION
     cached_table_meta = CachedTableMetadata(
         video_name=video_name,
         video_cache=video_cache,
         video_table=f"{video_cache}.table",
         frames_view=frames_view_name,
         audio_chunks_view=audio_view_name,
+        content_hash=content_hash,
+        segments=segments or [],
     ).model_dump_json()
     VIDEO_INDEXES_REGISTRY[video_name] = cached_table_meta
+    TABLE_HANDLES.pop(video_name, None)
+    REGISTRY_VERSION += 1
+    if content_hash:
+        CONTENT_HASH_INDEX.setdefault(content_hash, video_name)
 
     dt = datetime.now()
     dtstr = dt.strftime("%Y-%m-%d%H:%M:%S")
@@ -93,17 +114,63 @@ def add_index_to_registry(
     logger.info(f"Video index '{video_name}' registered in the global registry.")
 
 
-def get_table(video_name: str) -> Dict[str, CachedTable]:
+def get_table(video_name: str) -> Optional[CachedTable]:
     """
-    Get the global video index registry.
+    Get the tables of a registered video index.
+
+    The Pixeltable handles are opened on first use and kept until the index is registered again.
+
+    Args:
+        video_name (str): The name of the video index.
+
+    Returns:
+        Optional[CachedTable]: The tables of the index, or None if it is not registered.
+    """
+    cached_table = TABLE_HANDLES.get(video_name)
+    if cached_table is not None:
+        return cached_table
+
+    metadata = get_registry().get(video_name)
+    if metadata is None:
+        return None
+    logger.info(f"Opening tables of video index '{video_name}'")
+    cached_table = CachedTable.from_metadata(_as_metadata(metadata))
+    TABLE_HANDLES[video_name] = cached_table
+    return cached_table
+
+
+def get_registry_version() -> int:
+    """Number of indexes registered since the server started; changes whenever the registry does."""
+    return REGISTRY_VERSION
+
+
+def get_video_caches() -> Set[str]:
+    """
+    Get the cache directories of every registered video index.
+
+    Returns:
+        Set[str]: The Pixeltable directories holding registered indexes.
+    """
+    video_caches = set()
+    for value in get_registry().values():
+        metadata = _as_metadata(value)
+        video_caches.add(metadata.video_cache)
+        video_caches.update(segment.video_cache for segment in metadata.segments)
+    return video_caches
+
+
+def get_index_by_content_hash(content_hash: str) -> Optional[CachedTableMetadata]:
+    """
+    Find an existing video index built from a file with the given fingerprint.
+
+    Args:
+        content_hash (str): Fingerprint of the video file.
 
     Returns:
-        Dict[str, CachedTable]: The video index registry.
+        Optional[CachedTableMetadata]: Metadata of the existing index, or None.
     """
     registry = get_registry()
-    logger.info(f"Registry: {registry}")
-    metadata = registry.get(video_name)
-    if isinstance(metadata, str):
-        metadata = json.loads(metadata)
-    logger.info(f"Metadata: {metadata}")
-    return CachedTable.from_metadata(metadata)
+    video_name = CONTENT_HASH_INDEX.get(content_hash)
+    if video_name is None or video_name not in registry:
+        return None
+    return _as_metadata(registry[video_name])
@@ -1,7 +1,9 @@
 import base64
+import hashlib
 import subprocess
 from io import BytesIO
 from pathlib import Path
+from typing import Optional
 
 import av
 import loguru
@@ -52,6 +54,19 @@ def extract_video_clip(video_path: str, start_time: float, end_time: float, outp
         raise IOError(f"Failed to extract video clip: {str(e)}")
 
 
+def compute_content_hash(video_path: str) -> str:
+    """Compute a SHA-256 fingerprint of a video or audio file, streaming it from disk.
+
+    Args:
+        video_path (str): Path to the media file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    with open(video_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
 def encode_image(image: str | Image.Image) -> str:
     """Encode an image to base64 string.
 
@@ -108,16 +123,17 @@ def decode_image(base64_string: str) -> Image.Image:
         raise IOError(f"Failed to decode image: {str(e)}")
 
 
-def re_encode_video(video_path: str) -> str:
+def re_encode_video(video_path: str) -> Optional[str]:
     """
     Re-encode a video file to ensure compatibility with PyAV.
 
     Note: In case a video was downloaded from the web, it may not be compatible with PyAV.
-    This function attempts to re-encode the video using FFmpeg and returns the path to the re-encoded video.
+    If PyAV cannot open the video, this function attempts to re-encode it using FFmpeg and
+    returns the path to the re-encoded video, or None if that fails too.
     """
     if not Path(video_path).exists():
         logger.error(f"Error: Video file not found at {video_path}")
-        return False
+        return None
 
     try:
         with av.open(video_path) as _:
@@ -125,30 +141,96 @@ def re_encode_video(video_path: str) -> str:
             return str(video_path)
     except Exception as e:
         logger.error(f"An unexpected error occurred while trying to open video {video_path}: {e}")
-    finally:
-        o_dir, o_fname = Path(video_path).parent, Path(video_path).name
-        reencoded_filename = f"re_{o_fname}"
-        reencoded_video_path = Path(o_dir) / reencoded_filename
 
-        command = ["ffmpeg", "-i", video_path, "-c", "copy", str(reencoded_video_path)]
+    o_dir, o_fname = Path(video_path).parent, Path(video_path).name
+    reencoded_filename = f"re_{o_fname}"
+    reencoded_video_path = Path(o_dir) / reencoded_filename
+
+    command = ["ffmpeg", "-y", "-i", video_path, "-c", "copy", str(reencoded_video_path)]
 
-        logger.info(f"Attempting to re-encode video using FFmpeg: {' '.join(command)}")
+    logger.info(f"Attempting to re-encode video using FFmpeg: {' '.join(command)}")
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        logger.info(f"FFmpeg re-encoding successful for {video_path} to {reencoded_video_path}")
+        logger.debug(f"FFmpeg stdout: {result.stdout}")
+        logger.debug(f"FFmpeg stderr: {result.stderr}")
 
         try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            logger.info(f"FFmpeg re-encoding successful for {video_path} to {reencoded_video_path}")
-            logger.debug(f"FFmpeg stdout: {result.stdout}")
-            logger.debug(f"FFmpeg stderr: {result.stderr}")
-
-            try:
-                with av.open(reencoded_video_path) as _:
-                    logger.info(f"Re-encoded video {reencoded_video_path} successfully opened by PyAV.")
-                    return str(reencoded_video_path)
-            except Exception as e:
-                logger.error(
-                    f"An unexpected error occurred while trying to open re-encoded video {reencoded_video_path}: {e}"
-                )
-                return None
+            with av.open(reencoded_video_path) as _:
+                logger.info(f"Re-encoded video {reencoded_video_path} successfully opened by PyAV.")
+                return str(reencoded_video_path)
         except Exception as e:
-            logger.error(f"An unexpected error occurred during FFmpeg re-encoding: {e}")
+            logger.error(
+                f"An unexpected error occurred while trying to open re-encoded video {reencoded_video_path}: {e}"
+            )
             return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during FFmpeg re-encoding: {e}")
+        return None
+
+
+def get_video_duration(video_path: str) -> float:
+    """Get the duration of a video in seconds, from its container metadata."""
+    with av.open(video_path) as container:
+        if container.duration is not None:
+            return container.duration / av.time_base
+        stream = container.streams.video[0]
+        return float((stream.duration or 0) * stream.time_base)
+
+
+def split_video_at_keyframes(video_path: str, segment_duration_sec: float, output_dir: str) -> list[tuple[str, float]]:
+    """Split a video into segments of about `segment_duration_sec` seconds without re-encoding.
+
+    The streams are copied as-is, so FFmpeg can only cut on keyframes: each segment starts at the
+    first keyframe after its nominal start. Segments already produced in `output_dir` are reused.
+
+    Args:
+        video_path (str): Path to the video file.
+        segment_duration_sec (float): Target duration of each segment.
+        output_dir (str): Directory where the segments and their list are written.
+
+    Returns:
+        list[tuple[str, float]]: The path of each segment and its start time in the full video, in order.
+    """
+    output_dir = Path(output_dir)
+    segment_list = output_dir / "segments.csv"
+    if not segment_list.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_segment_list = output_dir / "segments.csv.tmp"
+        command = [
+            "ffmpeg",
+            "-i",
+            video_path,
+            "-map",
+            "0:v:0",
+            "-map",
+            "0:a?",
+            "-c",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_time",
+            str(segment_duration_sec),
+            "-reset_timestamps",
+            "1",
+            "-segment_list",
+            str(tmp_segment_list),
+            "-segment_list_type",
+            "csv",
+            "-y",
+            str(output_dir / f"segment_%04d{Path(video_path).suffix or '.mp4'}"),
+        ]
+        logger.info(f"Splitting video into segments: {' '.join(command)}")
+        try:
+            subprocess.run(command, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise IOError(f"Failed to split video {video_path}: {e.stderr}")
+        tmp_segment_list.replace(segment_list)
+
+    segments = []
+    for line in segment_list.read_text().splitlines():
+        if line.strip():
+            filename, start, _ = line.rsplit(",", 2)
+            segments.append((str(output_dir / filename), float(start)))
+    return segments
@@ -0,0 +1,56 @@
+import numpy as np
+
+from kubrick_mcp.video.ingestion.audio import SPEECH_SAMPLE_RATE
+
+VAD_FRAME_MS = 30
+# Telephone band, where most of the energy of voiced speech lies.
+SPEECH_BAND_HZ = (300.0, 3400.0)
+# A speech frame must stand this far above the quietest frames of its chunk.
+NOISE_FLOOR_MARGIN_DB = 6.0
+# Cap on the noise floor, in dBFS: in speech without pauses, even the quietest frames are speech, not background
+# noise. Louder broadband noise is left to the flatness check.
+MAX_NOISE_FLOOR_DB = -40.0
+MIN_SPEECH_BAND_RATIO = 0.5
+# Broadband noise (crowds, wind, hiss) has a flat spectrum, close to 1; voiced speech is peaky.
+MAX_SPECTRAL_FLATNESS = 0.4
+
+
+def detect_speech_frames(samples: np.ndarray, sample_rate: int, energy_threshold_db: float) -> np.ndarray:
+    """Classify each 30 ms frame of a signal as speech or not.
+
+    A frame is speech if it is loud enough (above `energy_threshold_db` dBFS and above the
+    chunk's noise floor), if most of its energy is in the speech band, and if its spectrum
+    is not flat like broadband noise. The noise floor is the 10th percentile of frame energies,
+    capped at `MAX_NOISE_FLOOR_DB` so that speech without pauses is not taken for the floor.
+
+    Args:
+        samples (np.ndarray): Mono samples in [-1, 1].
+        sample_rate (int): Sample rate of `samples`.
+        energy_threshold_db (float): Minimum frame energy, in dBFS.
+
+    Returns:
+        np.ndarray: One boolean per frame.
+    """
+    frame_length = sample_rate * VAD_FRAME_MS // 1000
+    num_frames = len(samples) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = samples[: num_frames * frame_length].reshape(num_frames, frame_length)
+
+    energy_db = 10.0 * np.log10(np.mean(frames**2, axis=1) + 1e-10)
+    noise_floor_db = min(np.percentile(energy_db, 10), MAX_NOISE_FLOOR_DB)
+    loud = (energy_db > energy_threshold_db) & (energy_db > noise_floor_db + NOISE_FLOOR_MARGIN_DB)
+
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(frame_length), axis=1)) ** 2 + 1e-12
+    freqs = np.fft.rfftfreq(frame_length, d=1.0 / sample_rate)
+    in_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    band_ratio = spectrum[:, in_band].sum(axis=1) / spectrum.sum(axis=1)
+    flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+
+    return loud & (band_ratio >= MIN_SPEECH_BAND_RATIO) & (flatness <= MAX_SPECTRAL_FLATNESS)
+
+
+def speech_ratio(samples: np.ndarray, energy_threshold_db: float) -> float:
+    """Share of the 30 ms frames of 16 kHz mono 16-bit samples classified as speech."""
+    speech = detect_speech_frames(samples.astype(np.float32) / 32768.0, SPEECH_SAMPLE_RATE, energy_threshold_db)
+    return float(speech.mean()) if len(speech) else 0.0
@@ -1,20 +1,27 @@
+import time
 import uuid
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
 import pixeltable as pxt
 from loguru import logger
-from pixeltable.functions import openai
 from pixeltable.functions.huggingface import clip
-from pixeltable.functions.openai import embeddings, vision
-from pixeltable.functions.video import extract_audio
-from pixeltable.iterators import AudioSplitter
-from pixeltable.iterators.video import FrameIterator
 
+import kubrick_mcp.video.ingestion.checkpoints as checkpoints
 import kubrick_mcp.video.ingestion.registry as registry
 from kubrick_mcp.config import get_settings
-from kubrick_mcp.video.ingestion.functions import extract_text_from_chunk, resize_image
-from kubrick_mcp.video.ingestion.tools import re_encode_video
+from kubrick_mcp.video.ingestion.cache import get_result_cache
+from kubrick_mcp.video.ingestion.functions import (
+    cached_embeddings,
+    cached_transcriptions,
+    caption_frames,
+    detect_speech,
+    extract_speech_audio,
+    extract_text_from_chunk,
+)
+from kubrick_mcp.video.ingestion.iterators import AudioChunkIterator, SceneChangeFrameIterator, SparseFrameIterator
+from kubrick_mcp.video.ingestion.models import IngestionCheckpoint, IngestionProgress, StageMetrics
+from kubrick_mcp.video.ingestion.tools import compute_content_hash, re_encode_video
 
 if TYPE_CHECKING:
     from kubrick_mcp.video.ingestion.models import CachedTable
@@ -22,6 +29,27 @@ if TYPE_CHECKING:
 logger = logger.bind(name="VideoProcessor")
 settings = get_settings()
 
+INGESTION_STAGES = [
+    "insert_video",
+    "extract_audio",
+    "split_audio",
+    "detect_speech",
+    "transcribe_audio",
+    "embed_transcripts",
+    "extract_frames",
+    "embed_frames",
+    "caption_frames",
+    "embed_captions",
+]
+
+
+def ingestion_stages() -> list[str]:
+    """The ingestion stages run with the current settings."""
+    return [name for name in INGESTION_STAGES if settings.VAD_ENABLED or name != "detect_speech"]
+
+
+ProgressCallback = Callable[[IngestionProgress], None]
+
 
 class VideoProcessor:
     def __init__(
@@ -32,40 +60,118 @@ class VideoProcessor:
         self._frames_view = None
         self._audio_chunks = None
         self._video_mapping_idx: Optional[str] = None
+        self._pipeline_ready = False
+        self._content_hash: Optional[str] = None
+        self._is_duplicate = False
+        self._register = True
+        self._checkpoint: Optional[IngestionCheckpoint] = None
+        self._progress: Optional[IngestionProgress] = None
+        self._progress_callback: Optional[ProgressCallback] = None
 
         logger.info(
             "VideoProcessor initialized",
+            f"\n Frame sampling: {settings.FRAME_SAMPLING_MODE}",
             f"\n Split FPS: {settings.SPLIT_FRAMES_COUNT}",
             f"\n Audio Chunk: {settings.AUDIO_CHUNK_LENGTH} seconds",
         )
 
-    def setup_table(self, video_name: str):
+    def setup_table(self, video_name: str, register: bool = True):
+        """
+        Load the index of a video, resume its unfinished ingestion, or create its cache directory and root table.
+
+        A video whose file content matches an already indexed video is registered under
+        its new name as an alias of the existing index, and nothing is recomputed. A new index
+        is only registered once every ingestion stage completed; until then its progress is
+        checkpointed, so that a failed ingestion resumes where it stopped.
+
+        Args:
+            video_name (str): The name of the video index.
+            register (bool): Whether to add a new index to the registry once it is ready. Worker
+                processes pass False and let the parent register `registry_entry()` and then
+                delete the checkpoint instead.
+        """
         self._video_mapping_idx = video_name
+        self._is_duplicate = False
+        self._register = register
+        self._checkpoint = None
         exists = self._check_if_exists(video_name)
-        if exists:
+        if not exists and Path(video_name).is_file():
+            self._content_hash = compute_content_hash(video_name)
+            duplicate = registry.get_index_by_content_hash(self._content_hash)
+        else:
+            self._content_hash, duplicate = None, None
+
+        if duplicate is not None:
+            logger.info(f"Video '{video_name}' has the same content as '{duplicate.video_name}', reusing its index.")
+            self.pxt_cache = duplicate.video_cache
+            self.video_table_name = duplicate.video_table
+            self.frames_view_name = duplicate.frames_view
+            self.audio_view_name = duplicate.audio_chunks_view
+            self.video_table = pxt.get_table(self.video_table_name)
+            self._pipeline_ready = True
+            self._is_duplicate = True
+            if register:
+                registry.add_index_to_registry(**self.registry_entry())
+
+        elif exists:
             logger.info(f"Video index '{self._video_mapping_idx}' already exists and is ready for use.")
             cached_table: "CachedTable" = registry.get_table(self._video_mapping_idx)
             self.pxt_cache = cached_table.video_cache
             self.video_table = cached_table.video_table
             self.frames_view = cached_table.frames_view
             self.audio_chunks = cached_table.audio_chunks_view
+            self._pipeline_ready = True
 
         else:
-            self.pxt_cache = f"cache_{uuid.uuid4().hex[-4:]}"
-            self.video_table_name = f"{self.pxt_cache}.table"
-            self.frames_view_name = f"{self.video_table_name}_frames"
-            self.audio_view_name = f"{self.video_table_name}_audio_chunks"
-            self.video_table = None
-
-            self._setup_table()
-
-            registry.add_index_to_registry(
-                video_name=self._video_mapping_idx,
-                video_cache=self.pxt_cache,
-                frames_view_name=self.frames_view_name,
-                audio_view_name=self.audio_view_name,
-            )
-            logger.info(f"Creating new video index '{self.video_table_name}' in '{self.pxt_cache}'")
+            self._pipeline_ready = False
+            checkpoint = checkpoints.load_checkpoint(video_name)
+            if checkpoint is not None and checkpoint.content_hash != self._content_hash:
+                logger.info(f"Video '{video_name}' changed since its last ingestion attempt, starting over.")
+                checkpoints.drop_cache(checkpoint.video_cache)
+                checkpoint = None
+
+            if checkpoint is not None:
+                self.pxt_cache = checkpoint.video_cache
+                self.video_table_name = checkpoint.video_table
+                self.frames_view_name = checkpoint.frames_view
+                self.audio_view_name = checkpoint.audio_chunks_view
+                self.video_table = pxt.get_table(self.video_table_name)
+                self.audio_chunks = pxt.get_table(self.audio_view_name, if_not_exists="ignore")
+                self.frames_view = pxt.get_table(self.frames_view_name, if_not_exists="ignore")
+                logger.info(
+                    f"Resuming ingestion of '{video_name}' in '{self.pxt_cache}' "
+                    f"after stages {checkpoint.completed_stages}"
+                )
+            else:
+                self.pxt_cache = f"cache_{uuid.uuid4().hex[-4:]}"
+                self.video_table_name = f"{self.pxt_cache}.table"
+                self.frames_view_name = f"{self.video_table_name}_frames"
+                self.audio_view_name = f"{self.video_table_name}_audio_chunks"
+                self.video_table = None
+
+                self._setup_table()
+                checkpoint = IngestionCheckpoint(
+                    video_name=self._video_mapping_idx,
+                    video_cache=self.pxt_cache,
+                    video_table=self.video_table_name,
+                    frames_view=self.frames_view_name,
+                    audio_chunks_view=self.audio_view_name,
+                    content_hash=self._content_hash,
+                    updated_at=time.time(),
+                )
+                checkpoints.save_checkpoint(checkpoint)
+                logger.info(f"Creating new video index '{self.video_table_name}' in '{self.pxt_cache}'")
+            self._checkpoint = checkpoint
+
+    def registry_entry(self) -> dict:
+        """Arguments for `registry.add_index_to_registry` describing the current index."""
+        return {
+            "video_name": self._video_mapping_idx,
+            "video_cache": self.pxt_cache,
+            "frames_view_name": self.frames_view_name,
+            "audio_view_name": self.audio_view_name,
+            "content_hash": self._content_hash,
+        }
 
     def _check_if_exists(self, video_path: str) -> bool:
         """
@@ -77,10 +183,83 @@ class VideoProcessor:
         return video_path in existing_tables
 
     def _setup_table(self):
+        """
+        Create the cache directory and the root video table.
+
+        The audio and frame pipelines are added after the video is inserted (see `add_video`), so
+        that each stage is computed, timed and reported on its own rather than inside one insert.
+        """
         self._setup_cache_directory()
         self._create_video_table()
-        self._setup_audio_processing()
-        self._setup_frame_processing()
+
+    def _report_progress(self):
+        if self._progress_callback is not None and self._progress is not None:
+            self._progress_callback(self._progress)
+
+    def _run_stage(self, name: str, table_attr: str, *steps: Callable[[], None]):
+        """
+        Run the steps of an ingestion stage, recording its elapsed time and resulting row count.
+
+        Stages completed by a previous attempt, as recorded in the checkpoint, are skipped, and
+        each newly completed stage is checkpointed.
+
+        Args:
+            name (str): Name of the stage, one of INGESTION_STAGES.
+            table_attr (str): Attribute holding the table whose rows the stage produces.
+            steps: Callables run in order to compute the stage.
+        """
+        stage = self._progress.stage(name)
+        if self._checkpoint is not None and name in self._checkpoint.completed_stages:
+            stage.rows = getattr(self, table_attr).count()
+            stage.status = "completed"
+            logger.info(f"Stage '{name}' already completed by a previous attempt, skipping.")
+            self._report_progress()
+            return
+
+        stage.status = "running"
+        self._report_progress()
+
+        start = time.perf_counter()
+        try:
+            for step in steps:
+                step()
+        except Exception:
+            stage.status = "failed"
+            stage.elapsed_sec = time.perf_counter() - start
+            self._report_progress()
+            raise
+        stage.elapsed_sec = time.perf_counter() - start
+        stage.rows = getattr(self, table_attr).count()
+        stage.status = "completed"
+        if self._checkpoint is not None:
+            self._checkpoint.completed_stages.append(name)
+            checkpoints.save_checkpoint(self._checkpoint)
+
+        logger.info(
+            f"Stage '{name}' completed: {stage.rows} rows in {stage.elapsed_sec:.2f}s ({stage.rows_per_sec:.2f} rows/s)"
+        )
+        self._report_progress()
+
+    def _add_resumable_column(self, table: pxt.Table, name: str, expr):
+        """
+        Add a computed column whose failing rows hold an error instead of aborting the whole column.
+
+        If the column already exists from a previous attempt, only its rows holding an error are
+        recomputed. The stage fails as long as some rows still hold an error, so that the next
+        attempt resumes from them.
+
+        Args:
+            table (pxt.Table): The table to add the column to.
+            name (str): Name of the column.
+            expr: Expression computing the column.
+        """
+        if name in table.columns():
+            table.recompute_columns(name, errors_only=True)
+        else:
+            table.add_computed_column(**{name: expr}, on_error="ignore")
+        failed_rows = table.where(getattr(table, name).errortype != None).count()  # noqa: E711
+        if failed_rows:
+            raise RuntimeError(f"{failed_rows} rows of column '{name}' failed; the next attempt resumes from them")
 
     def _setup_cache_directory(self):
         logger.info(f"Creating cache path {self.pxt_cache}.")
@@ -95,15 +274,22 @@ class VideoProcessor:
         )
 
     def _setup_audio_processing(self):
-        self._add_audio_extraction()
-        self._create_audio_chunks_view()
-        self._add_audio_transcription()
-        self._add_audio_text_extraction()
-        self._add_audio_embedding_index()
+        self._run_stage("extract_audio", "video_table", self._add_audio_extraction)
+        self._run_stage("split_audio", "audio_chunks", self._create_audio_chunks_view)
+        if settings.VAD_ENABLED:
+            self._run_stage("detect_speech", "audio_chunks", self._add_speech_detection)
+        self._run_stage(
+            "transcribe_audio", "audio_chunks", self._add_audio_transcription, self._add_audio_text_extraction
+        )
+        self._run_stage("embed_transcripts", "audio_chunks", self._add_audio_embedding_index)
 
     def _add_audio_extraction(self):
         self.video_table.add_computed_column(
-            audio_extract=extract_audio(self.video_table.video, format="mp3"),
+            audio_extract=extract_speech_audio(
+                self.video_table.video,
+                audio_format=settings.AUDIO_EXTRACTION_FORMAT,
+                bitrate=settings.AUDIO_OPUS_BITRATE,
+            ),
             if_exists="ignore",
         )
 
@@ -111,7 +297,7 @@ class VideoProcessor:
         self.audio_chunks = pxt.create_view(
             self.audio_view_name,
             self.video_table,
-            iterator=AudioSplitter.create(
+            iterator=AudioChunkIterator.create(
                 audio=self.video_table.audio_extract,
                 chunk_duration_sec=settings.AUDIO_CHUNK_LENGTH,
                 overlap_sec=settings.AUDIO_OVERLAP_SECONDS,
@@ -120,49 +306,84 @@ class VideoProcessor:
             if_exists="replace_force",
         )
 
-    def _add_audio_transcription(self):
+    def _add_speech_detection(self):
         self.audio_chunks.add_computed_column(
-            transcription=openai.transcriptions(
-                audio=self.audio_chunks.audio_chunk,
-                model=settings.AUDIO_TRANSCRIPT_MODEL,
+            has_speech=detect_speech(
+                self.audio_chunks.audio_extract,
+                self.audio_chunks.start_time_sec,
+                self.audio_chunks.end_time_sec,
+                energy_threshold_db=settings.VAD_ENERGY_THRESHOLD_DB,
+                min_speech_ratio=settings.VAD_MIN_SPEECH_RATIO,
             ),
             if_exists="ignore",
         )
 
+    def _add_audio_transcription(self):
+        self._add_resumable_column(
+            self.audio_chunks,
+            "transcription",
+            cached_transcriptions(
+                self.audio_chunks.audio_extract,
+                self.audio_chunks.start_time_sec,
+                self.audio_chunks.end_time_sec,
+                has_speech=self.audio_chunks.has_speech if settings.VAD_ENABLED else None,
+                model=settings.AUDIO_TRANSCRIPT_MODEL,
+                audio_format=settings.AUDIO_EXTRACTION_FORMAT,
+                bitrate=settings.AUDIO_OPUS_BITRATE,
+            ),
+        )
+
     def _add_audio_text_extraction(self):
-        self.audio_chunks.add_computed_column(
-            chunk_text=extract_text_from_chunk(self.audio_chunks.transcription),
-            if_exists="ignore",
+        self._add_resumable_column(
+            self.audio_chunks,
+            "chunk_text",
+            extract_text_from_chunk(self.audio_chunks.transcription),
         )
 
     def _add_audio_embedding_index(self):
         self.audio_chunks.add_embedding_index(
             column=self.audio_chunks.chunk_text,
-            string_embed=embeddings.using(model=settings.TRANSCRIPT_SIMILARITY_EMBD_MODEL),
+            string_embed=cached_embeddings.using(model=settings.TRANSCRIPT_SIMILARITY_EMBD_MODEL),
             if_exists="ignore",
             idx_name="chunks_index",
         )
 
     def _setup_frame_processing(self):
-        self._create_frames_view()
-        self._add_frame_embedding_index()
-        self._add_frame_captioning()
-        self._add_caption_embedding_index()
+        self._run_stage("extract_frames", "frames_view", self._create_frames_view)
+        self._run_stage("embed_frames", "frames_view", self._add_frame_embedding_index)
+        self._run_stage("caption_frames", "frames_view", self._add_frame_captioning)
+        self._run_stage("embed_captions", "frames_view", self._add_caption_embedding_index)
+
+    def _create_frame_iterator(self):
+        max_hamming_distance = settings.FRAME_DEDUP_MAX_HAMMING_DISTANCE if settings.FRAME_DEDUP_ENABLED else None
+        if settings.FRAME_SAMPLING_MODE == "adaptive":
+            return SceneChangeFrameIterator.create(
+                video=self.video_table.video,
+                change_threshold=settings.SCENE_CHANGE_THRESHOLD,
+                min_frames_per_minute=settings.MIN_FRAMES_PER_MINUTE,
+                max_frames_per_minute=settings.MAX_FRAMES_PER_MINUTE,
+                analysis_fps=settings.SCENE_ANALYSIS_FPS,
+                max_hamming_distance=max_hamming_distance,
+                max_width=settings.IMAGE_RESIZE_WIDTH,
+                max_height=settings.IMAGE_RESIZE_HEIGHT,
+            )
+        return SparseFrameIterator.create(
+            video=self.video_table.video,
+            num_frames=settings.SPLIT_FRAMES_COUNT,
+            max_width=settings.IMAGE_RESIZE_WIDTH,
+            max_height=settings.IMAGE_RESIZE_HEIGHT,
+            max_hamming_distance=max_hamming_distance,
+        )
 
     def _create_frames_view(self):
         self.frames_view = pxt.create_view(
             self.frames_view_name,
             self.video_table,
-            iterator=FrameIterator.create(video=self.video_table.video, num_frames=settings.SPLIT_FRAMES_COUNT),
+            iterator=self._create_frame_iterator(),
             if_exists="ignore",
         )
-        self.frames_view.add_computed_column(
-            resized_frame=resize_image(
-                self.frames_view.frame,
-                width=settings.IMAGE_RESIZE_WIDTH,
-                height=settings.IMAGE_RESIZE_HEIGHT,
-            )
-        )
+        # The iterator already scales frames; the column keeps its name for existing indexes and search columns.
+        self.frames_view.add_computed_column(resized_frame=self.frames_view.frame, if_exists="ignore")
 
     def _add_frame_embedding_index(self):
         self.frames_view.add_embedding_index(
@@ -172,33 +393,75 @@ class VideoProcessor:
         )
 
     def _add_frame_captioning(self):
-        self.frames_view.add_computed_column(
-            im_caption=vision(
+        self._add_resumable_column(
+            self.frames_view,
+            "im_caption",
+            caption_frames(
+                self.frames_view.resized_frame,
                 prompt=settings.CAPTION_MODEL_PROMPT,
-                image=self.frames_view.resized_frame,
                 model=settings.IMAGE_CAPTION_MODEL,
-            )
+            ),
         )
 
     def _add_caption_embedding_index(self):
         self.frames_view.add_embedding_index(
             column=self.frames_view.im_caption,
-            string_embed=embeddings.using(model=settings.CAPTION_SIMILARITY_EMBD_MODEL),
+            string_embed=cached_embeddings.using(model=settings.CAPTION_SIMILARITY_EMBD_MODEL),
             if_exists="replace_force",
         )
 
-    def add_video(self, video_path: str) -> bool:
+    def add_video(self, video_path: str, progress_callback: Optional[ProgressCallback] = None) -> bool:
         """
-        Add a video to the pixel table.
+        Add a video to the pixel table and compute its ingestion pipeline.
+
+        The index is registered once every stage completed. If a stage fails, the stages and rows
+        computed so far are kept, and calling `setup_table` and `add_video` again resumes from them.
 
         Args:
             video_path (str): The path to the video file.
+            progress_callback (Optional[ProgressCallback]): Called with the ingestion progress
+                whenever a stage starts, completes or fails.
         """
         if not self.video_table:
             raise ValueError("Video table is not initialized. Call setup_table() first.")
+        if self._is_duplicate:
+            logger.info(f"Video {video_path} is a duplicate of an indexed video, skipping ingestion.")
+            return True
         logger.info(f"Adding video {video_path} to table {self.video_table_name}")
 
-        new_video_path = re_encode_video(video_path=video_path)
-        if new_video_path:
-            self.video_table.insert([{"video": video_path}])
+        self._progress = IngestionProgress(
+            video_name=self._video_mapping_idx,
+            stages=[StageMetrics(name=name) for name in ingestion_stages()],
+        )
+        self._progress_callback = progress_callback
+
+        def insert_video():
+            if self.video_table.count() > 0:
+                return
+            new_video_path = re_encode_video(video_path=video_path)
+            # Failing the stage keeps an index without its video from being registered under its content hash.
+            if not new_video_path:
+                raise ValueError(f"Video {video_path} cannot be opened, even after re-encoding it with FFmpeg")
+            self.video_table.insert([{"video": new_video_path}])
+
+        try:
+            self._run_stage("insert_video", "video_table", insert_video)
+            if not self._pipeline_ready:
+                self._setup_audio_processing()
+                self._setup_frame_processing()
+                self._pipeline_ready = True
+                if self._register:
+                    registry.add_index_to_registry(**self.registry_entry())
+                    checkpoints.delete_checkpoint(self.pxt_cache)
+                    self._checkpoint = None
+        finally:
+            self._progress_callback = None
+        if settings.RESULT_CACHE_ENABLED:
+            for kind, metrics in get_result_cache().metrics().items():
+                logger.info(f"Result cache '{kind}': {metrics.hits} hits, {metrics.misses} misses ({metrics.hit_rate:.0%})")
         return True
+
+    @property
+    def progress(self) -> Optional[IngestionProgress]:
+        """Progress of the latest `add_video` call."""
+        return self._progress
@@ -0,0 +1,93 @@
+import time
+from typing import Callable, Dict, List
+
+import click
+import numpy as np
+
+from kubrick_mcp.video.vector_index import embed_query
+from kubrick_mcp.video.video_search_engine import SEARCH_COLUMNS, VideoSearchEngine
+
+TEXT_SEARCHES = [("audio_chunks_view", "chunk_text"), ("frames_view", "im_caption")]
+
+
+def _time_ms(fn: Callable[[], object], runs: int) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def _summary(timings: List[float]) -> str:
+    return f"p50 {np.percentile(timings, 50):8.2f} ms | p95 {np.percentile(timings, 95):8.2f} ms"
+
+
+def benchmark_search_backends(video_name: str, queries: List[str], top_k: int, runs: int) -> Dict[str, Dict]:
+    """
+    Compare the latency and results of the "pixeltable" and "numpy" search backends on a video index.
+
+    For each text-indexed column, every query is run `runs` times end to end on both backends,
+    then the "numpy" backend is timed without the query embedding, which both backends pay
+    alike. Results are compared on the overlap of their top-k rows.
+
+    Args:
+        video_name (str): The name of the video index to search in.
+        queries (List[str]): The text queries to run.
+        top_k (int): Number of results per query.
+        runs (int): Number of timed runs per query.
+
+    Returns:
+        Dict[str, Dict]: The timings in milliseconds and the mean top-k overlap of each searched column.
+    """
+    pixeltable_engine = VideoSearchEngine(video_name, backend="pixeltable")
+    numpy_engine = VideoSearchEngine(video_name, backend="numpy")
+    numpy_engine.load_snapshots()
+
+    report = {}
+    for view, column in TEXT_SEARCHES:
+        select = SEARCH_COLUMNS[(view, column)]
+        skip_empty = view == "audio_chunks_view"
+        timings = {"pixeltable": [], "numpy": [], "numpy_scoring_only": []}
+        overlaps = []
+        for query in queries:
+            for backend, engine in (("pixeltable", pixeltable_engine), ("numpy", numpy_engine)):
+                timings[backend] += _time_ms(
+                    lambda: engine._search(view, column, query, select, top_k, skip_empty=skip_empty), runs
+                )
+
+            parts = numpy_engine.video_index.parts()
+            query_embedding = embed_query(getattr(parts[0], view), column, query)
+            snapshots = [numpy_engine._snapshot(part, view, column) for part in parts]
+            timings["numpy_scoring_only"] += _time_ms(
+                lambda: [snapshot.search(query_embedding, top_k) for snapshot in snapshots], runs
+            )
+
+            expected = pixeltable_engine._search(view, column, query, select, top_k, skip_empty=skip_empty)
+            actual = numpy_engine._search(view, column, query, select, top_k, skip_empty=skip_empty)
+            expected_keys = {(entry["start_offset_sec"], *(entry[name] for name in select)) for entry in expected}
+            actual_keys = {(entry["start_offset_sec"], *(entry[name] for name in select)) for entry in actual}
+            overlaps.append(len(expected_keys & actual_keys) / max(len(expected_keys), 1))
+
+        report[f"{view}.{column}"] = {"timings_ms": timings, "top_k_overlap": float(np.mean(overlaps))}
+    return report
+
+
+@click.command()
+@click.option("--video-name", required=True, help="Name of the video index to search in")
+@click.option("--query", "queries", multiple=True, required=True, help="Text query, can be repeated")
+@click.option("--top-k", default=5, help="Number of results per query")
+@click.option("--runs", default=10, help="Timed runs per query")
+def run_benchmark(video_name, queries, top_k, runs):
+    """
+    Benchmark the "pixeltable" and "numpy" search backends on a video index.
+    """
+    report = benchmark_search_backends(video_name, list(queries), top_k, runs)
+    for search, results in report.items():
+        click.echo(f"{search} (top-{top_k} overlap {results['top_k_overlap']:.2f})")
+        for backend, timings in results["timings_ms"].items():
+            click.echo(f"  {backend:<20} {_summary(timings)}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,318 @@
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pixeltable as pxt
+from loguru import logger
+
+import kubrick_mcp.video.ingestion.constants as cc
+from kubrick_mcp.config import get_settings
+from kubrick_mcp.video.ingestion.cache import image_content_hash
+from kubrick_mcp.video.ingestion.models import CacheMetrics
+
+logger = logger.bind(name="VectorIndex")
+settings = get_settings()
+
+# Rows scored at a time, so that only one block of the float16 matrix is upcast to float32 at once.
+SCORING_BLOCK_ROWS = 8192
+
+
+# `find_embedding_index` and the index's `string_embed`/`image_embed` functions are Pixeltable internals,
+# which is why pixeltable is pinned; tests/test_vector_index.py checks the results against `similarity()`.
+def _embedding_index(table: pxt.Table, column: str):
+    return next(iter(getattr(table, column).find_embedding_index(None, "similarity").values())).idx
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-memory LRU cache of query embeddings, shared by all search engines.
+
+    Entries are keyed by the embedding function (model included) and the normalized query
+    text or the hash of the query image's pixels, so a repeated query is not embedded again.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: tuple[str, str], embedding: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def metrics(self) -> CacheMetrics:
+        with self._lock:
+            return CacheMetrics(
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self._entries),
+                size_bytes=sum(embedding.nbytes for embedding in self._entries.values()),
+            )
+
+
+@lru_cache(maxsize=1)
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """
+    Get the process-wide query embedding cache.
+
+    Returns:
+        QueryEmbeddingCache: The query embedding cache.
+    """
+    return QueryEmbeddingCache(max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE)
+
+
+def normalize_query_text(text: str) -> str:
+    """Unicode-normalize a query and collapse its whitespace, so that trivially different queries share an embedding."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embed_queries(
+    table: pxt.Table,
+    column: str,
+    queries: List[Any],
+    embed_batch: Optional[Callable[[List[Any]], List[np.ndarray]]] = None,
+) -> np.ndarray:
+    """Embed queries with the embedding function of a column's index, as `similarity()` does.
+
+    Embeddings are looked up in the query embedding cache first; the missing ones are computed
+    with `embed_batch` in a single call if given, otherwise one at a time with the index's function.
+
+    Args:
+        table (pxt.Table): The table holding the indexed column.
+        column (str): The indexed column.
+        queries (List[Any]): The texts or PIL images to embed.
+        embed_batch (Optional[Callable]): Embeds a list of queries with the same model as the index.
+
+    Returns:
+        np.ndarray: The (queries, dimensions) matrix of L2-normalized float32 query embeddings.
+    """
+    index = _embedding_index(table, column)
+    queries = [normalize_query_text(query) if isinstance(query, str) else query for query in queries]
+    keys = [
+        (str(index.string_embed), query)
+        if isinstance(query, str)
+        else (str(index.image_embed), image_content_hash(query))
+        for query in queries
+    ]
+
+    cache = get_query_embedding_cache()
+    embeddings: List[Optional[np.ndarray]] = [cache.get(key) for key in keys]
+    misses = [pos for pos, embedding in enumerate(embeddings) if embedding is None]
+    if misses:
+        if embed_batch is not None:
+            computed = embed_batch([queries[pos] for pos in misses])
+        else:
+            computed = [
+                (index.string_embed if isinstance(queries[pos], str) else index.image_embed).exec([queries[pos]], {})
+                for pos in misses
+            ]
+        for pos, embedding in zip(misses, computed):
+            if embedding is None:
+                raise ValueError("Cannot search for an empty query")
+            embeddings[pos] = normalize(np.asarray(embedding, dtype=np.float32))
+            cache.put(keys[pos], embeddings[pos])
+    return np.stack(embeddings)
+
+
+def embed_query(table: pxt.Table, column: str, query: Any) -> np.ndarray:
+    """Embed a single query, see `embed_queries`.
+
+    Returns:
+        np.ndarray: The L2-normalized float32 query embedding.
+    """
+    return embed_queries(table, column, [query])[0]
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize an embedding, or each row of a matrix of embeddings."""
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the `k` highest scores, best first, without sorting all of them."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+class EmbeddingSnapshot:
+    """
+    The embeddings of an indexed column, exported from Pixeltable for in-memory search.
+
+    The L2-normalized embeddings are stored as a float16 matrix in a `.npy` file that is
+    memory-mapped, next to a `.json` file with the `payload` columns of the matching rows.
+    A search is then a matrix-vector product and a partial sort, returning the same
+    cosine similarities as Pixeltable's index. Rows without an embedding, such as audio
+    chunks without speech, are left out.
+
+    Snapshots are named after the table version they were exported from, so a table that
+    changed since is exported again.
+    """
+
+    def __init__(self, embeddings: np.ndarray, rows: List[Dict[str, Any]], path: Path):
+        self.embeddings = embeddings
+        self.rows = rows
+        self.path = path
+
+    @classmethod
+    def load_or_export(cls, table: pxt.Table, column: str, payload: List[str]) -> "EmbeddingSnapshot":
+        """
+        Load the snapshot of the current version of a table, exporting it first if needed.
+
+        Args:
+            table (pxt.Table): The table holding the indexed column.
+            column (str): The indexed column.
+            payload (List[str]): Columns of the table returned with each result.
+
+        Returns:
+            EmbeddingSnapshot: The memory-mapped snapshot.
+        """
+        metadata = table.get_metadata()
+        snapshots_dir = Path(cc.DEFAULT_VECTOR_SNAPSHOTS_DIR)
+        prefix = f"{metadata['path'].replace('.', '_')}.{column}"
+        matrix_path = snapshots_dir / f"{prefix}.v{metadata['version']}.npy"
+        rows_path = matrix_path.with_suffix(".json")
+        if not (matrix_path.exists() and rows_path.exists()):
+            snapshots_dir.mkdir(parents=True, exist_ok=True)
+            for stale_path in snapshots_dir.glob(f"{prefix}.v*"):
+                stale_path.unlink(missing_ok=True)
+            cls._export(table, column, payload, matrix_path, rows_path)
+        return cls(np.load(matrix_path, mmap_mode="r"), json.loads(rows_path.read_text()), matrix_path)
+
+    @classmethod
+    def concatenate(
+        cls, snapshots: List["EmbeddingSnapshot"], rows: List[Dict[str, Any]], matrix_path: Path
+    ) -> "EmbeddingSnapshot":
+        """
+        Merge snapshots into a single one, so that they are searched with one matrix-vector product.
+
+        The merged matrix is written to `matrix_path` with the new `rows`, unless it exists already.
+
+        Args:
+            snapshots (List[EmbeddingSnapshot]): The snapshots to merge, of embeddings of the same model.
+            rows (List[Dict[str, Any]]): One row for each row of the snapshots, in order.
+            matrix_path (Path): The `.npy` file of the merged matrix.
+
+        Returns:
+            EmbeddingSnapshot: The memory-mapped merged snapshot.
+        """
+        rows_path = matrix_path.with_suffix(".json")
+        if not (matrix_path.exists() and rows_path.exists()):
+            dimensions = next((snapshot.embeddings.shape[1] for snapshot in snapshots if snapshot.rows), 0)
+            tmp_matrix_path = matrix_path.with_suffix(".npy.tmp")
+            matrix = np.lib.format.open_memmap(
+                tmp_matrix_path, mode="w+", dtype=np.float16, shape=(len(rows), dimensions)
+            )
+            start = 0
+            for snapshot in snapshots:
+                # A snapshot without rows, such as the speech of a silent video, is exported as a (0, 0) matrix.
+                if not snapshot.rows:
+                    continue
+                matrix[start : start + len(snapshot.rows)] = snapshot.embeddings
+                start += len(snapshot.rows)
+            matrix.flush()
+            del matrix
+            tmp_matrix_path.replace(matrix_path)
+            cls._write_rows(rows, rows_path)
+        return cls(np.load(matrix_path, mmap_mode="r"), json.loads(rows_path.read_text()), matrix_path)
+
+    @staticmethod
+    def _write_rows(rows: List[Dict[str, Any]], rows_path: Path):
+        tmp_rows_path = rows_path.with_suffix(".json.tmp")
+        tmp_rows_path.write_text(json.dumps(rows))
+        tmp_rows_path.replace(rows_path)
+
+    @staticmethod
+    def _export(table: pxt.Table, column: str, payload: List[str], matrix_path: Path, rows_path: Path):
+        results = table.select(
+            *(getattr(table, name) for name in payload), embedding=getattr(table, column).embedding()
+        ).collect()
+
+        embeddings, rows = [], []
+        for row in results:
+            embedding = row.pop("embedding")
+            if embedding is None:
+                continue
+            embedding = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(embedding))
+            if norm == 0.0:
+                continue
+            embeddings.append(embedding / norm)
+            rows.append(row)
+        matrix = np.stack(embeddings).astype(np.float16) if embeddings else np.zeros((0, 0), dtype=np.float16)
+
+        tmp_matrix_path = matrix_path.with_suffix(".npy.tmp")
+        with open(tmp_matrix_path, "wb") as f:
+            np.save(f, matrix)
+        tmp_matrix_path.replace(matrix_path)
+        EmbeddingSnapshot._write_rows(rows, rows_path)
+        logger.info(f"Exported {len(rows)} embeddings of column '{column}' to {matrix_path}")
+
+    def scores(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row to a normalized query embedding, or to each row of a matrix of them.
+
+        Returns:
+            np.ndarray: The (rows,) scores of a query embedding, or the (rows, queries) scores of a matrix.
+        """
+        if len(self.rows) == 0:
+            return np.zeros((0, *query_embeddings.shape[:-1]), dtype=np.float32)
+        return np.concatenate(
+            [
+                self.embeddings[start : start + SCORING_BLOCK_ROWS].astype(np.float32) @ query_embeddings.T
+                for start in range(0, len(self.rows), SCORING_BLOCK_ROWS)
+            ]
+        )
+
+    def search(self, query_embedding: np.ndarray, k: int) -> List[Dict[str, Any]]:
+        """
+        Find the rows most similar to a query.
+
+        Args:
+            query_embedding (np.ndarray): The normalized query embedding, from `embed_query`.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Dict[str, Any]]: The payload of the best rows with their `similarity`, best first.
+        """
+        return self.search_many(query_embedding[np.newaxis], k)[0]
+
+    def search_many(self, query_embeddings: np.ndarray, k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Find the rows most similar to each of several queries, scored together in one matrix product.
+
+        Args:
+            query_embeddings (np.ndarray): The (queries, dimensions) matrix of normalized query embeddings.
+            k (int): Number of results to return per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, the payload of its best rows with their `similarity`.
+        """
+        scores = self.scores(query_embeddings)
+        return [
+            [{**self.rows[pos], "similarity": float(query_scores[pos])} for pos in top_k(query_scores, k)]
+            for query_scores in scores.T
+        ]
@@ -1,21 +1,44 @@
-from typing import Any, Dict, List
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
 
+from loguru import logger
+
+import kubrick_mcp.video.ingestion.constants as cc
 import kubrick_mcp.video.ingestion.registry as registry
 from kubrick_mcp.config import get_settings
+from kubrick_mcp.video.ingestion.functions import embed_texts
 from kubrick_mcp.video.ingestion.models import CachedTable
 from kubrick_mcp.video.ingestion.tools import decode_image
+from kubrick_mcp.video.vector_index import EmbeddingSnapshot, embed_queries, embed_query, normalize_query_text
 
+logger = logger.bind(name="VideoSearchEngine")
 settings = get_settings()
 
+SearchBackend = Literal["pixeltable", "numpy"]
+# Indexed columns searched by the engine, with the columns its results are built from.
+SEARCH_COLUMNS = {
+    ("frames_view", "resized_frame"): ["pos_msec"],
+    ("frames_view", "im_caption"): ["pos_msec", "im_caption"],
+    ("audio_chunks_view", "chunk_text"): ["pos", "start_time_sec", "end_time_sec", "chunk_text"],
+}
+# Models embedding the text-indexed columns, used to embed a batch of queries in one request.
+TEXT_EMBEDDING_MODELS = {
+    "chunk_text": settings.TRANSCRIPT_SIMILARITY_EMBD_MODEL,
+    "im_caption": settings.CAPTION_SIMILARITY_EMBD_MODEL,
+}
+
 
 class VideoSearchEngine:
     """A class that provides video search capabilities using different modalities."""
 
-    def __init__(self, video_name: str):
+    def __init__(self, video_name: str, backend: Optional[SearchBackend] = None):
         """Initialize the video search engine.
 
         Args:
             video_name (str): The name of the video index to search in.
+            backend (Optional[SearchBackend]): "pixeltable" to query the tables' embedding indexes, "numpy"
+                to search memory-mapped snapshots of their embeddings. Defaults to settings.SEARCH_BACKEND.
 
         Raises:
             ValueError: If the video index is not found in registry.
@@ -24,6 +47,124 @@ class VideoSearchEngine:
         if not self.video_index:
             raise ValueError(f"Video index {video_name} not found in registry.")
         self.video_name = video_name
+        self.backend = backend or settings.SEARCH_BACKEND
+        self._snapshots: Dict[tuple[str, str, str], EmbeddingSnapshot] = {}
+
+    def _snapshot(self, part: CachedTable, view: str, column: str) -> EmbeddingSnapshot:
+        key = (part.video_cache, view, column)
+        if key not in self._snapshots:
+            self._snapshots[key] = EmbeddingSnapshot.load_or_export(
+                getattr(part, view), column, SEARCH_COLUMNS[(view, column)]
+            )
+        return self._snapshots[key]
+
+    def load_snapshots(self):
+        """Load, or export, the embedding snapshots searched by the "numpy" backend."""
+        for part in self.video_index.parts():
+            for view, column in SEARCH_COLUMNS:
+                self._snapshot(part, view, column)
+
+    def _search(
+        self, view: str, column: str, query: Any, select: List[str], top_k: int, skip_empty: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Run a similarity search over every part of the index and merge the best results.
+
+        A segmented index is searched segment by segment; each result carries the
+        `start_offset_sec` of its segment, to map its timestamps onto the full video. With the
+        "numpy" backend, the query is embedded once and scored against each segment's snapshot.
+
+        Args:
+            view (str): Attribute of the CachedTable holding the view to search.
+            column (str): Indexed column of the view.
+            query (Any): The text or image to search for.
+            select (List[str]): Columns of the view to return.
+            top_k (int): Number of top results to return.
+            skip_empty (bool): Whether to leave out rows whose text column is empty, such as audio
+                chunks without speech.
+
+        Returns:
+            List[Dict[str, Any]]: The selected columns, similarity and start offset of the best results.
+        """
+        if isinstance(query, str):
+            query = normalize_query_text(query)
+        results = []
+        query_embedding = None
+        for part in self.video_index.parts():
+            table = getattr(part, view)
+            if self.backend == "numpy":
+                if query_embedding is None:
+                    query_embedding = embed_query(table, column, query)
+                rows = self._snapshot(part, view, column).search(query_embedding, top_k)
+                results.extend({**row, "start_offset_sec": part.start_offset_sec} for row in rows)
+                continue
+
+            sims = getattr(table, column).similarity(query)
+            results_query = table.where(getattr(table, column) != "") if skip_empty else table
+            rows = (
+                results_query.select(*(getattr(table, name) for name in select), similarity=sims)
+                .order_by(sims, asc=False)
+                .limit(top_k)
+                .collect()
+            )
+            results.extend(
+                {**row, "start_offset_sec": part.start_offset_sec} for row in rows if row["similarity"] is not None
+            )
+        return sorted(results, key=lambda entry: entry["similarity"], reverse=True)[:top_k]
+
+    def _search_many(self, view: str, column: str, queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Run several text similarity searches at once over every part of the index.
+
+        The queries missing from the query embedding cache are embedded in a single request, then
+        all are scored together against the embedding snapshot of each part with one matrix
+        product, whatever the engine's backend.
+
+        Args:
+            view (str): Attribute of the CachedTable holding the view to search.
+            column (str): Text-indexed column of the view.
+            queries (List[str]): The texts to search for.
+            top_k (int): Number of top results to return per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, the payload, similarity and start offset of its best results.
+        """
+        if not queries:
+            return []
+        query_embeddings = embed_queries(
+            getattr(self.video_index.parts()[0], view),
+            column,
+            queries,
+            embed_batch=lambda texts: embed_texts(texts, TEXT_EMBEDDING_MODELS[column]),
+        )
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for part in self.video_index.parts():
+            part_results = self._snapshot(part, view, column).search_many(query_embeddings, top_k)
+            for query_results, rows in zip(results, part_results):
+                query_results.extend({**row, "start_offset_sec": part.start_offset_sec} for row in rows)
+        return [
+            sorted(query_results, key=lambda entry: entry["similarity"], reverse=True)[:top_k]
+            for query_results in results
+        ]
+
+    @staticmethod
+    def _clip_bounds(view: str, entry: Dict[str, Any]) -> tuple[float, float]:
+        """Start and end time in seconds, in the full video, of the clip matching a search result."""
+        if view == "audio_chunks_view":
+            return (
+                entry["start_offset_sec"] + float(entry["start_time_sec"]),
+                entry["start_offset_sec"] + float(entry["end_time_sec"]),
+            )
+        frame_time_sec = entry["start_offset_sec"] + entry["pos_msec"] / 1000.0
+        return (
+            frame_time_sec - settings.DELTA_SECONDS_FRAME_INTERVAL,
+            frame_time_sec + settings.DELTA_SECONDS_FRAME_INTERVAL,
+        )
+
+    def _to_clips(self, view: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        clips = []
+        for entry in results:
+            start_time, end_time = self._clip_bounds(view, entry)
+            clips.append({"start_time": start_time, "end_time": end_time, "similarity": float(entry["similarity"])})
+        return clips
 
     def search_by_speech(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Search video clips by speech similarity.
@@ -38,26 +179,18 @@ class VideoSearchEngine:
                 - end_time (float): End time in seconds
                 - similarity (float): Similarity score
         """
-        sims = self.video_index.audio_chunks_view.chunk_text.similarity(query)
-        results = self.video_index.audio_chunks_view.select(
-            self.video_index.audio_chunks_view.pos,
-            self.video_index.audio_chunks_view.start_time_sec,
-            self.video_index.audio_chunks_view.end_time_sec,
-            similarity=sims,
-        ).order_by(sims, asc=False)
+        results = self._search(
+            "audio_chunks_view", "chunk_text", query, ["pos", "start_time_sec", "end_time_sec"], top_k, skip_empty=True
+        )
 
-        return [
-            {
-                "start_time": float(entry["start_time_sec"]),
-                "end_time": float(entry["end_time_sec"]),
-                "similarity": float(entry["similarity"]),
-            }
-            for entry in results.limit(top_k).collect()
-        ]
+        return self._to_clips("audio_chunks_view", results)
 
     def search_by_image(self, image_base64: str, top_k: int) -> List[Dict[str, Any]]:
         """Search video clips by image similarity.
 
+        Only sampled frames are indexed: near-duplicate frames dropped at ingestion are never
+        returned, and a match on them lands on the timestamp of the frame kept in their place.
+
         Args:
             image_base64 (str): The query image to match against video frames.
             top_k (int, optional): Number of top results to return. Defaults to settings.IMAGE_SIMILARITY_SEARCH_TOP_K.
@@ -69,25 +202,16 @@ class VideoSearchEngine:
                 - similarity (float): Similarity score
         """
         image = decode_image(image_base64)
-        sims = self.video_index.frames_view.resized_frame.similarity(image)
-        results = self.video_index.frames_view.select(
-            self.video_index.frames_view.pos_msec,
-            self.video_index.frames_view.resized_frame,
-            similarity=sims,
-        ).order_by(sims, asc=False)
+        results = self._search("frames_view", "resized_frame", image, ["pos_msec"], top_k)
 
-        return [
-            {
-                "start_time": entry["pos_msec"] / 1000.0 - settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "end_time": entry["pos_msec"] / 1000.0 + settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "similarity": float(entry["similarity"]),
-            }
-            for entry in results.limit(top_k).collect()
-        ]
+        return self._to_clips("frames_view", results)
 
     def search_by_caption(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Search video clips by caption similarity.
 
+        Only sampled frames are indexed: near-duplicate frames dropped at ingestion are never
+        returned, and a match on them lands on the timestamp of the frame kept in their place.
+
         Args:
             query (str): The search query to match against frame captions.
             top_k (int, optional): Number of top results to return. Defaults to settings.CAPTION_SIMILARITY_SEARCH_TOP_K.
@@ -98,20 +222,38 @@ class VideoSearchEngine:
                 - end_time (float): End time in seconds
                 - similarity (float): Similarity score
         """
-        sims = self.video_index.frames_view.im_caption.similarity(query)
-        results = self.video_index.frames_view.select(
-            self.video_index.frames_view.pos_msec,
-            self.video_index.frames_view.im_caption,
-            similarity=sims,
-        ).order_by(sims, asc=False)
+        results = self._search("frames_view", "im_caption", query, ["pos_msec", "im_caption"], top_k)
+
+        return self._to_clips("frames_view", results)
 
+    def search_by_speech_batch(self, queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Search video clips by speech similarity for several queries at once.
+
+        Args:
+            queries (List[str]): The search queries to match against speech content.
+            top_k (int): Number of top results to return per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, the clips `search_by_speech` would return.
+        """
         return [
-            {
-                "start_time": entry["pos_msec"] / 1000.0 - settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "end_time": entry["pos_msec"] / 1000.0 + settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "similarity": float(entry["similarity"]),
-            }
-            for entry in results.limit(top_k).collect()
+            self._to_clips("audio_chunks_view", results)
+            for results in self._search_many("audio_chunks_view", "chunk_text", queries, top_k)
+        ]
+
+    def search_by_caption_batch(self, queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        """Search video clips by caption similarity for several queries at once.
+
+        Args:
+            queries (List[str]): The search queries to match against frame captions.
+            top_k (int): Number of top results to return per query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: For each query, the clips `search_by_caption` would return.
+        """
+        return [
+            self._to_clips("frames_view", results)
+            for results in self._search_many("frames_view", "im_caption", queries, top_k)
         ]
 
     def get_speech_info(self, query: str, top_k: int) -> List[Dict[str, Any]]:
@@ -126,18 +268,14 @@ class VideoSearchEngine:
                 - text (str): The speech text
                 - similarity (float): Similarity score
         """
-        sims = self.video_index.audio_chunks_view.chunk_text.similarity(query)
-        results = self.video_index.audio_chunks_view.select(
-            self.video_index.audio_chunks_view.chunk_text,
-            similarity=sims,
-        ).order_by(sims, asc=False)
+        results = self._search("audio_chunks_view", "chunk_text", query, ["chunk_text"], top_k, skip_empty=True)
 
         return [
             {
                 "text": entry["chunk_text"],
                 "similarity": float(entry["similarity"]),
             }
-            for entry in results.limit(top_k).collect()
+            for entry in results
         ]
 
     def get_caption_info(self, query: str, top_k: int) -> List[Dict[str, Any]]:
@@ -152,16 +290,178 @@ class VideoSearchEngine:
                 - caption (str): The frame caption
                 - similarity (float): Similarity score
         """
-        sims = self.video_index.frames_view.im_caption.similarity(query)
-        results = self.video_index.frames_view.select(
-            self.video_index.frames_view.im_caption,
-            similarity=sims,
-        ).order_by(sims, asc=False)
+        results = self._search("frames_view", "im_caption", query, ["im_caption"], top_k)
 
         return [
             {
                 "caption": entry["im_caption"],
                 "similarity": float(entry["similarity"]),
             }
-            for entry in results.limit(top_k).collect()
+            for entry in results
         ]
+
+
+SEARCH_ENGINES: Dict[str, VideoSearchEngine] = {}
+
+
+def get_search_engine(video_name: str) -> VideoSearchEngine:
+    """Get the search engine of a video index, reusing it across calls.
+
+    An engine is rebuilt when the index has been registered again since it was created.
+
+    Args:
+        video_name (str): The name of the video index to search in.
+
+    Raises:
+        ValueError: If the video index is not found in registry.
+    """
+    engine = SEARCH_ENGINES.get(video_name)
+    if engine is None or engine.video_index is not registry.get_table(video_name):
+        engine = VideoSearchEngine(video_name)
+        if engine.backend == "numpy":
+            engine.load_snapshots()
+        SEARCH_ENGINES[video_name] = engine
+    return engine
+
+
+def warm_up_search_engines() -> List[str]:
+    """Open the tables and search engines of every registered video index.
+
+    Returns:
+        List[str]: The video indexes that could not be opened.
+    """
+    failed = []
+    for video_name in registry.get_registry():
+        try:
+            get_search_engine(video_name)
+        except Exception as e:
+            logger.warning(f"Could not open video index '{video_name}': {e}")
+            failed.append(video_name)
+    return failed
+
+
+class LibrarySearchEngine:
+    """
+    Search over every registered video index at once.
+
+    The embedding snapshots of all indexes are merged into one memory-mapped matrix per
+    searched column, whose rows carry the video name and clip bounds, so a library-wide
+    query is a single matrix-vector product and top-k however many videos are registered.
+    Names registered as aliases of the same index are searched once, under the first name.
+    """
+
+    def __init__(self):
+        self.registry_version = registry.get_registry_version()
+        self.engines: List[VideoSearchEngine] = []
+        video_caches = set()
+        for video_name in registry.get_registry():
+            try:
+                engine = get_search_engine(video_name)
+            except Exception as e:
+                logger.warning(f"Leaving video index '{video_name}' out of library searches: {e}")
+                continue
+            # Aliases registered for uploads of the same file share its tables, whose clips are listed once.
+            if engine.video_index.video_cache in video_caches:
+                continue
+            video_caches.add(engine.video_index.video_cache)
+            self.engines.append(engine)
+        self._indexes: Dict[tuple[str, str], EmbeddingSnapshot] = {}
+
+    def _library_index(self, view: str, column: str) -> EmbeddingSnapshot:
+        if (view, column) in self._indexes:
+            return self._indexes[(view, column)]
+
+        snapshots, rows = [], []
+        for engine in self.engines:
+            for part in engine.video_index.parts():
+                snapshot = engine._snapshot(part, view, column)
+                snapshots.append(snapshot)
+                for row in snapshot.rows:
+                    start_time, end_time = VideoSearchEngine._clip_bounds(
+                        view, {**row, "start_offset_sec": part.start_offset_sec}
+                    )
+                    rows.append({"video_name": engine.video_name, "start_time": start_time, "end_time": end_time})
+
+        # The merged matrix is named after its members, so it is only rebuilt when one of them changes.
+        members = [engine.video_name for engine in self.engines] + [str(snapshot.path) for snapshot in snapshots]
+        digest = hashlib.sha256("\n".join(members).encode()).hexdigest()[:16]
+        snapshots_dir = Path(cc.DEFAULT_VECTOR_SNAPSHOTS_DIR)
+        snapshots_dir.mkdir(parents=True, exist_ok=True)
+        matrix_path = snapshots_dir / f"library.{column}.{digest}.npy"
+        for stale_path in snapshots_dir.glob(f"library.{column}.*"):
+            if stale_path.stem != matrix_path.stem:
+                stale_path.unlink(missing_ok=True)
+
+        index = EmbeddingSnapshot.concatenate(snapshots, rows, matrix_path)
+        logger.info(f"Library index of column '{column}' holds {len(rows)} rows of {len(self.engines)} videos")
+        self._indexes[(view, column)] = index
+        return index
+
+    def _search(self, view: str, column: str, query: Any, top_k: int) -> List[Dict[str, Any]]:
+        """Find the clips of any video most similar to a query.
+
+        Args:
+            view (str): Attribute of the CachedTable holding the searched view.
+            column (str): Indexed column of the view.
+            query (Any): The text or image to search for.
+            top_k (int): Number of top results to return.
+
+        Returns:
+            List[Dict[str, Any]]: The video name, start time, end time and similarity of the best clips.
+        """
+        if not self.engines:
+            return []
+        index = self._library_index(view, column)
+        query_embedding = embed_query(getattr(self.engines[0].video_index.parts()[0], view), column, query)
+        return index.search(query_embedding, top_k)
+
+    def search_by_speech(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search the clips of all videos by speech similarity.
+
+        Args:
+            query (str): The search query to match against speech content.
+            top_k (int): Number of top results to return.
+
+        Returns:
+            List[Dict[str, Any]]: List of dictionaries containing clip information with keys:
+                - video_name (str): Name of the video index the clip belongs to
+                - start_time (float): Start time in seconds
+                - end_time (float): End time in seconds
+                - similarity (float): Similarity score
+        """
+        return self._search("audio_chunks_view", "chunk_text", query, top_k)
+
+    def search_by_caption(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search the clips of all videos by caption similarity.
+
+        Args:
+            query (str): The search query to match against frame captions.
+            top_k (int): Number of top results to return.
+
+        Returns:
+            List[Dict[str, Any]]: Clips with the same keys as `search_by_speech`.
+        """
+        return self._search("frames_view", "im_caption", query, top_k)
+
+    def search_by_image(self, image_base64: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search the clips of all videos by image similarity.
+
+        Args:
+            image_base64 (str): The query image to match against video frames.
+            top_k (int): Number of top results to return.
+
+        Returns:
+            List[Dict[str, Any]]: Clips with the same keys as `search_by_speech`.
+        """
+        return self._search("frames_view", "resized_frame", decode_image(image_base64), top_k)
+
+
+LIBRARY_SEARCH_ENGINE: Optional[LibrarySearchEngine] = None
+
+
+def get_library_search_engine() -> LibrarySearchEngine:
+    """Get the library-wide search engine, rebuilt whenever an index has been registered since it was created."""
+    global LIBRARY_SEARCH_ENGINE
+    if LIBRARY_SEARCH_ENGINE is None or LIBRARY_SEARCH_ENGINE.registry_version != registry.get_registry_version():
+        LIBRARY_SEARCH_ENGINE = LibrarySearchEngine()
+    return LIBRARY_SEARCH_ENGINE
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+# The settings require API keys, which no test calls out with.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPIK_API_KEY", "test")
+
+import kubrick_mcp.video.ingestion.constants as cc  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def records_dir(tmp_path, monkeypatch):
+    """Keep the registry, checkpoints and snapshots written by a test in its own directory."""
+    records_dir = tmp_path / ".records"
+    monkeypatch.setattr(cc, "DEFAULT_CACHED_TABLES_REGISTRY_DIR", str(records_dir))
+    monkeypatch.setattr(cc, "DEFAULT_CHECKPOINTS_DIR", str(records_dir / "checkpoints"))
+    monkeypatch.setattr(cc, "DEFAULT_SEGMENTS_DIR", str(records_dir / "segments"))
+    monkeypatch.setattr(cc, "DEFAULT_VECTOR_SNAPSHOTS_DIR", str(records_dir / "vectors"))
+    return records_dir
+
+
+@pytest.fixture
+def empty_registry(monkeypatch):
+    """Start from an empty video index registry, restored after the test."""
+    import kubrick_mcp.video.ingestion.registry as registry
+
+    monkeypatch.setattr(registry, "VIDEO_INDEXES_REGISTRY", {})
+    monkeypatch.setattr(registry, "CONTENT_HASH_INDEX", {})
+    monkeypatch.setattr(registry, "TABLE_HANDLES", {})
+    registry.get_registry.cache_clear()
+    yield registry
+    registry.get_registry.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def sample_video(tmp_path_factory) -> str:
+    """A 4 second 64x48 video at 10 fps, whose picture changes abruptly at 2 seconds."""
+    import av
+    import numpy as np
+
+    path = tmp_path_factory.mktemp("videos") / "sample.mp4"
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("mpeg4", rate=10)
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        for index in range(40):
+            pixels = np.full((48, 64, 3), 30 if index < 20 else 220, dtype=np.uint8)
+            pixels[:, : 16 + index % 4] = 120
+            for packet in stream.encode(av.VideoFrame.from_ndarray(pixels, format="rgb24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return str(path)
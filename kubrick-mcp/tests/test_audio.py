@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import kubrick_mcp.video.ingestion.audio as audio
+from kubrick_mcp.video.ingestion.audio import SPEECH_SAMPLE_RATE, decode_chunk_pcm, decode_pcm, encode_pcm
+
+
+@pytest.fixture
+def wav_path(tmp_path):
+    """A 5 second WAV file, whose samples count up from 0."""
+    path = tmp_path / "speech.wav"
+    path.write_bytes(encode_pcm(np.arange(5 * SPEECH_SAMPLE_RATE, dtype=np.int16), "pcm", bitrate=0))
+    return str(path)
+
+
+@pytest.fixture
+def short_windows(monkeypatch):
+    monkeypatch.setattr(audio, "PCM_WINDOW_SEC", 2.0)
+    audio._decode_window_pcm.cache_clear()
+    yield
+    audio._decode_window_pcm.cache_clear()
+
+
+def test_decode_pcm_reads_the_range(wav_path):
+    samples = decode_pcm(wav_path, 1.0, 1.5)
+
+    assert samples[0] == SPEECH_SAMPLE_RATE
+    assert len(samples) == SPEECH_SAMPLE_RATE // 2
+    assert len(decode_pcm(wav_path)) == 5 * SPEECH_SAMPLE_RATE
+
+
+@pytest.mark.parametrize(
+    "start_sec, end_sec",
+    [
+        pytest.param(0.0, 1.0, id="first window"),
+        pytest.param(2.5, 3.5, id="later window"),
+        pytest.param(1.5, 2.5, id="across two windows"),
+        pytest.param(4.5, 5.0, id="end of the file"),
+    ],
+)
+def test_chunks_match_the_decoded_range(wav_path, short_windows, start_sec, end_sec):
+    samples = decode_chunk_pcm(wav_path, start_sec, end_sec)
+
+    np.testing.assert_array_equal(samples, decode_pcm(wav_path, start_sec, end_sec))
+    assert not samples.flags.writeable
+
+
+def test_each_window_is_decoded_once(wav_path, short_windows, monkeypatch):
+    decoded_ranges = []
+    decode = audio._decode_pcm
+
+    def recording_decode(audio_path, start_sec, end_sec):
+        decoded_ranges.append((start_sec, end_sec))
+        return decode(audio_path, start_sec, end_sec)
+
+    monkeypatch.setattr(audio, "_decode_pcm", recording_decode)
+
+    for start_sec in (0.0, 0.5, 1.0, 2.0, 3.0, 4.0):
+        decode_chunk_pcm(wav_path, start_sec, start_sec + 0.5)
+
+    assert decoded_ranges == [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0)]
+    assert audio._decode_window_pcm.cache_info().currsize == 1
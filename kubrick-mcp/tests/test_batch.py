@@ -0,0 +1,27 @@
+import asyncio
+
+import kubrick_mcp.video.ingestion.batch as batch
+
+
+def test_segmented_ingestion_reuses_index_with_same_content(empty_registry, monkeypatch):
+    empty_registry.add_index_to_registry(
+        video_name="long.mp4",
+        video_cache="cache_1",
+        frames_view_name="cache_1.frames",
+        audio_view_name="cache_1.audio_chunks",
+        content_hash="abc",
+    )
+
+    def split_video_at_keyframes(*args, **kwargs):
+        raise AssertionError("a video with an existing index must not be split")
+
+    monkeypatch.setattr(batch, "compute_content_hash", lambda video_path: "abc")
+    monkeypatch.setattr(batch, "split_video_at_keyframes", split_video_at_keyframes)
+    reports = []
+
+    progress = asyncio.run(batch.ingest_video_segments("copy.mp4", num_workers=2, progress_callback=reports.append))
+
+    assert progress.videos == {"copy.mp4": "skipped"}
+    assert reports[-1].done == 1
+    alias = empty_registry._as_metadata(empty_registry.get_registry()["copy.mp4"])
+    assert (alias.video_cache, alias.content_hash) == ("cache_1", "abc")
@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+from PIL import Image
+
+import kubrick_mcp.video.ingestion.cache as cache
+from kubrick_mcp.video.ingestion.cache import ResultCache, image_content_hash
+from kubrick_mcp.video.ingestion.models import CacheMetrics
+
+
+@pytest.fixture
+def result_cache(tmp_path, monkeypatch):
+    # Entries are put and read within the same clock tick, so the LRU order comes from a counter instead.
+    clock = itertools.count()
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+    monkeypatch.setattr(cache, "EVICTION_CHECK_INTERVAL", 1)
+    result_cache = ResultCache(str(tmp_path / "cache.db"), max_bytes=10)
+    yield result_cache
+    result_cache.close()
+
+
+def test_put_get_round_trip(result_cache):
+    key = ResultCache.make_key("gpt-4o-mini", "Describe the image", "abc")
+
+    assert result_cache.get("caption", key) is None
+    result_cache.put("caption", key, b"a cat")
+    assert result_cache.get("caption", key) == b"a cat"
+    result_cache.put("caption", key, b"a dog")
+    assert result_cache.get("caption", key) == b"a dog"
+
+
+def test_keys_depend_on_model_prompt_and_content():
+    key = ResultCache.make_key("model", "prompt", "hash")
+
+    assert key == ResultCache.make_key("model", "prompt", "hash")
+    assert key != ResultCache.make_key("other-model", "prompt", "hash")
+    assert key != ResultCache.make_key("model", None, "hash")
+    assert key != ResultCache.make_key("model", "prompt", "other-hash")
+
+
+def test_least_recently_used_entries_are_evicted_over_the_limit(result_cache):
+    result_cache.put("caption", "a", b"1234")
+    result_cache.put("caption", "b", b"1234")
+    result_cache.get("caption", "a")
+
+    result_cache.put("caption", "c", b"1234")
+
+    assert result_cache.get("caption", "b") is None
+    assert result_cache.get("caption", "a") == b"1234"
+    assert result_cache.get("caption", "c") == b"1234"
+    assert result_cache.metrics()["caption"].size_bytes == 8
+
+
+def test_hits_and_misses_are_counted_per_kind(result_cache, tmp_path):
+    result_cache.put("caption", "a", b"1")
+    result_cache.get("caption", "a")
+    result_cache.get("caption", "a")
+    result_cache.get("caption", "b")
+    result_cache.get("embedding", "c")
+
+    expected = {
+        "caption": CacheMetrics(hits=2, misses=1, entries=1, size_bytes=1),
+        "embedding": CacheMetrics(hits=0, misses=1, entries=0, size_bytes=0),
+    }
+    assert result_cache.metrics() == expected
+    # Another process sharing the file sees the same counters.
+    other = ResultCache(str(tmp_path / "cache.db"), max_bytes=10)
+    assert other.metrics() == expected
+    other.close()
+
+
+def test_image_hash_depends_on_pixels_only():
+    red = Image.new("RGB", (4, 4), "red")
+
+    assert image_content_hash(red) == image_content_hash(red.copy())
+    assert image_content_hash(red) != image_content_hash(Image.new("RGB", (4, 4), "blue"))
+    assert image_content_hash(red) != image_content_hash(Image.new("RGB", (2, 8), "red"))
@@ -0,0 +1,93 @@
+import pytest
+
+import kubrick_mcp.video.ingestion.iterators as iterators
+from kubrick_mcp.video.ingestion.iterators import SparseFrameIterator, analyze_scene_changes, select_scene_timestamps
+
+SECONDS = tuple(float(second) for second in range(13))
+STATIC = (1.0,) + (0.0,) * 12
+OTHER_HASH = (1 << 64) - 1
+
+
+def with_changes(*positions: int, score: float = 0.5) -> tuple[float, ...]:
+    return tuple(score if pos in positions else STATIC[pos] for pos in range(len(SECONDS)))
+
+
+@pytest.mark.parametrize(
+    "change_scores, min_frames_per_minute, max_frames_per_minute, hashes, expected",
+    [
+        pytest.param(STATIC, 1.0, 60.0, None, [0.0], id="static video keeps its first frame"),
+        pytest.param(with_changes(3, 7), 1.0, 60.0, None, [0.0, 3.0, 7.0], id="changes are picked"),
+        pytest.param(with_changes(3, score=0.1), 1.0, 60.0, None, [0.0], id="changes below threshold are ignored"),
+        pytest.param(with_changes(1), 1.0, 30.0, None, [0.0, 2.0], id="close change is deferred past min gap"),
+        pytest.param(with_changes(5, 6), 1.0, 20.0, None, [0.0, 5.0, 8.0], id="changes within min gap merge"),
+        pytest.param(STATIC, 12.0, 60.0, None, [0.0, 5.0, 10.0], id="static stretches get max gap frames"),
+        pytest.param(STATIC, 12.0, 60.0, (0,) * 13, [0.0], id="near-duplicate max gap frames are dropped"),
+        pytest.param(
+            with_changes(3, 7),
+            1.0,
+            60.0,
+            (0,) * 7 + (OTHER_HASH,) * 6,
+            [0.0, 7.0],
+            id="near-duplicate change is dropped",
+        ),
+    ],
+)
+def test_select_scene_timestamps(change_scores, min_frames_per_minute, max_frames_per_minute, hashes, expected):
+    selected = select_scene_timestamps(
+        SECONDS,
+        change_scores,
+        change_threshold=0.15,
+        min_frames_per_minute=min_frames_per_minute,
+        max_frames_per_minute=max_frames_per_minute,
+        hashes=hashes,
+        max_hamming_distance=6 if hashes is not None else None,
+    )
+    assert selected == expected
+
+
+def test_select_scene_timestamps_of_empty_video():
+    assert select_scene_timestamps((), (), 0.15, 1.0, 60.0) == []
+
+
+def test_analyze_scene_changes_scores_keyframes(sample_video):
+    timestamps, change_scores, hashes = analyze_scene_changes(sample_video, analysis_fps=2.0)
+
+    assert timestamps[0] == 0.0 and change_scores[0] == 1.0
+    assert len(timestamps) == len(change_scores) == len(hashes)
+    # The encoder starts a GOP at the cut, which is then scored against the previous keyframe.
+    cut = timestamps.index(2.0)
+    assert change_scores[cut] > 0.15
+    assert all(score < 0.15 for pos, score in enumerate(change_scores[1:], start=1) if pos != cut)
+    assert select_scene_timestamps(timestamps, change_scores, 0.15, 1.0, 60.0) == [0.0, 2.0]
+
+
+@pytest.fixture
+def kept_timestamps(monkeypatch):
+    monkeypatch.setattr(iterators, "_KEPT_TIMESTAMPS", iterators.OrderedDict())
+    monkeypatch.setattr(iterators, "MAX_KEPT_TIMESTAMPS_ENTRIES", 1)
+    return iterators._KEPT_TIMESTAMPS
+
+
+def test_sparse_frames_drop_near_duplicates(sample_video, kept_timestamps):
+    all_frames = [row["pos_msec"] for row in SparseFrameIterator(sample_video, num_frames=8)]
+    iterator = SparseFrameIterator(sample_video, num_frames=8, max_hamming_distance=6)
+    assert iterator.timestamps is None
+
+    kept_frames = [row["pos_msec"] for row in iterator]
+
+    assert len(all_frames) == 8
+    assert kept_frames[:2] == [0.0, 2000.0] and set(kept_frames) < set(all_frames)
+    assert iterator.timestamps == tuple(msec / 1000.0 for msec in kept_frames)
+    # Another iterator over the same video knows the kept frames without decoding them, and can resume.
+    resumed = SparseFrameIterator(sample_video, num_frames=8, max_hamming_distance=6)
+    assert resumed.timestamps == iterator.timestamps
+    resumed.set_pos(1)
+    assert [row["pos_msec"] for row in resumed] == kept_frames[1:]
+
+
+def test_kept_timestamps_are_bounded(sample_video, kept_timestamps):
+    list(SparseFrameIterator(sample_video, num_frames=8, max_hamming_distance=6))
+    list(SparseFrameIterator(sample_video, num_frames=4, max_hamming_distance=6))
+
+    assert [key[3] for key in kept_timestamps] == [4]
+    assert SparseFrameIterator(sample_video, num_frames=8, max_hamming_distance=6).timestamps is None
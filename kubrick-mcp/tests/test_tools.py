@@ -0,0 +1,25 @@
+import subprocess
+
+import pytest
+
+from kubrick_mcp.video.ingestion.tools import re_encode_video
+
+
+@pytest.fixture
+def no_ffmpeg(monkeypatch):
+    def run(command, **kwargs):
+        raise FileNotFoundError(command[0])
+
+    monkeypatch.setattr(subprocess, "run", run)
+
+
+def test_re_encode_keeps_readable_video(sample_video, no_ffmpeg):
+    assert re_encode_video(sample_video) == sample_video
+
+
+def test_re_encode_fails_on_unreadable_video(tmp_path, no_ffmpeg):
+    broken = tmp_path / "broken.mp4"
+    broken.write_bytes(b"not a video")
+
+    assert re_encode_video(str(broken)) is None
+    assert re_encode_video(str(tmp_path / "missing.mp4")) is None
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from kubrick_mcp.video.ingestion.audio import SPEECH_SAMPLE_RATE
+from kubrick_mcp.video.ingestion.vad import VAD_FRAME_MS, detect_speech_frames, speech_ratio
+
+ENERGY_THRESHOLD_DB = -45.0
+TIME = np.arange(3 * SPEECH_SAMPLE_RATE) / SPEECH_SAMPLE_RATE
+
+
+def voiced(f0: float = 150.0) -> np.ndarray:
+    """Harmonics of `f0`, stronger in the speech band, like a sustained vowel."""
+    harmonics = [
+        np.sin(2 * np.pi * f0 * k * TIME) * (1.0 if 300.0 <= f0 * k <= 3000.0 else 0.3) for k in range(1, 30)
+    ]
+    return np.sum(harmonics, axis=0) / 10.0
+
+
+def noise(level: float) -> np.ndarray:
+    return level * np.random.default_rng(0).standard_normal(len(TIME))
+
+
+def tone(frequency: float) -> np.ndarray:
+    return 0.3 * np.sin(2 * np.pi * frequency * TIME)
+
+
+def to_pcm(samples: np.ndarray) -> np.ndarray:
+    return np.clip(samples * 32767, -32768, 32767).astype(np.int16)
+
+
+# Talking for half of every second.
+PAUSES = np.sin(2 * np.pi * TIME) > 0
+
+
+@pytest.mark.parametrize(
+    "samples",
+    [
+        pytest.param(np.zeros_like(TIME), id="silence"),
+        pytest.param(noise(0.1), id="white noise"),
+        pytest.param(tone(60.0), id="mains hum"),
+        pytest.param(tone(6000.0), id="whistle"),
+        pytest.param(0.003 * voiced(), id="speech below the energy threshold"),
+    ],
+)
+def test_non_speech_is_rejected(samples):
+    assert speech_ratio(to_pcm(samples), ENERGY_THRESHOLD_DB) == 0.0
+
+
+@pytest.mark.parametrize(
+    "samples, expected_ratio",
+    [
+        pytest.param(voiced() * PAUSES, 0.5, id="speech with pauses"),
+        pytest.param(voiced() * PAUSES + noise(0.003), 0.5, id="speech with pauses over noise"),
+        pytest.param(voiced(), 1.0, id="speech without pauses"),
+        pytest.param(voiced() * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * TIME)), 1.0, id="syllables without pauses"),
+    ],
+)
+def test_speech_is_detected(samples, expected_ratio):
+    assert speech_ratio(to_pcm(samples), ENERGY_THRESHOLD_DB) == pytest.approx(expected_ratio, abs=0.05)
+
+
+def test_speech_frames_follow_the_pauses():
+    frame_length = SPEECH_SAMPLE_RATE * VAD_FRAME_MS // 1000
+
+    speech = detect_speech_frames(voiced() * PAUSES, SPEECH_SAMPLE_RATE, ENERGY_THRESHOLD_DB)
+
+    assert len(speech) == len(TIME) // frame_length
+    frame_starts = np.arange(len(speech)) * frame_length
+    fully_voiced = PAUSES[frame_starts] & PAUSES[frame_starts + frame_length - 1]
+    fully_paused = ~PAUSES[frame_starts] & ~PAUSES[frame_starts + frame_length - 1]
+    assert speech[fully_voiced].all()
+    assert not speech[fully_paused].any()
+
+
+def test_too_short_input_has_no_frames():
+    assert speech_ratio(np.zeros(10, dtype=np.int16), ENERGY_THRESHOLD_DB) == 0.0
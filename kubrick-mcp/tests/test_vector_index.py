@@ -0,0 +1,91 @@
+import numpy as np
+import pixeltable as pxt
+import pytest
+
+import kubrick_mcp.video.vector_index as vector_index
+from kubrick_mcp.video.vector_index import EmbeddingSnapshot, embed_query, normalize, top_k
+
+TEST_DIR = "kubrick_tests"
+TEXTS = ["aaa", "aab", "abc", "bcd", "ddd", "cab", "dab", "bbb"]
+
+
+@pxt.udf
+def letter_counts(text: str) -> pxt.Array[(4,), pxt.Float]:
+    """A deterministic text embedding, so that searches need no model."""
+    return np.array([text.count(letter) for letter in "abcd"], dtype=np.float32) + 0.1
+
+
+@pytest.fixture(scope="module")
+def texts_table():
+    pxt.drop_dir(TEST_DIR, force=True, if_not_exists="ignore")
+    pxt.create_dir(TEST_DIR)
+    table = pxt.create_table(f"{TEST_DIR}.texts", {"idx": pxt.Int, "text": pxt.String})
+    table.insert([{"idx": idx, "text": text} for idx, text in enumerate(TEXTS)] + [{"idx": len(TEXTS), "text": None}])
+    table.add_embedding_index("text", string_embed=letter_counts)
+    yield table
+    pxt.drop_dir(TEST_DIR, force=True)
+
+
+def test_top_k_returns_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.9, -0.2], dtype=np.float32)
+    assert top_k(scores, 3).tolist() == [1, 3, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 0, 4]
+    assert top_k(scores, 0).tolist() == []
+
+
+def test_scores_across_block_boundaries(monkeypatch):
+    monkeypatch.setattr(vector_index, "SCORING_BLOCK_ROWS", 3)
+    rng = np.random.default_rng(0)
+    embeddings = normalize(rng.standard_normal((10, 4)).astype(np.float32)).astype(np.float16)
+    snapshot = EmbeddingSnapshot(embeddings, [{"pos": pos} for pos in range(10)], path=None)
+    queries = normalize(rng.standard_normal((2, 4)).astype(np.float32))
+
+    expected = embeddings.astype(np.float32) @ queries.T
+    np.testing.assert_allclose(snapshot.scores(queries), expected, rtol=1e-6)
+    np.testing.assert_allclose(snapshot.scores(queries[0]), expected[:, 0], rtol=1e-6)
+
+    results = snapshot.search(queries[0], 4)
+    assert [row["pos"] for row in results] == np.argsort(-expected[:, 0], kind="stable")[:4].tolist()
+
+
+def test_concatenate_skips_empty_snapshots(tmp_path):
+    empty = EmbeddingSnapshot(np.zeros((0, 0), dtype=np.float16), [], tmp_path / "empty.npy")
+    embeddings = normalize(np.eye(4, dtype=np.float32)[:3]).astype(np.float16)
+    filled = EmbeddingSnapshot(embeddings, [{"pos": pos} for pos in range(3)], tmp_path / "filled.npy")
+
+    rows = [{"video_name": "filled", "pos": pos} for pos in range(3)]
+    merged = EmbeddingSnapshot.concatenate([empty, filled, empty], rows, tmp_path / "library.npy")
+
+    assert merged.embeddings.shape == (3, 4)
+    assert merged.search(np.array([0.0, 1.0, 0.0, 0.0], dtype=np.float32), 1)[0]["pos"] == 1
+
+
+def test_snapshot_leaves_out_rows_without_embedding(texts_table):
+    snapshot = EmbeddingSnapshot.load_or_export(texts_table, "text", ["idx", "text"])
+
+    assert snapshot.embeddings.shape == (len(TEXTS), 4)
+    assert sorted(row["idx"] for row in snapshot.rows) == list(range(len(TEXTS)))
+
+
+@pytest.mark.parametrize("query", ["aaa", "bcd", "abcd", "dd"])
+def test_snapshot_search_matches_similarity(texts_table, query):
+    sims = texts_table.text.similarity(query)
+    expected = (
+        texts_table.where(texts_table.text != None)  # noqa: E711
+        .select(texts_table.idx, similarity=sims)
+        .order_by(sims, asc=False)
+        .collect()
+    )
+    expected = list(expected)
+    expected_similarity = {row["idx"]: row["similarity"] for row in expected}
+
+    snapshot = EmbeddingSnapshot.load_or_export(texts_table, "text", ["idx", "text"])
+    actual = snapshot.search(embed_query(texts_table, "text", query), 3)
+
+    # Rows tied on similarity may come in any order, so each row is checked against its own similarity.
+    np.testing.assert_allclose(
+        [row["similarity"] for row in actual], [row["similarity"] for row in expected[:3]], atol=1e-3
+    )
+    np.testing.assert_allclose(
+        [row["similarity"] for row in actual], [expected_similarity[row["idx"]] for row in actual], atol=1e-3
+    )
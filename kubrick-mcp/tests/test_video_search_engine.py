@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import kubrick_mcp.video.video_search_engine as video_search_engine
+from kubrick_mcp.video.vector_index import EmbeddingSnapshot, normalize
+
+
+class FakeEngine:
+    """A search engine over a single unsegmented index with one embedding snapshot."""
+
+    def __init__(self, video_name: str, video_cache: str, snapshot: EmbeddingSnapshot):
+        self.video_name = video_name
+        part = SimpleNamespace(video_cache=video_cache, start_offset_sec=0.0)
+        self.video_index = SimpleNamespace(video_cache=video_cache, parts=lambda: [part])
+        self.snapshot = snapshot
+
+    def _snapshot(self, part, view, column):
+        return self.snapshot
+
+
+def _snapshot(tmp_path, name: str, embeddings: np.ndarray) -> EmbeddingSnapshot:
+    rows = [{"pos_msec": 1000.0 * pos} for pos in range(len(embeddings))]
+    return EmbeddingSnapshot(normalize(embeddings).astype(np.float16), rows, tmp_path / f"{name}.npy")
+
+
+def test_library_search_lists_aliases_once(tmp_path, monkeypatch):
+    original = _snapshot(tmp_path, "original", np.eye(3, dtype=np.float32))
+    other = _snapshot(tmp_path, "other", np.ones((1, 3), dtype=np.float32))
+    engines = {
+        "original": FakeEngine("original", "cache_1", original),
+        "re-upload": FakeEngine("re-upload", "cache_1", original),
+        "other": FakeEngine("other", "cache_2", other),
+    }
+    monkeypatch.setattr(video_search_engine.registry, "get_registry", lambda: engines)
+    monkeypatch.setattr(video_search_engine, "get_search_engine", engines.__getitem__)
+
+    library = video_search_engine.LibrarySearchEngine()
+    index = library._library_index("frames_view", "im_caption")
+
+    assert [engine.video_name for engine in library.engines] == ["original", "other"]
+    assert len(index.rows) == 4
+    results = index.search(np.array([1.0, 0.0, 0.0], dtype=np.float32), 2)
+    assert [result["video_name"] for result in results] == ["original", "other"]
@@ -9,7 +9,7 @@ interface UploadedVideo {
   timestamp: Date;
   videoPath?: string;
   taskId?: string;
-  processingStatus?: 'pending' | 'in_progress' | 'completed' | 'failed';
+  processingStatus?: 'pending' | 'in_progress' | 'completed' | 'failed' | 'cancelled';
 }
 
 interface VideoSidebarProps {
@@ -78,6 +78,8 @@ const VideoSidebar = ({
         return <CheckCircle className="w-4 h-4 text-green-500" />;
       case 'failed':
         return <AlertCircle className="w-4 h-4 text-red-500" />;
+      case 'cancelled':
+        return <AlertCircle className="w-4 h-4 text-gray-500" />;
       default:
         return null;
     }
@@ -91,6 +93,8 @@ const VideoSidebar = ({
         return 'Ready';
       case 'failed':
         return 'Failed';
+      case 'cancelled':
+        return 'Cancelled';
       default:
         return '';
     }
@@ -225,6 +229,7 @@ const VideoSidebar = ({
                     <p className={`text-xs ${
                       video.processingStatus === 'completed' ? 'text-green-400' :
                       video.processingStatus === 'failed' ? 'text-red-400' :
+                      video.processingStatus === 'cancelled' ? 'text-gray-400' :
                       'text-yellow-400'
                     }`}>
                       {getStatusText(video.processingStatus)}
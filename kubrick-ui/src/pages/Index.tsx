@@ -29,7 +29,7 @@ interface UploadedVideo {
   timestamp: Date;
   videoPath?: string;
   taskId?: string;
-  processingStatus?: 'pending' | 'in_progress' | 'completed' | 'failed';
+  processingStatus?: 'pending' | 'in_progress' | 'completed' | 'failed' | 'cancelled';
 }
 
 const Index = () => {
@@ -77,10 +77,12 @@ const Index = () => {
             const response = await fetch(`http://localhost:8080/task-status/${video.taskId}`);
             if (response.ok) {
               const data = await response.json();
-              if (data.status === 'completed' || data.status === 'failed') {
+              // Stop polling once the task ended, or if the API no longer knows about it
+              if (['completed', 'failed', 'cancelled', 'not_found'].includes(data.status)) {
+                const processingStatus = data.status === 'not_found' ? 'failed' : data.status;
                 setUploadedVideos(prev => prev.map(v => 
                   v.id === video.id 
-                    ? { ...v, processingStatus: data.status }
+                    ? { ...v, processingStatus }
                     : v
                 ));
               }